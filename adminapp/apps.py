@@ -4,3 +4,5 @@ from django.apps import AppConfig
 class AdminappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'adminapp'
+    def ready(self):
+        import adminapp.signals
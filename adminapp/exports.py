@@ -0,0 +1,96 @@
+import csv
+import json
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'json': ('application/json', 'json'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer: возвращает строку вместо записи.
+    """
+    def write(self, value):
+        return value
+
+
+def export_columns(queryset):
+    return [field.attname for field in queryset.model._meta.concrete_fields]
+
+
+def iter_rows(queryset):
+    return queryset.values(*export_columns(queryset)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_json(queryset):
+    encoder = DjangoJSONEncoder()
+    yield '['
+    separator = ''
+    for row in iter_rows(queryset):
+        yield separator + encoder.encode(row)
+        separator = ','
+    yield ']'
+
+
+def stream_jsonl(queryset):
+    for row in iter_rows(queryset):
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(queryset):
+    columns = export_columns(queryset)
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in iter_rows(queryset):
+        yield writer.writerow([row[column] for column in columns])
+
+
+def xlsx_value(value):
+    # openpyxl не поддерживает datetime с часовым поясом
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def write_xlsx(queryset, output):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(queryset.model.__name__)
+    columns = export_columns(queryset)
+    sheet.append(columns)
+    for row in iter_rows(queryset):
+        sheet.append([xlsx_value(row[column]) for column in columns])
+    workbook.save(output)
+
+
+def export_response(queryset, model_name, export_format):
+    """
+    Потоковый экспорт выборки: строки читаются из БД частями по
+    EXPORT_CHUNK_SIZE, поэтому память не зависит от размера таблицы.
+    XLSX собирается во временном файле в режиме write_only.
+    """
+    content_type, extension = EXPORT_FORMATS[export_format]
+    filename = f'{model_name}_data.{extension}'
+
+    if export_format == 'xlsx':
+        output = tempfile.TemporaryFile()
+        write_xlsx(queryset, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+
+    streams = {'json': stream_json, 'jsonl': stream_jsonl, 'csv': stream_csv}
+    response = StreamingHttpResponse(streams[export_format](queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
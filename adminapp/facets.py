@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db import models
+from encrypted_model_fields.fields import EncryptedMixin
+
+
+FACET_LIMIT = 50
+FACET_TIMEOUT = 60 * 60
+AUTOCOMPLETE_LIMIT = 20
+
+TEXT_FIELDS = (models.CharField, models.TextField)
+NUMERIC_FIELDS = (models.IntegerField, models.DecimalField, models.FloatField)
+RELATION_FIELDS = (models.ForeignKey, models.OneToOneField)
+
+
+@dataclass
+class Facet:
+    """
+    Описание фильтра поля для панели: 'choices' — выпадающий список,
+    'text' — поле ввода с автодополнением, 'range' — диапазон от/до.
+    """
+    kind: str
+    options: list = field(default_factory=list)
+
+
+def filter_lookups(model_class):
+    """
+    Допустимые параметры фильтрации модели. Считаются по метаданным,
+    без запросов к БД.
+    """
+    lookups = []
+    for model_field in model_class._meta.fields:
+        if model_field.choices or isinstance(model_field, TEXT_FIELDS + RELATION_FIELDS):
+            lookups.append(model_field.name)
+        elif isinstance(model_field, NUMERIC_FIELDS):
+            lookups.extend([model_field.name, f'{model_field.name}__gte', f'{model_field.name}__lte'])
+    return lookups
+
+
+def _generation(model_class):
+    return cache.get_or_set(f'facets:generation:{model_class._meta.label_lower}', 0, None)
+
+
+def invalidate_facets(model_class):
+    key = f'facets:generation:{model_class._meta.label_lower}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 0, None)
+
+
+def _display_field(related_model):
+    for related_field in related_model._meta.fields:
+        if isinstance(related_field, TEXT_FIELDS):
+            return related_field.name
+    return 'id'
+
+
+def _build_facet(model_class, model_field):
+    if model_field.choices:
+        return Facet('choices', [(value, label) for value, label in model_field.choices])
+
+    if isinstance(model_field, RELATION_FIELDS):
+        related_model = model_field.related_model
+        options = list(
+            related_model._base_manager.order_by('pk').values_list('id', _display_field(related_model))[:FACET_LIMIT + 1]
+        )
+    else:
+        options = list(
+            model_class._base_manager.order_by().values_list(model_field.name, flat=True).distinct()[:FACET_LIMIT + 1]
+        )
+
+    if len(options) > FACET_LIMIT:
+        return Facet('range' if isinstance(model_field, NUMERIC_FIELDS) else 'text')
+    if not isinstance(model_field, RELATION_FIELDS):
+        options = [(value, value) for value in options]
+    return Facet('choices', options)
+
+
+def get_facets(model_class):
+    """
+    Возвращает {поле: Facet} для панели фильтров.
+
+    Число значений каждого поля ограничено FACET_LIMIT: поля с большей
+    кардинальностью переключаются на ввод текста или диапазона. Результат
+    кешируется и сбрасывается при изменении модели или связанных моделей.
+    """
+    related_models = [
+        f.related_model for f in model_class._meta.fields
+        if isinstance(f, RELATION_FIELDS) and f.related_model
+    ]
+    generations = '.'.join(str(_generation(m)) for m in [model_class] + related_models)
+    cache_key = f'facets:{model_class._meta.label_lower}:{generations}'
+
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = {}
+        for model_field in model_class._meta.fields:
+            if model_field.choices or isinstance(model_field, TEXT_FIELDS + NUMERIC_FIELDS + RELATION_FIELDS):
+                facets[model_field.name] = _build_facet(model_class, model_field)
+        cache.set(cache_key, facets, FACET_TIMEOUT)
+    return facets
+
+
+def autocomplete(model_class, field_name, prefix):
+    """
+    Варианты значения поля, начинающиеся с prefix (для 'text'-фильтров).
+    """
+    model_field = model_class._meta.get_field(field_name)
+    if isinstance(model_field, EncryptedMixin):
+        # Зашифрованные значения нельзя сравнивать в БД
+        return []
+    if isinstance(model_field, RELATION_FIELDS):
+        related_model = model_field.related_model
+        display = _display_field(related_model)
+        queryset = related_model._base_manager.filter(**{f'{display}__istartswith': prefix})
+        return list(queryset.order_by(display).values_list('id', display)[:AUTOCOMPLETE_LIMIT])
+
+    queryset = model_class._base_manager.filter(**{f'{field_name}__istartswith': prefix})
+    values = queryset.order_by(field_name).values_list(field_name, flat=True).distinct()[:AUTOCOMPLETE_LIMIT]
+    return [[value, value] for value in values]
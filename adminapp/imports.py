@@ -0,0 +1,282 @@
+import codecs
+import json
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from api.blind_index import update_blind_indexes
+from api.connections import record_flight_changes
+from api.inventory import refresh_inventory
+from api.models import Flight, FlightSeat, Ticket
+from api.pricing import refresh_min_prices
+from api.revenue import invalidate_sales_days, revenue_seats_changed
+from api.rollups import rebuild_rollups
+from api.seating import materialize_flight_seats
+
+from .search import index_instances
+
+
+IMPORT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+# Действия после пакетного создания объектов (bulk_create не вызывает сигналы)
+POST_CREATE_HOOKS = {
+    Flight: materialize_flight_seats,
+}
+
+
+def _seats_saved(seats):
+    flight_ids = {seat.flight_id for seat in seats}
+    refresh_inventory(flight_ids)
+    refresh_min_prices(flight_ids)
+
+
+def _flights_saved(flights):
+    flight_ids = [flight.id for flight in flights]
+    record_flight_changes(flight_ids)
+    # Базовые цены рейсов могли измениться
+    refresh_min_prices(flight_ids)
+
+
+def _tickets_saved(tickets):
+    # Сигналы билетов при bulk-сохранении не срабатывают: сводки рейсов пересобираются
+    seat_ids = {ticket.flight_seat_id for ticket in tickets}
+    days = rebuild_rollups(set(FlightSeat.all_objects.filter(id__in=seat_ids).values_list('flight_id', flat=True)))
+    if days:
+        transaction.on_commit(partial(invalidate_sales_days, days))
+    transaction.on_commit(partial(revenue_seats_changed, seat_ids))
+
+
+# Действия после любого пакетного сохранения
+POST_SAVE_HOOKS = {
+    FlightSeat: _seats_saved,
+    Flight: _flights_saved,
+    Ticket: _tickets_saved,
+}
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    rejected: list = field(default_factory=list)
+    # Номер записи, на которой чтение файла прервалось, и ошибка разбора
+    stopped_at: int = None
+    error: str = None
+
+    def reject(self, index, item, errors):
+        pk = item.get('id') if isinstance(item, dict) else None
+        self.rejected.append({'index': index, 'pk': pk, 'errors': errors})
+
+    def stop(self, index, error):
+        self.stopped_at = index
+        self.error = error
+
+    def as_dict(self):
+        report = {'created': self.created, 'updated': self.updated, 'rejected': self.rejected}
+        if self.error is not None:
+            report.update(stopped_at=self.stopped_at, error=self.error)
+        return report
+
+
+def _iter_json_array(read, text):
+    decoder = json.JSONDecoder()
+    position = text.index('[') + 1
+    while True:
+        # Пропускаем пробелы и разделители; при нехватке данных дочитываем
+        while True:
+            while position < len(text) and text[position] in ' \t\r\n,':
+                position += 1
+            if position < len(text):
+                break
+            chunk = read()
+            if not chunk:
+                raise json.JSONDecodeError('Unexpected end of file', text, position)
+            text, position = chunk, 0
+
+        if text[position] == ']':
+            return
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(text, position)
+                break
+            except json.JSONDecodeError:
+                chunk = read()
+                if not chunk:
+                    raise
+                text, position = text[position:] + chunk, 0
+        yield item
+        position = end
+
+
+def iter_json_items(fileobj):
+    """
+    Потоково читает JSON-массив объектов или JSON Lines, не загружая
+    файл в память целиком.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def read():
+        chunk = fileobj.read(READ_CHUNK_SIZE)
+        return decoder.decode(chunk, final=not chunk) if chunk else ''
+
+    text = read()
+    while text and not text.strip():
+        text = read()
+    if not text:
+        return
+
+    if text.lstrip().startswith('['):
+        yield from _iter_json_array(read, text)
+        return
+
+    buffer = text
+    while True:
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        chunk = read()
+        if not chunk:
+            break
+        buffer += chunk
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def _build_instance(model, item):
+    if not isinstance(item, dict):
+        raise ValidationError('Expected an object.')
+
+    fields_by_name = {}
+    for model_field in model._meta.concrete_fields:
+        fields_by_name[model_field.name] = model_field
+        fields_by_name[model_field.attname] = model_field
+
+    values = {}
+    for key, value in item.items():
+        model_field = fields_by_name.get(key)
+        if model_field is None:
+            raise ValidationError(f"Unknown field '{key}'.")
+        values[model_field.attname] = value
+
+    instance = model(**values)
+    fk_names = [f.name for f in model._meta.concrete_fields if f.is_relation]
+    instance.clean_fields(exclude=fk_names)
+    update_blind_indexes(instance)
+    return instance
+
+
+def _missing_references(model, instances):
+    """
+    Проверяет внешние ключи пачки одним запросом на каждое FK-поле.
+    Возвращает {позиция в пачке: [ошибки]}.
+    """
+    errors = {}
+    for model_field in model._meta.concrete_fields:
+        if not model_field.is_relation:
+            continue
+        ids = {getattr(obj, model_field.attname) for obj in instances} - {None}
+        existing = set(
+            model_field.related_model._base_manager.filter(pk__in=ids).values_list('pk', flat=True)
+        ) if ids else set()
+        for position, obj in enumerate(instances):
+            value = getattr(obj, model_field.attname)
+            if value is None and not model_field.null:
+                errors.setdefault(position, []).append(f"'{model_field.name}' is required.")
+            elif value is not None and value not in existing:
+                errors.setdefault(position, []).append(f"'{model_field.name}' {value} does not exist.")
+    return errors
+
+
+def _save_batch(model, instances, report):
+    # Денормализованные счетчики и цены не импортируются: их пересчитывают хуки
+    skip = set(getattr(model, 'DERIVED_FIELDS', ()))
+    update_fields = [f.name for f in model._meta.concrete_fields if not f.primary_key and f.name not in skip]
+    with_pk = [obj for obj in instances if obj.pk is not None]
+    existing = set(
+        model._base_manager.filter(pk__in=[obj.pk for obj in with_pk]).values_list('pk', flat=True)
+    )
+    to_update = [obj for obj in with_pk if obj.pk in existing]
+    to_create = [obj for obj in instances if obj.pk is None or obj.pk not in existing]
+
+    with transaction.atomic():
+        if to_update:
+            model._base_manager.bulk_update(to_update, update_fields, batch_size=IMPORT_BATCH_SIZE)
+        if to_create:
+            model._base_manager.bulk_create(to_create, batch_size=IMPORT_BATCH_SIZE)
+            hook = POST_CREATE_HOOKS.get(model)
+            if hook:
+                hook(to_create)
+        hook = POST_SAVE_HOOKS.get(model)
+        if hook:
+            hook(instances)
+        index_instances(model, instances)
+
+    report.updated += len(to_update)
+    report.created += len(to_create)
+
+
+def _import_batch(model, batch, report):
+    instances, positions = [], []
+    for index, item in batch:
+        try:
+            instances.append(_build_instance(model, item))
+            positions.append((index, item))
+        except (ValidationError, TypeError, ValueError) as e:
+            report.reject(index, item, getattr(e, 'messages', [str(e)]))
+
+    reference_errors = _missing_references(model, instances)
+    valid = []
+    for position, (obj, (index, item)) in enumerate(zip(instances, positions)):
+        if position in reference_errors:
+            report.reject(index, item, reference_errors[position])
+        else:
+            valid.append((obj, index, item))
+    if not valid:
+        return
+
+    try:
+        _save_batch(model, [obj for obj, _, _ in valid], report)
+    except DatabaseError:
+        # Пачка отклонена БД целиком: сохраняем построчно, чтобы найти виновные строки
+        for obj, index, item in valid:
+            try:
+                _save_batch(model, [obj], report)
+            except DatabaseError as e:
+                report.reject(index, item, [str(e)])
+
+
+def import_items(model, items, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Пакетный импорт: существующие по pk объекты обновляются bulk_update,
+    новые создаются bulk_create. Каждая пачка сохраняется в своей
+    транзакции, отклоненные строки попадают в отчет.
+
+    Если файл оборвался или испорчен посередине, импорт останавливается:
+    все записи до испорченной обработаны (сохранены или отклонены), а ее
+    номер и ошибка разбора попадают в report.stopped_at и report.error.
+    """
+    report = ImportReport()
+    batch = []
+    index = 0
+    items = iter(items)
+    while True:
+        try:
+            item = next(items)
+        except StopIteration:
+            break
+        except json.JSONDecodeError as e:
+            report.stop(index, str(e))
+            break
+        batch.append((index, item))
+        index += 1
+        if len(batch) >= batch_size:
+            _import_batch(model, batch, report)
+            batch = []
+    if batch:
+        _import_batch(model, batch, report)
+    return report
@@ -0,0 +1,81 @@
+import json
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from adminapp.exports import EXPORT_FORMATS, stream_csv, stream_json, stream_jsonl, write_xlsx
+from api.benchmarks import create_airports, create_board, create_flights, rolled_back
+from api.models import FlightSeat
+
+
+def export_all_at_once(queryset):
+    # Прежний экспорт: вся таблица списком в памяти и одной строкой JSON
+    return [json.dumps(list(queryset.values()), cls=DjangoJSONEncoder)]
+
+
+def export_xlsx(queryset):
+    with tempfile.TemporaryFile() as output:
+        write_xlsx(queryset, output)
+    return []
+
+
+EXPORTS = {
+    'all-at-once': export_all_at_once,
+    'json': stream_json,
+    'jsonl': stream_jsonl,
+    'csv': stream_csv,
+    'xlsx': export_xlsx,
+}
+
+
+def measure(export, queryset):
+    """
+    Пик памяти Python (tracemalloc) и время полного чтения экспорта:
+    части потока отбрасываются, как после отправки клиенту.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for _ in export(queryset):
+            pass
+        return tracemalloc.get_traced_memory()[1], time.perf_counter() - started
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пик памяти экспорта мест рейсов из панели администратора: прежняя '
+        'выгрузка целиком против потоковых JSON, JSON Lines, CSV и XLSX. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='Размеры таблицы')
+        parser.add_argument('--formats', nargs='+', choices=list(EXPORTS), default=list(EXPORTS))
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['rows'])
+        if sizes[0] < 1:
+            raise CommandError('Нужна хотя бы одна строка')
+        assert set(EXPORTS) - {'all-at-once'} == set(EXPORT_FORMATS)
+
+        with rolled_back():
+            flight = create_flights(create_board(1, 1), create_airports(2), 1)[0]
+            queryset = FlightSeat.objects.filter(flight=flight)
+            total = 0
+            for size in sizes:
+                seats = [
+                    FlightSeat(flight=flight, seat=number % 10 + 1, row_number=number // 10 + 1, status='available', seat_type='Economy')
+                    for number in range(total, size)
+                ]
+                FlightSeat.objects.bulk_create(seats, batch_size=5000)
+                total = size
+                self.stdout.write(f'Строк: {total}')
+                for name in options['formats']:
+                    peak, elapsed = measure(EXPORTS[name], queryset)
+                    self.stdout.write(f'    {name}: пик {peak / 2 ** 20:.1f} МБ, {elapsed:.1f} с')
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
@@ -0,0 +1,71 @@
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from adminapp.imports import import_items, iter_json_items
+from api.benchmarks import create_airports, create_board, create_flights, rolled_back
+from api.models import FlightSeat
+
+
+def import_per_item(fileobj):
+    # Прежний импорт панели: файл целиком в памяти, save() на каждую запись
+    for item in json.load(fileobj):
+        FlightSeat(**item).save()
+
+
+def seats_file(flight, start, count):
+    items = [
+        {'flight_id': flight.id, 'seat': number % 10 + 1, 'row_number': number // 10 + 1, 'status': 'available', 'seat_type': 'Economy'}
+        for number in range(start, start + count)
+    ]
+    return io.BytesIO(json.dumps(items).encode())
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность импорта мест рейсов: прежний save() на каждую '
+        'запись против пакетного import_items. Данные создаются в транзакции '
+        'и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help='Размеры файла')
+        parser.add_argument(
+            '--per-item-limit', type=int, default=10000,
+            help='Больше записей прежним путем не импортируется: он идет минуты',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['rows']) < 1:
+            raise CommandError('Нужна хотя бы одна запись')
+
+        with rolled_back():
+            flight = create_flights(create_board(1, 1), create_airports(2), 1)[0]
+            imported = 0
+            for count in options['rows']:
+                per_item = None
+                if count <= options['per_item_limit']:
+                    per_item_file = seats_file(flight, imported, count)
+                    started = time.perf_counter()
+                    import_per_item(per_item_file)
+                    per_item = time.perf_counter() - started
+                    imported += count
+
+                batched_file = seats_file(flight, imported, count)
+                started = time.perf_counter()
+                report = import_items(FlightSeat, iter_json_items(batched_file))
+                batched = time.perf_counter() - started
+                imported += count
+                if report.created != count:
+                    raise CommandError(f'Импортировано {report.created} из {count}: {report.rejected[:3]}')
+
+                if per_item is None:
+                    self.stdout.write(f'{count} записей: пакетно {count / batched:.0f} записей/с')
+                else:
+                    self.stdout.write(
+                        f'{count} записей: по одной {count / per_item:.0f} записей/с, '
+                        f'пакетно {count / batched:.0f} записей/с, ускорение {per_item / batched:.1f}x'
+                    )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
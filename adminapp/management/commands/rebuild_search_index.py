@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from adminapp.search import rebuild_index, searchable_fields
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс панели администратора.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Имена моделей api (по умолчанию все)')
+
+    def handle(self, *args, **options):
+        if options['models']:
+            model_classes = [apps.get_model('api', name) for name in options['models']]
+        else:
+            model_classes = [m for m in apps.get_app_config('api').get_models() if searchable_fields(m)]
+
+        for model_class in model_classes:
+            total = rebuild_index(model_class)
+            self.stdout.write(f'{model_class.__name__}: {total}')
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен'))
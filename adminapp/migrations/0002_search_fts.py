@@ -0,0 +1,64 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:10
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE adminapp_searchdocument_fts USING fts5(
+        body, content='adminapp_searchdocument', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER adminapp_searchdocument_ai AFTER INSERT ON adminapp_searchdocument BEGIN
+        INSERT INTO adminapp_searchdocument_fts(rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER adminapp_searchdocument_ad AFTER DELETE ON adminapp_searchdocument BEGIN
+        INSERT INTO adminapp_searchdocument_fts(adminapp_searchdocument_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER adminapp_searchdocument_au AFTER UPDATE ON adminapp_searchdocument BEGIN
+        INSERT INTO adminapp_searchdocument_fts(adminapp_searchdocument_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO adminapp_searchdocument_fts(rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS adminapp_searchdocument_au",
+    "DROP TRIGGER IF EXISTS adminapp_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS adminapp_searchdocument_ai",
+    "DROP TABLE IF EXISTS adminapp_searchdocument_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX adminapp_searchdocument_tsv ON adminapp_searchdocument USING GIN (to_tsvector('simple', body))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS adminapp_searchdocument_tsv",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_statements({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
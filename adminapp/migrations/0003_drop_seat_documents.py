@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def drop_seat_documents(apps, schema_editor):
+    # Места ищутся через icontains (SEARCH_EXCLUDE_MODELS): их документы больше не нужны
+    SearchDocument = apps.get_model('adminapp', 'SearchDocument')
+    SearchDocument.objects.filter(model_label__in=['api.flightseat', 'api.boardseat']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminapp', '0002_search_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_seat_documents, migrations.RunPython.noop),
+    ]
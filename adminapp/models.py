@@ -1,3 +1,17 @@
 from django.db import models
 
-# Create your models here.
+
+class SearchDocument(models.Model):
+    model_label = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.BigIntegerField(verbose_name="ID объекта")
+    body = models.TextField(verbose_name="Текст")
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id}"
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+        constraints = [
+            models.UniqueConstraint(fields=['model_label', 'object_id'], name='search_document_unique'),
+        ]
@@ -0,0 +1,178 @@
+import re
+
+from django.db import connection, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from encrypted_model_fields.fields import EncryptedMixin
+
+from .models import SearchDocument
+
+
+SEARCH_LIMIT = 500
+REBUILD_BATCH_SIZE = 2000
+# Поля, которые не попадают в индекс (хеши паролей и т.п.)
+SEARCH_EXCLUDE = {'password'}
+# Модели, которые ищутся через icontains без индекса: места создаются
+# пакетно (materialize_flight_seats, save_board_layout) мимо сигналов, а
+# единственное текстовое поле — тип места; документ на каждое место
+# удвоил бы запись при создании рейсов и бортов
+SEARCH_EXCLUDE_MODELS = {'api.flightseat', 'api.boardseat'}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def searchable_fields(model_class):
+    """
+    Текстовые поля модели, участвующие в полнотекстовом поиске.
+    Зашифрованные поля не индексируются, чтобы не хранить их открытым текстом.
+    """
+    if model_class._meta.label_lower in SEARCH_EXCLUDE_MODELS:
+        return []
+    return [
+        field.attname for field in model_class._meta.fields
+        if isinstance(field, (models.CharField, models.TextField))
+        and not isinstance(field, EncryptedMixin)
+        and not field.choices
+        and field.name not in SEARCH_EXCLUDE
+    ]
+
+
+def search_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def document_body(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def index_instance(instance):
+    fields = searchable_fields(type(instance))
+    if not fields:
+        return
+    body = document_body(getattr(instance, name) for name in fields)
+    SearchDocument.objects.update_or_create(
+        model_label=instance._meta.label_lower,
+        object_id=instance.pk,
+        defaults={'body': body},
+    )
+
+
+def remove_instance(instance):
+    SearchDocument.objects.filter(model_label=instance._meta.label_lower, object_id=instance.pk).delete()
+
+
+def index_instances(model_class, instances):
+    """
+    Пакетно обновляет документы объектов (для bulk_create/bulk_update).
+    """
+    fields = searchable_fields(model_class)
+    if not fields:
+        return
+    label = model_class._meta.label_lower
+    SearchDocument.objects.filter(model_label=label, object_id__in=[obj.pk for obj in instances]).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(
+            model_label=label,
+            object_id=obj.pk,
+            body=document_body(getattr(obj, name) for name in fields),
+        )
+        for obj in instances
+    ], batch_size=REBUILD_BATCH_SIZE)
+
+
+def rebuild_index(model_class):
+    """
+    Полностью перестраивает документы модели. Возвращает их количество.
+    """
+    label = model_class._meta.label_lower
+    fields = searchable_fields(model_class)
+    SearchDocument.objects.filter(model_label=label).delete()
+    if not fields:
+        return 0
+
+    total = 0
+    batch = []
+    rows = model_class._base_manager.values_list('pk', *fields).iterator(chunk_size=REBUILD_BATCH_SIZE)
+    for pk, *values in rows:
+        batch.append(SearchDocument(model_label=label, object_id=pk, body=document_body(values)))
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        SearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _match_sql(model_class, query):
+    """
+    SQL документов модели, подходящих под запрос: (FROM ... WHERE ...,
+    параметры, выражение ранга и его параметры; меньший ранг — выше).
+    Каждое слово запроса ищется как префикс. None, если СУБД не
+    поддерживает полнотекстовый индекс.
+    """
+    if not search_supported() or not searchable_fields(model_class):
+        return None
+
+    tokens = TOKEN_RE.findall(query)
+    label = model_class._meta.label_lower
+    if not tokens:
+        return 'FROM adminapp_searchdocument d WHERE 1 = 0', [], 'd.id', []
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        return (
+            "FROM adminapp_searchdocument_fts f "
+            "JOIN adminapp_searchdocument d ON d.id = f.rowid "
+            "WHERE adminapp_searchdocument_fts MATCH %s AND d.model_label = %s",
+            [f'body : ({match})', label],
+            'bm25(adminapp_searchdocument_fts)',
+            [],
+        )
+    tsquery = ' & '.join(f'{token}:*' for token in tokens)
+    return (
+        "FROM adminapp_searchdocument d "
+        "WHERE d.model_label = %s AND to_tsvector('simple', d.body) @@ to_tsquery('simple', %s)",
+        [label, tsquery],
+        "-ts_rank(to_tsvector('simple', d.body), to_tsquery('simple', %s))",
+        [tsquery],
+    )
+
+
+def search_condition(model_class, query):
+    """
+    Условие «объект подходит под запрос» для filter(): подзапрос к индексу
+    без ограничения числа совпадений, поэтому его можно сочетать с любыми
+    другими фильтрами. None, если полнотекстовый индекс недоступен.
+    """
+    match = _match_sql(model_class, query)
+    if match is None:
+        return None
+    sql, params, _, _ = match
+    return Q(pk__in=RawSQL(f'SELECT d.object_id {sql}', params))
+
+
+def search_ids(model_class, query, limit=SEARCH_LIMIT, within=None):
+    """
+    Первые limit ID объектов модели по запросу, упорядоченные по
+    релевантности, — для сортировки выдачи, а не для фильтрации: более
+    слабые совпадения сюда не попадают. within — необязательный queryset
+    модели, которым ограничиваются кандидаты. None, если СУБД не
+    поддерживает полнотекстовый индекс.
+    """
+    match = _match_sql(model_class, query)
+    if match is None:
+        return None
+    sql, params, rank_sql, rank_params = match
+    if within is not None:
+        within_sql, within_params = within.order_by().values('pk').query.sql_with_params()
+        sql = f'{sql} AND d.object_id IN ({within_sql})'
+        params = [*params, *within_params]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT d.object_id {sql} ORDER BY {rank_sql} LIMIT %s',
+            [*params, *rank_params, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
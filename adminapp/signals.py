@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .facets import invalidate_facets
+from .search import index_instance, remove_instance, searchable_fields
+
+
+@receiver([post_save, post_delete])
+def reset_model_facets(sender, **kwargs):
+    # Варианты фильтров панели зависят от содержимого моделей api
+    if sender._meta.app_label == 'api':
+        invalidate_facets(sender)
+
+
+@receiver(post_save)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if sender._meta.app_label == 'api' and not raw and searchable_fields(sender):
+        index_instance(instance)
+
+
+@receiver(post_delete)
+def delete_search_document(sender, instance, **kwargs):
+    if sender._meta.app_label == 'api' and searchable_fields(sender):
+        remove_instance(instance)
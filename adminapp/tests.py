@@ -1,3 +1,127 @@
+import csv
+import io
+import json
+
 from django.test import TestCase
 
-# Create your tests here.
+from api.models import BoardSeat, FlightSeat, Place, Ticket
+from api.rollups import compute_rollups, stored_rollups
+from api.tests import create_client, create_flight
+
+from .exports import EXPORT_CHUNK_SIZE
+from .imports import import_items, iter_json_items
+from .search import SEARCH_LIMIT, index_instances, search_condition, search_ids
+
+
+class ImportItemsTests(TestCase):
+
+    def test_report_for_invalid_rows(self):
+        data = b'{"name": "A"}\n{"name": "B", "unknown": 1}\n{"name": "C"}\n'
+        report = import_items(Place, iter_json_items(io.BytesIO(data)), batch_size=2)
+        self.assertEqual(report.created, 2)
+        self.assertEqual([row['index'] for row in report.rejected], [1])
+        self.assertIsNone(report.error)
+
+    def test_malformed_line_stops_import(self):
+        # Пачки до испорченной строки уже сохранены — отчет говорит, где остановились
+        data = b'{"name": "A"}\n{"name": "B"}\n{"name": "C"}\n{"name": \n{"name": "E"}\n'
+        report = import_items(Place, iter_json_items(io.BytesIO(data)), batch_size=2)
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.stopped_at, 3)
+        self.assertIsNotNone(report.error)
+        self.assertEqual(report.as_dict()['stopped_at'], 3)
+        self.assertEqual(sorted(Place.objects.values_list('name', flat=True)), ['A', 'B', 'C'])
+
+    def test_imported_tickets_update_sales_rollups(self):
+        flight = create_flight()
+        client = create_client('buyer')
+        seat_ids = FlightSeat.objects.filter(flight=flight).values_list('id', flat=True)
+        data = '\n'.join(
+            json.dumps({'client': client.id, 'flight_seat': seat_id, 'price': 100.0, 'is_paid': True, 'paid_at': '2026-01-01T00:00:00Z'})
+            for seat_id in seat_ids
+        ).encode()
+        report = import_items(Ticket, iter_json_items(io.BytesIO(data)))
+        self.assertEqual(report.created, len(seat_ids))
+        self.assertEqual(stored_rollups([flight.id]), compute_rollups([flight.id]))
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        places = Place.objects.bulk_create([Place(name=f'Alpha {number}') for number in range(SEARCH_LIMIT + 100)])
+        index_instances(Place, places)
+
+    def test_filter_is_not_capped(self):
+        matches = search_condition(Place, 'alph')
+        self.assertEqual(Place.objects.filter(matches).count(), SEARCH_LIMIT + 100)
+        # Совпадение за пределами первых SEARCH_LIMIT не теряется при других фильтрах
+        last = Place.objects.filter(matches, name=f'Alpha {SEARCH_LIMIT + 99}')
+        self.assertEqual(last.count(), 1)
+        self.assertEqual(search_ids(Place, 'alph', within=last), [last.get().pk])
+        self.assertEqual(len(search_ids(Place, 'alph')), SEARCH_LIMIT)
+
+    def search_dashboard(self, model_name, query):
+        response = self.client.get('/dashboard/', {'model_name': model_name, 'search': query, 'export': 'json'})
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_seats_found_right_after_flight_creation(self):
+        # Места борта и рейса создаются пакетно, мимо сигналов индекса
+        flight = create_flight()
+        self.assertIsNone(search_condition(FlightSeat, 'Business'))
+        self.assertIsNone(search_condition(BoardSeat, 'Business'))
+
+        seats = self.search_dashboard('FlightSeat', 'Business')
+        self.assertEqual([(seat['flight_id'], seat['seat_type']) for seat in seats], [(flight.id, 'Business')] * 2)
+        self.assertEqual(len(self.search_dashboard('BoardSeat', 'business')), 2)
+
+    def test_no_tokens(self):
+        self.assertFalse(Place.objects.filter(search_condition(Place, '  ')).exists())
+        self.assertEqual(search_ids(Place, '  '), [])
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Больше одной порции iterator(), чтобы поток читался несколькими запросами
+        Place.objects.bulk_create([Place(name=f'Export {number}') for number in range(EXPORT_CHUNK_SIZE + 5)])
+        Place.objects.create(name='Other')
+
+    def export(self, export_format, **params):
+        return self.client.get('/dashboard/', {'model_name': 'Place', 'export': export_format, **params})
+
+    def streamed(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_json(self):
+        rows = json.loads(self.streamed(self.export('json')))
+        self.assertEqual(len(rows), EXPORT_CHUNK_SIZE + 6)
+        self.assertEqual(set(rows[0]), {'id', 'name', 'latitude', 'longitude', 'is_deleted'})
+
+    def test_jsonl(self):
+        response = self.export('jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.streamed(response).splitlines()
+        self.assertEqual(len(lines), EXPORT_CHUNK_SIZE + 6)
+        self.assertEqual(json.loads(lines[-1])['name'], 'Other')
+
+    def test_csv(self):
+        response = self.export('csv')
+        self.assertIn('Place_data.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self.streamed(response))))
+        self.assertEqual(rows[0], ['id', 'name', 'latitude', 'longitude', 'is_deleted'])
+        self.assertEqual(len(rows), EXPORT_CHUNK_SIZE + 7)
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.export('xlsx', name='Other')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook['Place'].values)
+        self.assertEqual(rows[0], ('id', 'name', 'latitude', 'longitude', 'is_deleted'))
+        self.assertEqual([row[1] for row in rows[1:]], ['Other'])
+
+    def test_filters_respected(self):
+        rows = json.loads(self.streamed(self.export('json', name='Other')))
+        self.assertEqual([row['name'] for row in rows], ['Other'])
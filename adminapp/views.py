@@ -15,14 +15,20 @@ from django.shortcuts import render, redirect
 from django.http import HttpResponse, Http404
 from django.core.paginator import Paginator
 from django.db.models import Q
-import json
-from django.core.serializers.json import DjangoJSONEncoder
-from django.core.exceptions import ValidationError
+from .exports import EXPORT_FORMATS, export_response
+from .imports import import_items, iter_json_items
+from .facets import autocomplete, filter_lookups, get_facets, invalidate_facets
+from .search import search_condition, search_ids
+from api.blind_index import blind_search
+from django.db.models import Case, Value, When
+from django.contrib import messages
 
 import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 BACKUP_DIR = settings.BACKUP_DIR
+# Сколько отклоненных записей показывать в сообщении об импорте
+IMPORT_REJECTS_SHOWN = 10
 
 import os
 import time
@@ -55,40 +61,42 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
     if is_verbose:
         print(f"Working with model: {current_model.__name__}")
 
-    objects = current_model.objects.all()
+    facet_field = request.GET.get('facet')
+    if facet_field:
+        if facet_field not in filter_lookups(current_model) or '__' in facet_field:
+            raise Http404(f"Field '{facet_field}' not found")
+        return JsonResponse({'options': autocomplete(current_model, facet_field, request.GET.get('q', ''))})
 
-    filters = {}
-    for field in current_model._meta.fields:
-        if is_verbose:
-            print(f"Processing field: {field.name} ({type(field).__name__})")
-        if field.choices:
-            filters[field.name] = [choice[0] for choice in field.choices]
-        elif isinstance(field, (models.CharField, models.TextField)):
-            filters[field.name] = current_model.objects.values_list(field.name, flat=True).distinct()
-        elif isinstance(field, (models.ForeignKey, models.OneToOneField)):
-            related_model = field.related_model
-            if related_model:
-                related_fields = [f.name for f in related_model._meta.fields if isinstance(f, (models.CharField, models.TextField))]
-                display_field = related_fields[0] if related_fields else 'id'
-                filters[field.name] = related_model.objects.values_list('id', display_field).distinct()
-        elif isinstance(field, (models.IntegerField, models.DecimalField, models.FloatField)):
-            filters[field.name] = current_model.objects.values_list(field.name, flat=True).distinct()
-
-    filter_params = {key: value for key, value in request.GET.items() if key in filters and value}
+    objects = current_model._default_manager.all()
+
+    lookups = filter_lookups(current_model)
+    filter_params = {key: value for key, value in request.GET.items() if key in lookups and value}
     for field_name, field_value in filter_params.items():
         objects = objects.filter(**{field_name: field_value})
 
     search_query = request.GET.get('search', '')
-    if search_query:
+    matches = search_condition(current_model, search_query) if search_query else None
+    ranked_ids = None
+    if matches is not None:
+        # Ранжированные id задают только порядок: фильтр — подзапрос без лимита
+        ranked_ids = search_ids(current_model, search_query, within=objects)
+        objects = objects.filter(matches | blind_search(current_model, search_query))
+    elif search_query:
         search_filter = Q()
         for field in current_model._meta.fields:
             if isinstance(field, (models.CharField, models.TextField)):
                 search_filter |= Q(**{f"{field.name}__icontains": search_query})
-        objects = objects.filter(search_filter)
+        objects = objects.filter(search_filter | blind_search(current_model, search_query))
 
     sort_by = request.GET.get('sort', '')
     if sort_by:
         objects = objects.order_by(sort_by)
+    elif ranked_ids:
+        objects = objects.order_by(Case(
+            *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ranked_ids)],
+            default=Value(len(ranked_ids)),
+            output_field=models.IntegerField(),
+        ), 'pk')
 
     paginator = Paginator(objects, 8)
     page_number = request.GET.get('page')
@@ -96,14 +104,9 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
 
     field_verbose_names = get_field_verbose_names(current_model)
 
-    if request.GET.get('export') == 'json':
-        data = list(objects.values())
-        response = HttpResponse(
-            json.dumps(data, cls=DjangoJSONEncoder),
-            content_type='application/json'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{model_name}_data.json"'
-        return response
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        return export_response(objects, model_name, export_format)
     
     if request.method == 'POST' and 'import_json' in request.POST:
         json_file = request.FILES.get('json_file')
@@ -111,27 +114,34 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
             return HttpResponse('No file uploaded.', status=400)
 
         try:
-            data = json.load(json_file)
-            if not isinstance(data, list):
-                raise ValidationError("Invalid data format: expected a list of objects.")
-            
-            for item in data:
-                try:
-                    instance = current_model(**item)
-                    instance.save()
-                except Exception as e:
-                    if is_verbose:
-                        print(f"Error saving item: {item}. Error: {str(e)}")
-
-            return redirect(f'/dashboard?model_name={model_name}')
-
-        except json.JSONDecodeError:
-            return HttpResponse('Invalid JSON file.', status=400)
-        except ValidationError as e:
-            return HttpResponse(f'Validation error: {str(e)}', status=400)
+            report = import_items(current_model, iter_json_items(json_file))
         except Exception as e:
             return HttpResponse(f'Error while importing data: {str(e)}', status=500)
 
+        invalidate_facets(current_model)
+        if is_verbose:
+            print(f"Imported {model_name}: {report.as_dict()}")
+        if request.POST.get('report') == 'json':
+            if report.error is not None:
+                return JsonResponse(report.as_dict(), status=400)
+            return JsonResponse(report.as_dict(), status=200 if not report.rejected else 207)
+
+        summary = f'Создано: {report.created}, обновлено: {report.updated}, отклонено: {len(report.rejected)}'
+        if report.error is not None:
+            messages.error(
+                request,
+                f'Файл испорчен в записи {report.stopped_at}: {report.error}. '
+                f'Импорт остановлен, записи до нее обработаны. {summary}',
+            )
+        elif report.rejected:
+            shown = '; '.join(
+                f"запись {row['index']}: {' '.join(row['errors'])}" for row in report.rejected[:IMPORT_REJECTS_SHOWN]
+            )
+            messages.warning(request, f'{summary}. {shown}')
+        else:
+            messages.success(request, summary)
+        return redirect(f'/dashboard?model_name={model_name}')
+
     form = current_form()
 
     if request.method == 'POST' and 'import_json' not in request.POST:
@@ -158,7 +168,7 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
             elif action == 'update':
                 obj_id = request.POST.get('id')
                 try:
-                    obj = current_model.objects.get(id=obj_id)
+                    obj = current_model._default_manager.get(id=obj_id)
                     form = current_form(request.POST, instance=obj)
                     if form.is_valid():
                         form.save()
@@ -170,7 +180,7 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
                 obj_id = request.POST.get('id')
                 if obj_id:
                     try:
-                        obj = current_model.objects.get(id=obj_id)
+                        obj = current_model._default_manager.get(id=obj_id)
                         obj.delete()
                         if is_verbose:
                             print(f"Deleted object {obj_id} successfully.")
@@ -183,6 +193,7 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
                     return redirect('/dashboard')
 
     form = current_form()
+    filters = get_facets(current_model)
 
     context = {
         'model_name': model_name,
@@ -196,7 +207,8 @@ def generic_dashboard(request, model_form_map, is_verbose=False):
         'search_query': search_query,
         'filter_params': filter_params,
         'sort_by': sort_by,
-        'field_verbose_names': field_verbose_names
+        'field_verbose_names': field_verbose_names,
+        'export_formats': list(EXPORT_FORMATS),
     }
 
     return render(request, 'admin_dashboard.html', context)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     User, Client, Employee, FlightSeat, Ticket, BoardSeat, 
-    Place, Airport, Flight, Board, Model, Manufacturer
+    Place, Airport, Flight, FareClass, FlightSalesDaily, Board, Model, Manufacturer
 )
 
 class CustomUserAdmin(admin.ModelAdmin):
@@ -52,6 +52,16 @@ class FlightAdmin(admin.ModelAdmin):
     list_filter = ('is_deleted', 'departure_airport', 'arrival_airport')
     search_fields = ('departure_airport__name', 'arrival_airport__name', 'board__board_number')
 
+class FareClassAdmin(admin.ModelAdmin):
+    list_display = ('id', 'flight', 'seat_type', 'code', 'min_load_factor', 'multiplier', 'is_deleted')
+    list_filter = ('is_deleted', 'seat_type')
+    search_fields = ('code', 'flight__id')
+
+class FlightSalesDailyAdmin(admin.ModelAdmin):
+    list_display = ('id', 'flight', 'day', 'sold', 'cancelled', 'paid', 'revenue', 'paid_revenue')
+    list_filter = ('day',)
+    search_fields = ('flight__id',)
+
 class BoardAdmin(admin.ModelAdmin):
     list_display = ('id', 'model', 'board_number', 'year', 'seats_amount', 'is_deleted')
     list_filter = ('is_deleted', 'year')
@@ -77,6 +87,8 @@ admin.site.register(BoardSeat, BoardSeatAdmin)
 admin.site.register(Place, PlaceAdmin)
 admin.site.register(Airport, AirportAdmin)
 admin.site.register(Flight, FlightAdmin)
+admin.site.register(FareClass, FareClassAdmin)
+admin.site.register(FlightSalesDaily, FlightSalesDailyAdmin)
 admin.site.register(Board, BoardAdmin)
 admin.site.register(Model, ModelAdmin)
 admin.site.register(Manufacturer, ManufacturerAdmin)
@@ -0,0 +1,193 @@
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Flight, FlightSeat
+from .search import asearch_flights
+from .serializers import FlightSeatSerializer, FlightSerializer, expand_flights, parse_expand
+from .views import FlightSeatViewSet, FlightViewSet
+from .viewsets import BaseModelViewSet, ModelQueryMixin
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_filter(ordering, values):
+    """
+    Условие "строго после" для ключа (f1, ..., fn):
+    f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...
+    """
+    condition = Q(pk__in=[])
+    for index, field in enumerate(ordering):
+        step = Q(**{f'{field}__gt': values[index]})
+        for previous, value in zip(ordering[:index], values):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+async def paginate_keyset(request, queryset, ordering, page_size, max_page_size):
+    """
+    Асинхронная keyset-пагинация вперед по ordering (последнее поле —
+    уникальное). Возвращает (объекты страницы, ссылка на следующую).
+    Курсор непрозрачен и несовместим с курсорами DRF синхронных ручек.
+    """
+    try:
+        size = min(int(request.GET.get('page_size', page_size)), max_page_size)
+    except ValueError:
+        size = page_size
+    size = max(size, 1)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError('Invalid cursor')
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    items = [item async for item in queryset.order_by(*ordering)[:size + 1]]
+    next_url = None
+    if len(items) > size:
+        items = items[:size]
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor([getattr(items[-1], field) for field in ordering])
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return items, next_url
+
+
+def page_response(results, next_url):
+    return JsonResponse({'next': next_url, 'previous': None, 'results': results})
+
+
+def error_response(error, status=400):
+    return JsonResponse({'error': str(error)}, status=status)
+
+
+async def find_flights(request):
+    """
+    Асинхронный вариант api.views.find_flights для ASGI: те же параметры
+    и формат ответа, страницы только вперед.
+    """
+    if request.method != 'GET':
+        return error_response('Method not allowed', status=405)
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    min_seats = request.GET.get('min_seats')
+
+    try:
+        min_seats = int(min_seats) if min_seats else None
+        if start_date:
+            start_date = parse_datetime(start_date)
+        if end_date:
+            end_date = parse_datetime(end_date)
+
+        expand = parse_expand(request)
+        flights = expand_flights(
+            await asearch_flights(request.GET.get('departure_place'), request.GET.get('arrival_place'), start_date, end_date, min_seats),
+            expand,
+        )
+        page, next_url = await paginate_keyset(request, flights, ('departure_time', 'id'), 50, 200)
+    except Exception as e:
+        return error_response(e)
+
+    return page_response(FlightSerializer(page, many=True, context={'expand': expand}).data, next_url)
+
+
+class AsyncReadView(ModelQueryMixin, View):
+    """
+    Асинхронные list/retrieve для частых GET-запросов без пула потоков.
+
+    Фильтры берутся из соответствующего BaseModelViewSet, поддерживается
+    ?fields=a,b; доступ — как у BaseModelViewSet. Связанные объекты
+    должны подгружаться в get_queryset (select_related): сериализатор
+    не должен обращаться к базе.
+    """
+    http_method_names = ['get']
+    serializer_class = None
+    permission_classes = BaseModelViewSet.permission_classes
+    page_size = 100
+    max_page_size = 500
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def get_serializer_context(self):
+        return {'request': self.request}
+
+    def check_permissions(self, request):
+        """
+        Аутентификация DRF (JWT) и проверка permission_classes; синхронная —
+        токен сверяется с пользователем в базе. Возвращает ответ с ошибкой
+        или None, если доступ разрешен.
+        """
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            allowed = all(permission().has_permission(drf_request, self) for permission in self.permission_classes)
+        except APIException as e:
+            return error_response(e.detail, status=e.status_code)
+        if allowed:
+            return None
+        if not drf_request.user.is_authenticated:
+            return error_response(NotAuthenticated.default_detail, status=401)
+        return error_response(PermissionDenied.default_detail, status=403)
+
+    def serialize(self, data, many=False):
+        serializer = self.serializer_class(data, many=many, context=self.get_serializer_context())
+        fields = self.get_sparse_fields()
+        if fields:
+            self.drop_unrequested_fields(serializer.child if many else serializer, fields)
+        return serializer.data
+
+    async def get(self, request, pk=None):
+        denied = await sync_to_async(self.check_permissions)(request)
+        if denied is not None:
+            return denied
+
+        if pk is not None:
+            try:
+                item = await self.get_queryset().aget(pk=pk)
+            except self.model.DoesNotExist:
+                return error_response('Not found.', status=404)
+            return JsonResponse(self.serialize(item), safe=False)
+
+        try:
+            queryset = self.only_sparse_fields(self.filter_queryset(self.get_queryset()), self.get_sparse_fields())
+            page, next_url = await paginate_keyset(request, queryset, ('pk',), self.page_size, self.max_page_size)
+        except (ValueError, TypeError, ValidationError) as e:
+            return error_response(e)
+        return page_response(self.serialize(page, many=True), next_url)
+
+
+class FlightReadView(AsyncReadView):
+    model = Flight
+    serializer_class = FlightSerializer
+    filter_fields = FlightViewSet.filter_fields
+
+    def get_queryset(self):
+        return expand_flights(Flight.all_objects.all(), parse_expand(self.request))
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'expand': parse_expand(self.request)}
+
+
+class FlightSeatReadView(AsyncReadView):
+    model = FlightSeat
+    serializer_class = FlightSeatSerializer
+    filter_fields = FlightSeatViewSet.filter_fields
@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Airport, Board, Flight, Manufacturer, Model, Place
+from .seating import generate_layout, save_board_layout
+
+
+BENCHMARK_PREFIX = 'Bench'
+SCHEDULE_BATCH_SIZE = 5000
+
+
+def timed(function, repeat=1):
+    """
+    Медиана времени выполнения function за repeat запусков, в секундах.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+@contextmanager
+def rolled_back():
+    """
+    Транзакция замера, которая всегда откатывается; on_commit-действия
+    при этом не выполняются. SQLite после отката выдает те же id снова,
+    поэтому кеш, построенный по откатанным строкам, сбрасывается целиком.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            transaction.set_rollback(True)
+    finally:
+        cache.clear()
+
+
+def create_board(rows, seats, business=1, number=BENCHMARK_PREFIX):
+    manufacturer = Manufacturer.objects.create(name=BENCHMARK_PREFIX)
+    model = Model.objects.create(name=BENCHMARK_PREFIX, manufacturer=manufacturer)
+    board = Board.objects.create(model=model, board_number=number, year=2020, seats_amount=rows * seats)
+    save_board_layout(board, generate_layout(rows, seats, business))
+    return board
+
+
+def create_airports(count):
+    return [
+        Airport.objects.create(
+            place=Place.objects.create(name=f'{BENCHMARK_PREFIX} {number}'),
+            name=f'{BENCHMARK_PREFIX}{number}',
+            full_name=f'{BENCHMARK_PREFIX} {number}',
+        )
+        for number in range(count)
+    ]
+
+
+def create_flights(board, airports, count, start=None, step=timedelta(minutes=10)):
+    """
+    Рейсы одним bulk_create, без сигналов: мест у них нет, пока их не
+    создаст сам замер. Маршруты перебирают пары аэропортов по кругу.
+    """
+    start = start or timezone.now() + timedelta(days=1)
+    return Flight.objects.bulk_create([
+        Flight(
+            board=board,
+            departure_time=start + step * number,
+            arrival_time=start + step * number + timedelta(hours=2),
+            departure_airport=airports[number % len(airports)],
+            arrival_airport=airports[(number + 1) % len(airports)],
+            economy_class_price=100,
+            business_class_price=500,
+        )
+        for number in range(count)
+    ], batch_size=1000)
+
+
+def generate_schedule(board, airports, count, days=365, seed=0, start=None):
+    """
+    Синтетическое расписание: count рейсов по случайным маршрутам между
+    airports, равномерно на days дней вперед от start. Рейсы создаются
+    пачками bulk_create без мест; возвращает число созданных рейсов.
+    """
+    rng = random.Random(seed)
+    start = start or timezone.now()
+    span = days * 24 * 60
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(SCHEDULE_BATCH_SIZE, count - created)):
+            departure, arrival = rng.sample(airports, 2)
+            departure_time = start + timedelta(minutes=rng.randrange(span))
+            available = rng.randrange(0, 180)
+            batch.append(Flight(
+                board=board,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(minutes=rng.randrange(60, 600)),
+                departure_airport=departure,
+                arrival_airport=arrival,
+                economy_class_price=rng.randrange(50, 500),
+                business_class_price=rng.randrange(500, 2000),
+                economy_available=available,
+                economy_sold=180 - available,
+            ))
+        Flight.objects.bulk_create(batch)
+        created += len(batch)
+    return created
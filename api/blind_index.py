@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+
+BLIND_INDEX_SUFFIX = '_bidx'
+# Метка выведения ключа индекса из ключа шифрования
+BLIND_INDEX_LABEL = b'blind-index'
+REBUILD_BATCH_SIZE = 1000
+
+
+def normalize_name(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', str(value))
+
+
+def _encode(key):
+    return key.encode() if isinstance(key, str) else key
+
+
+def _key():
+    """
+    Ключ HMAC индекса: BLIND_INDEX_KEY или ключ, выведенный из
+    FIELD_ENCRYPTION_KEY с меткой BLIND_INDEX_LABEL, — ключ шифрования
+    напрямую не используется для другой цели.
+    """
+    key = getattr(settings, 'BLIND_INDEX_KEY', None)
+    if key:
+        return _encode(key)
+    return hmac.new(_encode(settings.FIELD_ENCRYPTION_KEY), BLIND_INDEX_LABEL, hashlib.sha256).digest()
+
+
+def blind_index(value, normalizer=normalize_name):
+    """
+    Ключевой HMAC-SHA256 нормализованного значения. Позволяет искать
+    зашифрованное поле по точному совпадению индексированным запросом,
+    не раскрывая само значение.
+    """
+    if value is None:
+        return None
+    normalized = normalizer(value)
+    if not normalized:
+        return None
+    return hmac.new(_key(), normalized.encode(), hashlib.sha256).hexdigest()
+
+
+def update_blind_indexes(instance, update_fields=None):
+    """
+    Пересчитывает колонки *_bidx объекта по его BLIND_INDEXES.
+    Возвращает дополненный update_fields (если он был передан в save()).
+    """
+    indexes = getattr(type(instance), 'BLIND_INDEXES', {})
+    extra = []
+    for field_name, normalizer in indexes.items():
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        setattr(instance, field_name + BLIND_INDEX_SUFFIX, blind_index(getattr(instance, field_name), normalizer))
+        extra.append(field_name + BLIND_INDEX_SUFFIX)
+    if update_fields is None:
+        return None
+    return list(update_fields) + extra
+
+
+def rebuild_blind_indexes(model_class):
+    """
+    Пересчитывает индексы всех строк модели (после смены ключа).
+    Возвращает число строк.
+    """
+    indexes = getattr(model_class, 'BLIND_INDEXES', {})
+    if not indexes:
+        return 0
+    columns = [field_name + BLIND_INDEX_SUFFIX for field_name in indexes]
+    total = 0
+    batch = []
+    for instance in model_class._base_manager.only('pk', *indexes).iterator(chunk_size=REBUILD_BATCH_SIZE):
+        update_blind_indexes(instance)
+        batch.append(instance)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            model_class._base_manager.bulk_update(batch, columns)
+            total += len(batch)
+            batch = []
+    if batch:
+        model_class._base_manager.bulk_update(batch, columns)
+        total += len(batch)
+    return total
+
+
+def blind_lookup(model_class, field_name, value):
+    """
+    Условие точного поиска по зашифрованному полю через его blind index.
+    """
+    normalizer = model_class.BLIND_INDEXES[field_name]
+    return Q(**{field_name + BLIND_INDEX_SUFFIX: blind_index(value, normalizer)})
+
+
+def blind_search(model_class, query):
+    """
+    Условие поиска строки query по любому зашифрованному полю модели.
+    """
+    condition = Q(pk__in=[])
+    for field_name, normalizer in getattr(model_class, 'BLIND_INDEXES', {}).items():
+        digest = blind_index(query, normalizer)
+        if digest:
+            condition |= Q(**{field_name + BLIND_INDEX_SUFFIX: digest})
+    return condition
@@ -0,0 +1,190 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import move_seat, refresh_inventory
+from .models import FlightSeat, Ticket
+from .pricing import PRICING_FIELDS, fare_for, refresh_min_prices
+from .revenue import revenue_seats_changed
+from .rollups import record_sales
+from .seatmap import invalidate_seat_map
+from .seatstream import publish_seat_status
+
+
+SEAT_HOLD_TTL = timedelta(minutes=15)
+HOLD_SWEEP_BATCH_SIZE = 1000
+
+
+def seat_hold_ttl():
+    return getattr(settings, 'SEAT_HOLD_TTL', SEAT_HOLD_TTL)
+
+
+def seat_status_changed(flight_id, seat_id, status):
+    """
+    Сбрасывает закешированную карту мест и оповещает подписчиков рейса.
+    Вызывается из on_commit, когда изменение уже видно в базе.
+    """
+    invalidate_seat_map(flight_id)
+    publish_seat_status(flight_id, seat_id, status)
+
+
+def book_seat(client, seat_id, flight_id=None, hold=False):
+    """
+    Атомарно бронирует место и создает билет.
+
+    Место занимается условным UPDATE ... WHERE status='available', поэтому
+    из нескольких одновременных покупателей выигрывает ровно один, а
+    остальные сразу получают FlightSeat.DoesNotExist без повторных попыток.
+    На PostgreSQL место читается с FOR UPDATE SKIP LOCKED: место, которое
+    в эту секунду покупает другая транзакция, считается занятым, и запрос
+    не ждет ее завершения.
+
+    С hold=True место не продается, а удерживается на seat_hold_ttl():
+    неоплаченное к этому сроку удержание снимает release_expired_holds.
+    """
+    seats = FlightSeat.objects.filter(id=seat_id, status='available')
+    if flight_id is not None:
+        seats = seats.filter(flight_id=flight_id)
+
+    status = 'held' if hold else 'sold'
+    held_until = timezone.now() + seat_hold_ttl() if hold else None
+
+    with transaction.atomic():
+        # Цена фиксируется в месте по тарифу на момент бронирования
+        seat = seats.select_for_update(skip_locked=True, of=('self',)).select_related('flight').only(
+            'flight_id', 'seat_type', *(f'flight__{field}' for field in PRICING_FIELDS)
+        ).first()
+        if seat is None:
+            raise FlightSeat.DoesNotExist('Seat not available or already sold.')
+        price = fare_for(seat.flight, seat.seat_type).price
+        if not seats.update(status=status, held_until=held_until, price=price):
+            raise FlightSeat.DoesNotExist('Seat not available or already sold.')
+        # Продажу в дневную сводку записывает сигнал сохранения билета
+        ticket = Ticket.objects.create(client=client, flight_seat_id=seat_id, price=price)
+        flight_id, seat_type = seat.flight_id, seat.seat_type
+        move_seat(flight_id, seat_type, 'available', status)
+        refresh_min_prices([flight_id])
+        transaction.on_commit(lambda: seat_status_changed(flight_id, seat_id, status))
+    ticket.held_until = held_until
+    return ticket
+
+
+def pay_ticket(ticket):
+    """
+    Оплачивает билет и атомарно переводит удержанное место в проданные.
+
+    Повторная оплата получает Ticket.DoesNotExist, оплата после истечения
+    удержания — FlightSeat.DoesNotExist (место уже могло уйти другому).
+    """
+    with transaction.atomic():
+        if not Ticket.objects.filter(id=ticket.id, is_paid=False, is_canceled=False).update(is_paid=True, paid_at=timezone.now()):
+            raise Ticket.DoesNotExist('Ticket not found or already paid.')
+        seats = FlightSeat.all_objects.filter(id=ticket.flight_seat_id)
+        if seats.filter(status='held', held_until__gt=timezone.now()).update(status='sold', held_until=None):
+            flight_id, seat_type = seats.values_list('flight_id', 'seat_type').get()
+            move_seat(flight_id, seat_type, 'held', 'sold')
+            transaction.on_commit(lambda: seat_status_changed(flight_id, ticket.flight_seat_id, 'sold'))
+        elif not seats.filter(status='sold').exists():
+            raise FlightSeat.DoesNotExist('Seat hold expired.')
+        flight_id, price = Ticket.objects.values_list('flight_seat__flight_id', 'price').get(id=ticket.id)
+        record_sales(flight_id, paid=1, paid_revenue=price or 0.0)
+        transaction.on_commit(partial(revenue_seats_changed, [ticket.flight_seat_id]))
+    ticket.is_paid = True
+    return ticket
+
+
+def cancel_ticket(ticket):
+    """
+    Отменяет билет и освобождает место. Повторная или одновременная
+    отмена того же билета получает Ticket.DoesNotExist.
+    """
+    with transaction.atomic():
+        if not Ticket.objects.filter(id=ticket.id, is_canceled=False).update(is_canceled=True, canceled_at=timezone.now()):
+            raise Ticket.DoesNotExist('Ticket not found or already canceled.')
+        # Строка билета уже заблокирована UPDATE-ом: оплата сюда не вклинится
+        is_paid, price = Ticket.objects.values_list('is_paid', 'price').get(id=ticket.id)
+        seat = FlightSeat.all_objects.get(id=ticket.flight_seat_id)
+        FlightSeat.all_objects.filter(id=seat.id).update(status='available', held_until=None, price=None)
+        if not seat.is_deleted:
+            move_seat(seat.flight_id, seat.seat_type, seat.status, 'available')
+            refresh_min_prices([seat.flight_id])
+        price = price or 0.0
+        record_sales(
+            seat.flight_id,
+            cancelled=1,
+            revenue=-price,
+            paid=-1 if is_paid else 0,
+            paid_revenue=-price if is_paid else 0.0,
+        )
+        transaction.on_commit(lambda: seat_status_changed(seat.flight_id, seat.id, 'available'))
+        transaction.on_commit(partial(revenue_seats_changed, [seat.id]))
+    ticket.is_canceled = True
+    return ticket
+
+
+def _holds_released(seats):
+    for seat_id, flight_id in seats:
+        seat_status_changed(flight_id, seat_id, 'available')
+
+
+def release_expired_holds(now=None, batch_size=HOLD_SWEEP_BATCH_SIZE):
+    """
+    Снимает просроченные удержания пакетами: место снова продается, а
+    неоплаченный билет на него отменяется.
+
+    Выборка идет по частичному индексу flightseat_hold_expiry_idx. Строки
+    блокируются с skip_locked, поэтому несколько обработчиков не мешают
+    друг другу, а одновременная оплата либо успевает раньше (место уже
+    sold), либо видит истекшее удержание.
+
+    Возвращает количество освобожденных мест.
+    """
+    now = now or timezone.now()
+    released = 0
+
+    while True:
+        with transaction.atomic():
+            expired = list(
+                FlightSeat.all_objects.select_for_update(skip_locked=True).filter(
+                    status='held',
+                    held_until__lte=now,
+                ).order_by('held_until').values_list('id', 'flight_id')[:batch_size]
+            )
+            if not expired:
+                break
+
+            seat_ids = [seat_id for seat_id, _ in expired]
+            released += FlightSeat.all_objects.filter(id__in=seat_ids, status='held', held_until__lte=now).update(
+                status='available',
+                held_until=None,
+                price=None,
+            )
+            canceled = list(Ticket.objects.filter(
+                flight_seat_id__in=seat_ids,
+                flight_seat__status='available',
+                is_paid=False,
+                is_canceled=False,
+            ).values_list('id', 'flight_seat__flight_id', 'price'))
+            Ticket.objects.filter(id__in=[ticket_id for ticket_id, _, _ in canceled]).update(
+                is_canceled=True,
+                canceled_at=timezone.now(),
+            )
+            sales = {}
+            for _, flight_id, price in canceled:
+                count, amount = sales.get(flight_id, (0, 0.0))
+                sales[flight_id] = (count + 1, amount + (price or 0.0))
+            for flight_id, (count, amount) in sales.items():
+                record_sales(flight_id, cancelled=count, revenue=-amount)
+            flight_ids = {flight_id for _, flight_id in expired}
+            refresh_inventory(flight_ids)
+            refresh_min_prices(flight_ids)
+
+            transaction.on_commit(partial(_holds_released, expired))
+            transaction.on_commit(partial(revenue_seats_changed, seat_ids))
+        if len(expired) < batch_size:
+            break
+
+    return released
@@ -0,0 +1,326 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Flight
+
+
+MIN_CONNECTION_TIME = timedelta(minutes=45)
+MAX_CONNECTION_TIME = timedelta(hours=24)
+MAX_LEGS = 3
+CONNECTIONS_LIMIT = 10
+
+# Расписание процесса строится заново не реже этого срока: с локальным
+# кешем журнал поколений других процессов не виден
+SCHEDULE_TTL = timedelta(minutes=1)
+
+CONNECTIONS_GENERATION_KEY = 'connections:generation'
+CONNECTIONS_CHANGE_TIMEOUT = 60 * 60
+# Дольше этого числа изменений догонять журнал невыгодно — расписание строится заново
+MAX_REPLAYED_CHANGES = 5000
+
+# Ключ события: airport_id * AIRPORT_SHIFT + время в секундах
+AIRPORT_SHIFT = 1 << 32
+NEVER = np.iinfo(np.int64).max
+
+_schedule = None
+_lock = threading.Lock()
+
+
+def min_connection_time():
+    return getattr(settings, 'CONNECTION_MIN_TIME', MIN_CONNECTION_TIME)
+
+
+def max_connection_time():
+    return getattr(settings, 'CONNECTION_MAX_TIME', MAX_CONNECTION_TIME)
+
+
+def schedule_ttl():
+    return getattr(settings, 'CONNECTION_SCHEDULE_TTL', SCHEDULE_TTL)
+
+
+def _change_key(generation):
+    return f'connections:change:{generation}'
+
+
+def record_flight_changes(flight_ids):
+    """
+    Записывает изменившиеся рейсы в журнал поколений: расписания в других
+    процессах догоняют его и обновляют только эти рейсы.
+    """
+    flight_ids = list(flight_ids)
+    if not flight_ids:
+        return
+    try:
+        generation = cache.incr(CONNECTIONS_GENERATION_KEY, len(flight_ids))
+    except ValueError:
+        # Поколение потеряно: все процессы построят расписание заново
+        cache.set(CONNECTIONS_GENERATION_KEY, 0, None)
+        return
+    first = generation - len(flight_ids) + 1
+    cache.set_many(
+        {_change_key(first + offset): flight_id for offset, flight_id in enumerate(flight_ids)},
+        CONNECTIONS_CHANGE_TIMEOUT,
+    )
+
+
+def record_flight_change(flight_id):
+    record_flight_changes([flight_id])
+
+
+def _timestamp(value):
+    return int(value.timestamp())
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(int(value), tz=dt_timezone.utc)
+
+
+def schedule_rows(flight_ids=None):
+    """
+    Строки расписания (id, аэропорт вылета, аэропорт прилета, вылет, прилет)
+    для будущих неудаленных рейсов; время — секунды от эпохи.
+    """
+    flights = Flight.objects.filter(
+        departure_time__gte=timezone.now(),
+        departure_airport__isnull=False,
+        arrival_airport__isnull=False,
+    )
+    if flight_ids is not None:
+        flights = flights.filter(id__in=flight_ids)
+    return [
+        (flight_id, departure_airport_id, arrival_airport_id, _timestamp(departure), _timestamp(arrival))
+        for flight_id, departure_airport_id, arrival_airport_id, departure, arrival in flights.order_by().values_list(
+            'id', 'departure_airport_id', 'arrival_airport_id', 'departure_time', 'arrival_time',
+        ).iterator(chunk_size=5000)
+    ]
+
+
+@dataclass(frozen=True)
+class Itinerary:
+    flight_ids: tuple
+    departure: int
+    arrival: int
+
+    @property
+    def legs(self):
+        return len(self.flight_ids)
+
+    @property
+    def departure_time(self):
+        return _from_timestamp(self.departure)
+
+    @property
+    def arrival_time(self):
+        return _from_timestamp(self.arrival)
+
+
+class Schedule:
+    """
+    Расписание как граф с развертыванием по времени.
+
+    Вершины — события вылета, упорядоченные по (аэропорт, время) в массиве
+    keys: соседние события одного аэропорта связаны ребрами ожидания, а
+    каждый рейс ведет к событию прилета. Пересадка допустима, если
+    следующий вылет из того же аэропорта не раньше прилета плюс
+    минимальное время стыковки. Все массивы выровнены по keys.
+    """
+
+    def __init__(self, rows, generation=0, built_at=None):
+        self.generation = generation
+        # Время полной сборки (monotonic); догоняющие обновления его наследуют
+        self.built_at = time.monotonic() if built_at is None else built_at
+        data = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        order = np.lexsort((data[:, 3], data[:, 1]))
+        data = data[order]
+        self.flight_ids = data[:, 0]
+        self.departure_airports = data[:, 1]
+        self.arrival_airports = data[:, 2]
+        self.departures = data[:, 3]
+        self.arrivals = data[:, 4]
+        self.keys = self.departure_airports * AIRPORT_SHIFT + self.departures
+        self.size = int(max(data[:, 1].max(), data[:, 2].max())) + 1 if len(data) else 0
+
+    def rows(self):
+        return np.column_stack((
+            self.flight_ids, self.departure_airports, self.arrival_airports, self.departures, self.arrivals,
+        ))
+
+    def apply(self, flight_ids, rows, generation):
+        """
+        Новое расписание, в котором рейсы flight_ids заменены строками rows
+        (отсутствующие в rows рейсы удалены или больше не подходят).
+        """
+        current = self.rows()
+        kept = current[~np.isin(self.flight_ids, list(flight_ids))]
+        changed = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        return Schedule(np.concatenate((kept, changed)), generation, self.built_at)
+
+    def _departures_between(self, airports, earliest, latest):
+        """
+        Индексы вылетов из airports[i] в интервале [earliest[i], latest[i]].
+        """
+        low = np.searchsorted(self.keys, airports * AIRPORT_SHIFT + earliest, 'left')
+        high = np.searchsorted(self.keys, airports * AIRPORT_SHIFT + latest, 'right')
+        counts = high - low
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        starts = np.repeat(low - (np.cumsum(counts) - counts), counts)
+        return np.arange(total) + starts
+
+    def search(self, origins, destinations, depart_after, depart_before=None, max_legs=MAX_LEGS,
+               min_connection=None, max_connection=None):
+        """
+        Парето-оптимальные маршруты по (число рейсов, время прилета).
+
+        Раунд k находит самый ранний прилет в каждый аэропорт не более чем
+        за k рейсов, просматривая только аэропорты, улучшенные в раунде
+        k-1 (как в RAPTOR). Рейсы, прилетающие не раньше уже известного
+        прибытия в аэропорт или в пункт назначения, отсекаются.
+
+        Первый элемент результата — маршрут с наименьшим числом рейсов,
+        последний — с самым ранним прилетом.
+        """
+        min_connection = int((min_connection or min_connection_time()).total_seconds())
+        max_connection = int((max_connection or max_connection_time()).total_seconds())
+        origins = np.unique(np.asarray(list(origins), dtype=np.int64))
+        destinations = np.unique(np.asarray(list(destinations), dtype=np.int64))
+        if not len(self.keys) or not len(origins) or not len(destinations):
+            return []
+
+        size = max(self.size, int(origins.max()) + 1, int(destinations.max()) + 1)
+        best = np.full(size, NEVER, dtype=np.int64)
+        is_destination = np.zeros(size, dtype=bool)
+        is_destination[destinations] = True
+        target = NEVER
+
+        airports = origins
+        earliest = np.full(len(origins), depart_after, dtype=np.int64)
+        latest = np.full(len(origins), depart_before if depart_before is not None else depart_after + max_connection, dtype=np.int64)
+        parents = []
+        results = []
+
+        for _ in range(max_legs):
+            candidates = self._departures_between(airports, earliest, latest)
+            arrivals = self.arrivals[candidates]
+            reached = self.arrival_airports[candidates]
+            improves = (arrivals < best[reached]) & (arrivals < target)
+            candidates, arrivals, reached = candidates[improves], arrivals[improves], reached[improves]
+            if not len(candidates):
+                break
+
+            # Для каждого аэропорта — рейс с самым ранним прилетом
+            order = np.lexsort((arrivals, reached))
+            candidates, arrivals, reached = candidates[order], arrivals[order], reached[order]
+            first = np.ones(len(reached), dtype=bool)
+            first[1:] = reached[1:] != reached[:-1]
+            candidates, arrivals, reached = candidates[first], arrivals[first], reached[first]
+
+            best[reached] = arrivals
+            parents.append(dict(zip(reached.tolist(), candidates.tolist())))
+
+            at_destination = is_destination[reached]
+            if at_destination.any():
+                index = np.flatnonzero(at_destination)[np.argmin(arrivals[at_destination])]
+                target = int(arrivals[index])
+                results.append(self._itinerary(parents, int(reached[index])))
+
+            airports = reached[~at_destination]
+            earliest = arrivals[~at_destination] + min_connection
+            latest = arrivals[~at_destination] + max_connection
+            if not len(airports):
+                break
+
+        return results
+
+    def _itinerary(self, parents, airport):
+        # Рейс раунда k вылетает из аэропорта, улучшенного в раунде k-1
+        flights = []
+        for round_parents in reversed(parents):
+            index = round_parents[airport]
+            flights.append(index)
+            airport = int(self.departure_airports[index])
+        flights.reverse()
+        return Itinerary(
+            flight_ids=tuple(int(self.flight_ids[index]) for index in flights),
+            departure=int(self.departures[flights[0]]),
+            arrival=int(self.arrivals[flights[-1]]),
+        )
+
+
+def get_schedule():
+    """
+    Расписание текущего процесса. При изменении рейсов догоняет журнал
+    поколений и обновляет только изменившиеся рейсы; если журнал
+    недоступен, строит расписание заново.
+
+    Журнал виден всем процессам только в общем кеше (CACHE_URL). С
+    локальным кешем процесс узнает лишь о своих изменениях, поэтому
+    расписание старше schedule_ttl() строится заново в любом случае.
+    """
+    global _schedule
+    with _lock:
+        generation = cache.get_or_set(CONNECTIONS_GENERATION_KEY, 0, None)
+        schedule = _schedule
+        if schedule is not None and time.monotonic() - schedule.built_at > schedule_ttl().total_seconds():
+            schedule = None
+        if schedule is not None and generation > schedule.generation:
+            missed = generation - schedule.generation
+            keys = [_change_key(number) for number in range(schedule.generation + 1, generation + 1)]
+            changes = cache.get_many(keys) if missed <= MAX_REPLAYED_CHANGES else {}
+            if len(changes) == len(keys):
+                flight_ids = set(changes.values())
+                schedule = schedule.apply(flight_ids, schedule_rows(flight_ids), generation)
+            else:
+                schedule = None
+        elif schedule is not None and generation < schedule.generation:
+            schedule = None
+
+        if schedule is None:
+            schedule = Schedule(schedule_rows(), generation)
+        _schedule = schedule
+        return schedule
+
+
+def find_connections(departure_ids, arrival_ids, start_date=None, end_date=None,
+                     max_legs=MAX_LEGS, limit=CONNECTIONS_LIMIT):
+    """
+    Маршруты с пересадками между наборами аэропортов, упорядоченные по
+    времени вылета. Для каждого следующего времени вылета ищутся
+    маршрут с самым ранним прилетом и маршрут с наименьшим числом рейсов.
+    """
+    schedule = get_schedule()
+    start = _timestamp(max(start_date, timezone.now()) if start_date else timezone.now())
+    end = _timestamp(end_date) if end_date else start + int(max_connection_time().total_seconds())
+
+    itineraries = {}
+    while start <= end and len(itineraries) < limit:
+        found = schedule.search(departure_ids, arrival_ids, start, end, max_legs)
+        if not found:
+            break
+        for itinerary in found:
+            itineraries.setdefault(itinerary.flight_ids, itinerary)
+        start = min(itinerary.departure for itinerary in found) + 1
+
+    return sorted(itineraries.values(), key=lambda item: (item.departure, item.arrival, item.legs))[:limit]
+
+
+def connection_flights(itineraries, queryset=None):
+    """
+    Подставляет в маршруты объекты рейсов одним запросом:
+    возвращает список (маршрут, [рейсы]).
+    """
+    queryset = queryset if queryset is not None else Flight.objects.all()
+    flights = queryset.in_bulk({flight_id for itinerary in itineraries for flight_id in itinerary.flight_ids})
+    return [
+        (itinerary, [flights[flight_id] for flight_id in itinerary.flight_ids])
+        for itinerary in itineraries
+        if all(flight_id in flights for flight_id in itinerary.flight_ids)
+    ]
@@ -0,0 +1,273 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .models import Airport
+
+
+EARTH_RADIUS_KM = 6371.0088
+MATRIX_FILE = 'matrix.npy'
+INDEX_FILE = 'index.npy'
+COORDINATES_FILE = 'coordinates.npy'
+# Имя каталога текущей версии матрицы; заменяется атомарно
+CURRENT_FILE = 'current'
+# Метка «аэропорты изменились, матрицу пора пересобрать»
+STALE_FILE = 'stale'
+
+_loaded = None
+_lock = threading.Lock()
+
+
+def matrix_dir():
+    return getattr(settings, 'DISTANCE_MATRIX_DIR', os.path.join(settings.BASE_DIR, 'distances'))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Расстояние по дуге большого круга в километрах; аргументы — градусы,
+    скаляры или массивы NumPy (с бродкастингом).
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def airport_coordinates():
+    """
+    Отсортированные id всех аэропортов и их координаты (градусы) одним запросом.
+    """
+    rows = list(
+        Airport.all_objects.order_by('id').annotate(
+            latitude=Cast('place__latitude', FloatField()),
+            longitude=Cast('place__longitude', FloatField()),
+        ).values_list('id', 'latitude', 'longitude')
+    )
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    coordinates = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 2)
+    return ids, coordinates
+
+
+class DistanceMatrix:
+    """
+    Матрица расстояний между аэропортами (км, float32), отображенная в
+    память из файла. Строки и столбцы соответствуют отсортированным id.
+    """
+
+    def __init__(self, ids, coordinates, matrix, version=None):
+        self.ids = ids
+        self.coordinates = coordinates
+        self.matrix = matrix
+        self.version = version
+
+    @classmethod
+    def load(cls, directory=None):
+        """
+        Текущая версия матрицы или None, если она еще не строилась.
+        Файлы версии читаются из одного каталога, поэтому индекс, координаты
+        и матрица всегда согласованы между собой.
+        """
+        directory = directory or matrix_dir()
+        for _ in range(3):
+            version = current_version(directory)
+            if version is None:
+                return None
+            path = os.path.join(directory, version)
+            try:
+                return cls(
+                    np.load(os.path.join(path, INDEX_FILE)),
+                    np.load(os.path.join(path, COORDINATES_FILE)),
+                    np.load(os.path.join(path, MATRIX_FILE), mmap_mode='r'),
+                    version,
+                )
+            except FileNotFoundError:
+                # Версию удалили, пока мы ее открывали: указатель уже сменился
+                continue
+        raise FileNotFoundError(f'Distance matrix in {directory} keeps changing')
+
+    def positions(self, airport_ids):
+        """
+        Позиции id в матрице; -1 для неизвестных аэропортов.
+        """
+        airport_ids = np.asarray(airport_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(airport_ids.shape, -1)
+        positions = np.minimum(np.searchsorted(self.ids, airport_ids), len(self.ids) - 1)
+        return np.where(self.ids[positions] == airport_ids, positions, -1)
+
+    def distance(self, from_id, to_id):
+        from_position, to_position = self.positions([from_id, to_id])
+        if from_position < 0 or to_position < 0:
+            return None
+        return float(self.matrix[from_position, to_position])
+
+    def distances_from(self, from_id, to_ids):
+        """
+        Расстояния от одного аэропорта до списка других (NaN для неизвестных).
+        """
+        from_position = self.positions([from_id])[0]
+        to_positions = self.positions(to_ids)
+        result = np.full(len(to_positions), np.nan, dtype=np.float64)
+        if from_position < 0:
+            return result
+        known = to_positions >= 0
+        result[known] = self.matrix[from_position, to_positions[known]]
+        return result
+
+
+def current_version(directory=None):
+    try:
+        with open(os.path.join(directory or matrix_dir(), CURRENT_FILE)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_matrix(directory, ids, coordinates, fill):
+    """
+    Пишет новую версию матрицы в отдельный каталог и одним os.replace
+    переключает на него указатель current. Читатели, уже отобразившие
+    прежнюю версию, продолжают с ней работать; старые версии, кроме
+    предыдущей, удаляются.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f'v{time.time_ns()}-{os.getpid()}'
+    building = tempfile.mkdtemp(dir=directory, prefix='.build-')
+    matrix = np.lib.format.open_memmap(
+        os.path.join(building, MATRIX_FILE), mode='w+', dtype=np.float32, shape=(len(ids), len(ids)),
+    )
+    fill(matrix)
+    matrix.flush()
+    del matrix
+    np.save(os.path.join(building, INDEX_FILE), ids)
+    np.save(os.path.join(building, COORDINATES_FILE), coordinates)
+    os.rename(building, os.path.join(directory, version))
+
+    previous = current_version(directory)
+    handle, pointer = tempfile.mkstemp(dir=directory, prefix='.current-')
+    with os.fdopen(handle, 'w') as file:
+        file.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    for name in os.listdir(directory):
+        if name.startswith('v') and name not in (version, previous):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def rebuild_distance_matrix(directory=None, full=False):
+    """
+    Приводит матрицу в соответствие с аэропортами в БД.
+
+    Пересчитываются только строки и столбцы аэропортов, которые
+    добавлены или у которых изменились координаты места; остальные
+    значения копируются из прежней матрицы. Возвращает количество
+    пересчитанных аэропортов (0 — матрица уже актуальна).
+    """
+    directory = directory or matrix_dir()
+    ids, coordinates = airport_coordinates()
+    previous = None if full else DistanceMatrix.load(directory)
+
+    if previous is not None:
+        old_positions = previous.positions(ids)
+        unchanged = old_positions >= 0
+        unchanged[unchanged] = np.all(previous.coordinates[old_positions[unchanged]] == coordinates[unchanged], axis=1)
+        if unchanged.all() and len(ids) == len(previous.ids):
+            return 0
+    else:
+        old_positions = np.full(len(ids), -1)
+        unchanged = np.zeros(len(ids), dtype=bool)
+
+    changed = np.flatnonzero(~unchanged)
+
+    def fill(matrix):
+        if unchanged.any():
+            kept = np.flatnonzero(unchanged)
+            source = old_positions[kept]
+            matrix[np.ix_(kept, kept)] = previous.matrix[np.ix_(source, source)]
+        if len(changed):
+            rows = haversine_km(
+                coordinates[changed, 0][:, None], coordinates[changed, 1][:, None],
+                coordinates[None, :, 0], coordinates[None, :, 1],
+            ).astype(np.float32)
+            matrix[changed, :] = rows
+            matrix[:, changed] = rows.T
+
+    _write_matrix(directory, ids, coordinates, fill)
+    return len(changed)
+
+
+def _rebuild_if_stale(directory):
+    """
+    Пересобирает матрицу, если после последней сборки менялись аэропорты.
+    Метка забирается переименованием до чтения БД: изменение, случившееся
+    во время сборки, оставит новую метку и будет учтено следующей сборкой.
+    """
+    stale = os.path.join(directory, STALE_FILE)
+    claimed = f'{stale}.{os.getpid()}.{threading.get_ident()}'
+    try:
+        os.rename(stale, claimed)
+    except FileNotFoundError:
+        return
+    try:
+        rebuild_distance_matrix(directory)
+    except BaseException:
+        os.replace(claimed, stale)
+        raise
+    os.remove(claimed)
+
+
+def get_distance_matrix():
+    """
+    Матрица текущего процесса; перечитывается, если указатель current
+    сменился. Если матрицы еще нет, она строится; если аэропорты
+    изменились — пересобирается одним инкрементальным проходом.
+    """
+    global _loaded
+    directory = matrix_dir()
+    with _lock:
+        _rebuild_if_stale(directory)
+        version = current_version(directory)
+        if version is None:
+            rebuild_distance_matrix(directory)
+            version = current_version(directory)
+        if _loaded is None or _loaded.version != version:
+            _loaded = DistanceMatrix.load(directory)
+        return _loaded
+
+
+def airport_distance(from_id, to_id):
+    """
+    Расстояние между аэропортами в километрах или None, если аэропорт неизвестен.
+    """
+    return get_distance_matrix().distance(from_id, to_id)
+
+
+def distances_from(from_id, to_ids):
+    """
+    Расстояния от аэропорта до каждого из to_ids: {id: км или None}.
+    """
+    distances = get_distance_matrix().distances_from(from_id, to_ids)
+    return {
+        to_id: None if np.isnan(distance) else float(distance)
+        for to_id, distance in zip(to_ids, distances.tolist())
+    }
+
+
+def refresh_distance_matrix():
+    """
+    Отмечает матрицу устаревшей после изменения мест или аэропортов.
+    Сама пересборка откладывается до первого обращения к матрице, поэтому
+    серия сохранений (импорт, массовое редактирование) стоит одной сборки,
+    а не полной перезаписи матрицы на каждое сохранение. Матрицы, которая
+    еще ни разу не строилась, это не касается.
+    """
+    directory = matrix_dir()
+    if current_version(directory) is not None:
+        with open(os.path.join(directory, STALE_FILE), 'a'):
+            pass
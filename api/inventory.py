@@ -0,0 +1,87 @@
+from django.db.models import Count, F
+
+from .models import Flight, FlightSeat
+
+
+CABINS = {'Business': 'business', 'Economy': 'economy'}
+COUNTED_STATUSES = ('available', 'held', 'sold')
+INVENTORY_BATCH_SIZE = 1000
+
+
+def counter_field(seat_type, status):
+    """
+    Имя счетчика рейса для места данного типа и статуса (или None,
+    если такой статус не учитывается).
+    """
+    if status not in COUNTED_STATUSES:
+        return None
+    return f"{CABINS.get(seat_type, 'economy')}_{status}"
+
+
+def empty_inventory():
+    return {f'{cabin}_{status}': 0 for cabin in CABINS.values() for status in COUNTED_STATUSES}
+
+
+def compute_inventory(seats):
+    """
+    Считает счетчики по строкам (flight_id, seat_type, status) или уже
+    сгруппированным (flight_id, seat_type, status, количество) — только
+    неудаленные места. Возвращает {flight_id: {поле: значение}}.
+    """
+    result = {}
+    for flight_id, seat_type, status, *count in seats:
+        inventory = result.setdefault(flight_id, empty_inventory())
+        field = counter_field(seat_type, status)
+        if field:
+            inventory[field] += count[0] if count else 1
+    return result
+
+
+def move_seat(flight_id, seat_type, from_status, to_status):
+    """
+    Переносит место между счетчиками рейса одним UPDATE с F-выражениями.
+    Вызывается в той же транзакции, что и смена статуса места, поэтому
+    счетчики не расходятся с местами при одновременных продажах.
+    """
+    if from_status == to_status:
+        return
+
+    changes = {}
+    from_field = counter_field(seat_type, from_status)
+    to_field = counter_field(seat_type, to_status)
+    if from_field:
+        changes[from_field] = F(from_field) - 1
+    if to_field:
+        changes[to_field] = F(to_field) + 1
+
+    if changes:
+        Flight.all_objects.filter(id=flight_id).update(**changes)
+
+
+def refresh_inventory(flight_ids):
+    """
+    Пересчитывает счетчики рейсов по их местам и сохраняет пакетно.
+    Возвращает список рейсов, у которых счетчики отличались.
+    """
+    flight_ids = list(flight_ids)
+    changed = []
+    for start in range(0, len(flight_ids), INVENTORY_BATCH_SIZE):
+        chunk = flight_ids[start:start + INVENTORY_BATCH_SIZE]
+        # Группировка в SQL по покрывающему индексу: строка на рейс, класс и статус
+        actual = compute_inventory(
+            FlightSeat.objects.filter(flight_id__in=chunk).values('flight_id', 'seat_type', 'status').annotate(
+                count=Count('id'),
+            ).order_by().values_list('flight_id', 'seat_type', 'status', 'count')
+        )
+        flights = Flight.all_objects.filter(id__in=chunk).only('id', *Flight.INVENTORY_FIELDS)
+        stale = []
+        for flight in flights:
+            inventory = actual.get(flight.id, empty_inventory())
+            if any(getattr(flight, field) != value for field, value in inventory.items()):
+                for field, value in inventory.items():
+                    setattr(flight, field, value)
+                stale.append(flight)
+        if stale:
+            Flight.all_objects.bulk_update(stale, Flight.INVENTORY_FIELDS, batch_size=INVENTORY_BATCH_SIZE)
+            changed.extend(flight.id for flight in stale)
+    return changed
@@ -0,0 +1,93 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from api.benchmarks import create_airports, create_board, generate_schedule, rolled_back
+from api.inventory import refresh_inventory
+from api.models import Flight, FlightSeat
+from api.search import flights_between
+from api.seating import materialize_flight_seats
+
+
+BATCH_SIZE = 5000
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def search_with_join(departure_ids, arrival_ids, start, end, min_seats):
+    # Прежний поиск: свободные места считаются join-ом с местами рейсов
+    return flights_between(departure_ids, arrival_ids, start, end).annotate(
+        seats_left=Count('flightseat', filter=Q(flightseat__status='available', flightseat__is_deleted=False)),
+    ).filter(seats_left__gte=min_seats)
+
+
+class Command(BaseCommand):
+    help = (
+        'Поиск рейсов со свободными местами (?min_seats=) на большом '
+        'расписании: счетчики в строке рейса против подсчета мест join-ом. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flights', type=int, default=100000)
+        parser.add_argument('--airports', type=int, default=10)
+        parser.add_argument('--rows', type=int, default=4)
+        parser.add_argument('--seats', type=int, default=5, help='Мест в ряду')
+        parser.add_argument('--days', type=int, default=365, help='На сколько дней вперед расписание')
+        parser.add_argument('--window', type=int, default=30, help='Окно поиска, дней')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['flights'] < 1 or options['airports'] < 2 or options['queries'] < 1:
+            raise CommandError('Нужны хотя бы один рейс, два аэропорта и один поиск')
+        rng = random.Random(options['seed'])
+        capacity = options['rows'] * options['seats']
+        start = timezone.now()
+
+        with rolled_back():
+            started = time.perf_counter()
+            board = create_board(options['rows'], options['seats'])
+            airports = create_airports(options['airports'])
+            generate_schedule(board, airports, options['flights'], options['days'], seed=options['seed'], start=start)
+            flight_ids = list(Flight.objects.filter(board=board).values_list('id', flat=True))
+            for chunk_start in range(0, len(flight_ids), BATCH_SIZE):
+                chunk = flight_ids[chunk_start:chunk_start + BATCH_SIZE]
+                materialize_flight_seats(Flight.objects.filter(id__in=chunk).only('id', 'board_id'))
+                # Разная загрузка рейсов: продано около (id рейса mod вместимость) мест
+                FlightSeat.objects.filter(flight_id__in=chunk).alias(
+                    position=F('id') % capacity, load=F('flight_id') % capacity,
+                ).filter(position__lt=F('load')).update(status='sold')
+                refresh_inventory(chunk)
+            self.stdout.write(
+                f'Рейсов: {len(flight_ids)}, мест: {len(flight_ids) * capacity} '
+                f'(созданы за {time.perf_counter() - started:.1f} с)'
+            )
+
+            latencies = {'счетчики': [], 'join с местами': []}
+            for _ in range(options['queries']):
+                departure, arrival = rng.sample(airports, 2)
+                window_start = start + timedelta(days=rng.randrange(options['days']))
+                args = ([departure.id], [arrival.id], window_start, window_start + timedelta(days=options['window']), rng.randint(1, capacity))
+                results = []
+                for name, search in (('счетчики', flights_between), ('join с местами', search_with_join)):
+                    started = time.perf_counter()
+                    results.append(list(search(*args).values_list('id', flat=True)[:options['page_size']]))
+                    latencies[name].append(time.perf_counter() - started)
+                if results[0] != results[1]:
+                    raise CommandError(f'Результаты поиска расходятся: {results[0]} и {results[1]}')
+
+            for name, values in latencies.items():
+                self.stdout.write(
+                    f'    {name}: p50 {_percentile(values, 0.5) * 1000:.2f} мс, '
+                    f'p99 {_percentile(values, 0.99) * 1000:.2f} мс ({len(values)} запросов)'
+                )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
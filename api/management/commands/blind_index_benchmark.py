@@ -0,0 +1,98 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import BENCHMARK_PREFIX, rolled_back
+from api.blind_index import blind_lookup, normalize_phone, update_blind_indexes
+from api.models import Client, User
+
+
+BATCH_SIZE = 5000
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def phone(number):
+    digits = f'{number:07d}'
+    return f'+7 (900) {digits[:3]}-{digits[3:5]}-{digits[5:]}'
+
+
+def create_clients(count):
+    """
+    Клиенты с зашифрованными телефонами и фамилиями пачками bulk_create;
+    индексы считаются так же, как в save().
+    """
+    for start in range(0, count, BATCH_SIZE):
+        numbers = range(start, min(start + BATCH_SIZE, count))
+        users = [
+            User(login=f'{BENCHMARK_PREFIX.lower()}{number}', role='client', last_name=f'{BENCHMARK_PREFIX} {number}')
+            for number in numbers
+        ]
+        for user in users:
+            update_blind_indexes(user)
+        users = User.objects.bulk_create(users)
+        clients = [Client(user=user, phone=phone(number)) for user, number in zip(users, numbers)]
+        for client in clients:
+            update_blind_indexes(client)
+        Client.objects.bulk_create(clients)
+
+
+def scan_lookup(value):
+    # Без индекса: каждую строку нужно прочитать и расшифровать
+    wanted = normalize_phone(value)
+    for client in Client.objects.only('id', 'phone').iterator(chunk_size=BATCH_SIZE):
+        if normalize_phone(client.phone) == wanted:
+            return client
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Задержка точного поиска клиента по зашифрованному телефону: blind index '
+        'против перебора с расшифровкой. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500000)
+        parser.add_argument('--queries', type=int, default=200, help='Поисков через индекс')
+        parser.add_argument('--scan-queries', type=int, default=3, help='Поисков перебором: каждый читает всю таблицу')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['queries'] < 1:
+            raise CommandError('Нужен хотя бы один клиент и один поиск')
+        rng = random.Random(options['seed'])
+
+        with rolled_back():
+            started = time.perf_counter()
+            create_clients(options['clients'])
+            self.stdout.write(f'Клиентов: {options["clients"]} (созданы за {time.perf_counter() - started:.1f} с)')
+
+            def measure(lookup, queries):
+                latencies = []
+                for _ in range(queries):
+                    number = rng.randrange(options['clients'])
+                    # Другой формат того же номера: индекс строится по нормализованному значению
+                    value = '7900' + f'{number:07d}'
+                    started = time.perf_counter()
+                    client = lookup(value)
+                    latencies.append(time.perf_counter() - started)
+                    if client is None or client.user.login != f'{BENCHMARK_PREFIX.lower()}{number}':
+                        raise CommandError(f'Клиент {value} не найден')
+                return latencies
+
+            indexed = measure(lambda value: Client.objects.filter(blind_lookup(Client, 'phone', value)).first(), options['queries'])
+            self.stdout.write(
+                f'    blind index: p50 {_percentile(indexed, 0.5) * 1000:.2f} мс, '
+                f'p99 {_percentile(indexed, 0.99) * 1000:.2f} мс ({len(indexed)} запросов)'
+            )
+            if options['scan_queries'] > 0:
+                scanned = measure(scan_lookup, options['scan_queries'])
+                self.stdout.write(
+                    f'    перебор с расшифровкой: p50 {_percentile(scanned, 0.5) * 1000:.0f} мс ({len(scanned)} запросов)'
+                )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
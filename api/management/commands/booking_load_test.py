@@ -0,0 +1,161 @@
+import random
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from api.booking import book_seat
+from api.models import Board, Client, Flight, FlightSeat, Manufacturer, Model, User
+from api.seating import generate_layout, save_board_layout
+
+
+LOAD_PREFIX = 'Load'
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест бронирования: потоки одновременно покупают случайные места '
+        'тестовых рейсов в текущей базе (SQLite или PostgreSQL из DATABASE_URL). '
+        'Созданные тестом борт, рейсы, пользователи и билеты удаляются после теста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Одновременных покупателей (потоков)')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Длительность теста')
+        parser.add_argument('--flights', type=int, default=10)
+        parser.add_argument('--rows', type=int, default=30)
+        parser.add_argument('--seats', type=int, default=6, help='Мест в ряду')
+        parser.add_argument('--hold', action='store_true', help='Удерживать места, а не продавать')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовые данные после теста')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def setup(self, options, created):
+        # Свои записи каждого запуска: данные прошлых запусков с --keep не затрагиваются
+        run = secrets.token_hex(2)
+        manufacturer = Manufacturer.objects.create(name=f'{LOAD_PREFIX} {run}')
+        created['manufacturer'] = manufacturer
+        model = Model.objects.create(name=LOAD_PREFIX, manufacturer=manufacturer)
+        board = Board.objects.create(
+            model=model, board_number=f'{LOAD_PREFIX}-{run}', year=2020, seats_amount=options['rows'] * options['seats'],
+        )
+        save_board_layout(board, generate_layout(options['rows'], options['seats'], 1))
+
+        clients = []
+        for number in range(options['workers']):
+            user = User.objects.create_user(f'{LOAD_PREFIX.lower()}{run}{number}', None, role='client')
+            created['users'].append(user.id)
+            clients.append(Client.objects.create(user=user, phone='+7 (900) 000-00-00'))
+
+        # Места создает сигнал сохранения рейса. Аэропорты бронированию не
+        # нужны: без них тест не трогает справочники мест и матрицу расстояний
+        departure_time = timezone.now() + timedelta(days=30)
+        flights = [
+            Flight.objects.create(
+                board=board,
+                departure_time=departure_time,
+                arrival_time=departure_time + timedelta(hours=2),
+                economy_class_price=100,
+                business_class_price=500,
+            )
+            for _ in range(options['flights'])
+        ]
+        return flights, clients
+
+    def cleanup(self, created):
+        # Производитель каскадом удаляет модель, борт, рейсы, места, билеты
+        # и сводки продаж; пользователи — клиентов
+        if created['manufacturer'] is not None:
+            Manufacturer.all_objects.filter(id=created['manufacturer'].id).delete()
+        User.objects.filter(id__in=created['users']).delete()
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('Нужен хотя бы один поток')
+        random.seed(options['seed'])
+        created = {'manufacturer': None, 'users': []}
+        try:
+            self.run_load(options, created)
+        finally:
+            if not options['keep']:
+                self.cleanup(created)
+
+    def run_load(self, options, created):
+        flights, clients = self.setup(options, created)
+        seat_ids = list(FlightSeat.objects.filter(flight__in=flights).values_list('id', flat=True))
+        if not seat_ids:
+            raise CommandError('У тестовых рейсов нет мест')
+
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(options['workers'])
+
+        def worker(client, seed):
+            # Покупатели выбирают места из общего набора: часть попыток
+            # приходится на уже занятые места, как при реальной распродаже
+            rng = random.Random(seed)
+            candidates = seat_ids[:]
+            rng.shuffle(candidates)
+            booked = conflicts = errors = 0
+            latencies = []
+            try:
+                start.wait()
+                deadline = time.perf_counter() + options['seconds']
+                for seat_id in candidates:
+                    if time.perf_counter() >= deadline:
+                        break
+                    started = time.perf_counter()
+                    try:
+                        book_seat(client, seat_id, hold=options['hold'])
+                        booked += 1
+                        latencies.append(time.perf_counter() - started)
+                    except FlightSeat.DoesNotExist:
+                        conflicts += 1
+                    except DatabaseError:
+                        # На SQLite — «database is locked» после истечения timeout
+                        errors += 1
+            finally:
+                connection.close()
+            with lock:
+                results.append((booked, conflicts, errors, latencies))
+
+        threads = [
+            threading.Thread(target=worker, args=(client, options['seed'] + number))
+            for number, client in enumerate(clients)
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        booked = sum(result[0] for result in results)
+        conflicts = sum(result[1] for result in results)
+        errors = sum(result[2] for result in results)
+        latencies = [latency for result in results for latency in result[3]]
+        sold = FlightSeat.objects.filter(flight__in=flights).exclude(status='available').count()
+
+        self.stdout.write(
+            f'База: {connection.vendor}, потоков: {options["workers"]}, мест: {len(seat_ids)}, время: {elapsed:.1f} с'
+        )
+        self.stdout.write(
+            f'Бронирований: {booked} ({booked / elapsed:.0f}/с), занято другими: {conflicts}, ошибок БД: {errors}'
+        )
+        self.stdout.write(
+            f'Задержка бронирования: p50 {_percentile(latencies, 0.5) * 1000:.1f} мс, '
+            f'p95 {_percentile(latencies, 0.95) * 1000:.1f} мс'
+        )
+        if sold != booked:
+            raise CommandError(f'Занято мест {sold}, а успешных бронирований {booked}: места проданы дважды')
+        self.stdout.write(self.style.SUCCESS('Двойных продаж нет'))
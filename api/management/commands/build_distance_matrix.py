@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.distances import DistanceMatrix, matrix_dir, rebuild_distance_matrix
+
+
+class Command(BaseCommand):
+    help = 'Строит или обновляет матрицу расстояний между аэропортами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать все пары, а не только изменившиеся')
+
+    def handle(self, *args, **options):
+        changed = rebuild_distance_matrix(full=options['full'])
+        matrix = DistanceMatrix.load()
+        self.stdout.write(self.style.SUCCESS(
+            f'Аэропортов в матрице: {len(matrix.ids)}. Пересчитано: {changed}. Каталог: {matrix_dir()}'
+        ))
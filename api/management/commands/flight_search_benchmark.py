@@ -0,0 +1,78 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import create_airports, create_board, generate_schedule, rolled_back
+from api.views import find_flights
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Задержка поиска рейсов (find_flights: первая и следующая страница) '
+        'по мере роста синтетического расписания. Данные создаются в '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Размеры расписания')
+        parser.add_argument('--airports', type=int, default=100)
+        parser.add_argument('--queries', type=int, default=200, help='Поисков на каждый размер')
+        parser.add_argument('--days', type=int, default=365, help='На сколько дней вперед расписание')
+        parser.add_argument('--window', type=int, default=7, help='Окно поиска, дней')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        if sizes[0] < 1 or options['airports'] < 2 or options['queries'] < 1:
+            raise CommandError('Нужны хотя бы один рейс, два аэропорта и один поиск')
+
+        rng = random.Random(options['seed'])
+        factory = APIRequestFactory()
+        start = timezone.now()
+
+        with rolled_back():
+            board = create_board(30, 6)
+            airports = create_airports(options['airports'])
+            names = [airport.place.name for airport in airports]
+            total = 0
+            for size in sizes:
+                generated = time.perf_counter()
+                total += generate_schedule(board, airports, size - total, options['days'], seed=rng.random(), start=start)
+                generated = time.perf_counter() - generated
+
+                first_pages, next_pages = [], []
+                for _ in range(options['queries']):
+                    departure, arrival = rng.sample(names, 2)
+                    window_start = start + timedelta(days=rng.randrange(options['days']))
+                    params = {
+                        'departure_place': departure,
+                        'arrival_place': arrival,
+                        'start_date': window_start.isoformat(),
+                        'end_date': (window_start + timedelta(days=options['window'])).isoformat(),
+                        'page_size': 2,
+                    }
+                    started = time.perf_counter()
+                    response = find_flights(factory.get('/api/find_flights/', params))
+                    first_pages.append(time.perf_counter() - started)
+                    if response.data.get('next'):
+                        started = time.perf_counter()
+                        find_flights(factory.get(response.data['next']))
+                        next_pages.append(time.perf_counter() - started)
+
+                self.stdout.write(f'Рейсов: {total} (сгенерировано за {generated:.1f} с)')
+                for name, latencies in (('первая страница', first_pages), ('следующая страница', next_pages)):
+                    if latencies:
+                        self.stdout.write(
+                            f'    {name}: p50 {_percentile(latencies, 0.5) * 1000:.2f} мс, '
+                            f'p99 {_percentile(latencies, 0.99) * 1000:.2f} мс ({len(latencies)} запросов)'
+                        )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
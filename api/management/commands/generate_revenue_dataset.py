@@ -0,0 +1,123 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.inventory import refresh_inventory
+from api.models import Airport, Board, Client, Flight, FlightSeat, Manufacturer, Model, Place, Ticket, User
+from api.pricing import refresh_min_prices
+from api.revenue import day_start, invalidate_revenue_days, invalidate_sales_days
+from api.rollups import compute_rollups, write_rollups
+from api.seating import SEAT_BATCH_SIZE, build_flight_seats, generate_layout, get_seat_layout, save_board_layout
+
+
+BENCH_PREFIX = 'Bench'
+
+
+class Command(BaseCommand):
+    help = 'Генерирует прошедшие рейсы с местами и билетами для замеров отчетов по выручке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Сколько дней до сегодняшнего')
+        parser.add_argument('--flights-per-day', type=int, default=50)
+        parser.add_argument('--airports', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=30)
+        parser.add_argument('--seats', type=int, default=6, help='Мест в ряду')
+        parser.add_argument('--business', type=int, default=1, help='Мест бизнес-класса в ряду')
+        parser.add_argument('--sold', type=float, default=0.7, help='Доля проданных мест')
+        parser.add_argument('--paid', type=float, default=0.8, help='Доля оплаченных билетов')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def setup(self, options):
+        manufacturer, _ = Manufacturer.objects.get_or_create(name=BENCH_PREFIX)
+        model, _ = Model.objects.get_or_create(name=BENCH_PREFIX, manufacturer=manufacturer)
+        board, _ = Board.objects.get_or_create(
+            board_number=BENCH_PREFIX,
+            defaults={'model': model, 'year': 2020, 'seats_amount': options['rows'] * options['seats']},
+        )
+        save_board_layout(board, generate_layout(options['rows'], options['seats'], options['business']))
+
+        airports = list(Airport.objects.filter(name__startswith=BENCH_PREFIX))
+        for number in range(len(airports), options['airports']):
+            place = Place.objects.create(
+                name=f'{BENCH_PREFIX} {number}',
+                latitude=round(random.uniform(-60, 60), 6),
+                longitude=round(random.uniform(-180, 180), 6),
+            )
+            airports.append(Airport.objects.create(place=place, name=f'{BENCH_PREFIX}{number}', full_name=place.name))
+
+        user = User.objects.filter(login=BENCH_PREFIX.lower()).first()
+        if user is None:
+            user = User.objects.create_user(BENCH_PREFIX.lower(), None, role='client')
+        client = Client.objects.filter(user=user).first() or Client.objects.create(user=user, phone='+7 (900) 000-00-00')
+        return board, [airport.id for airport in airports], client
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        board, airport_ids, client = self.setup(options)
+        layout = get_seat_layout(board.id)
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options['days'])
+
+        seats_created = tickets_created = 0
+        for offset in range(options['days']):
+            day = first_day + timedelta(days=offset)
+            start = day_start(day)
+            with transaction.atomic():
+                flights = []
+                for _ in range(options['flights_per_day']):
+                    departure_id, arrival_id = random.sample(airport_ids, 2)
+                    departure_time = start + timedelta(minutes=random.randrange(24 * 60))
+                    flights.append(Flight(
+                        board=board,
+                        departure_time=departure_time,
+                        arrival_time=departure_time + timedelta(minutes=random.randint(60, 600)),
+                        departure_airport_id=departure_id,
+                        arrival_airport_id=arrival_id,
+                        economy_class_price=random.randint(50, 300),
+                        business_class_price=random.randint(300, 1200),
+                    ))
+                Flight.objects.bulk_create(flights, batch_size=SEAT_BATCH_SIZE)
+
+                seats = []
+                for flight in flights:
+                    for seat in build_flight_seats(flight, layout):
+                        if random.random() < options['sold']:
+                            seat.status = 'sold'
+                            seat.price = flight.business_class_price if seat.seat_type == 'Business' else flight.economy_class_price
+                        seats.append(seat)
+                FlightSeat.objects.bulk_create(seats, batch_size=SEAT_BATCH_SIZE)
+
+                tickets = []
+                for seat in seats:
+                    if seat.status != 'sold':
+                        continue
+                    created_at = seat.flight.departure_time - timedelta(days=random.randint(1, 60))
+                    is_paid = random.random() < options['paid']
+                    tickets.append(Ticket(
+                        client=client,
+                        flight_seat_id=seat.id,
+                        price=seat.price,
+                        created_at=created_at,
+                        is_paid=is_paid,
+                        paid_at=created_at + timedelta(minutes=10) if is_paid else None,
+                    ))
+                Ticket.objects.bulk_create(tickets, batch_size=SEAT_BATCH_SIZE)
+                flight_ids = [flight.id for flight in flights]
+                refresh_inventory(flight_ids)
+                refresh_min_prices(flight_ids)
+                write_rollups(flight_ids, compute_rollups(flight_ids))
+
+            seats_created += len(seats)
+            tickets_created += len(tickets)
+            if offset % 30 == 29:
+                self.stdout.write(f'{day}: мест {seats_created}, билетов {tickets_created}')
+
+        invalidate_revenue_days(first_day + timedelta(days=offset) for offset in range(options['days']))
+        # Билеты продаются за 1–60 дней до вылета
+        invalidate_sales_days(first_day + timedelta(days=offset) for offset in range(-60, options['days']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейсов: {options["days"] * options["flights_per_day"]}, мест: {seats_created}, билетов: {tickets_created}'
+        ))
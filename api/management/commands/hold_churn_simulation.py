@@ -0,0 +1,185 @@
+import heapq
+import random
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import override_settings
+
+from api.benchmarks import create_airports, create_board, create_flights
+from api.booking import book_seat, pay_ticket, release_expired_holds
+from api.inventory import refresh_inventory
+from api.models import Airport, Client, FlightSeat, Manufacturer, Place, Ticket, User
+from api.pricing import refresh_min_prices
+from api.rollups import compute_rollups, rollup_differences, stored_rollups
+from api.seating import materialize_flight_seats
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Симуляция оборота удержаний: места удерживаются с заданной частотой, '
+        'часть удержаний оплачивается (в том числе слишком поздно), остальные '
+        'снимает параллельный release_expired_holds. В конце сверяются '
+        'счетчики мест и сводки продаж. Данные создаются в текущей базе и '
+        'удаляются после теста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=int, default=10000, help='Удержаний в минуту')
+        parser.add_argument('--seconds', type=float, default=60.0, help='Длительность симуляции')
+        parser.add_argument('--ttl', type=float, default=10.0, help='Срок удержания, с')
+        parser.add_argument('--pay-share', type=float, default=0.3, help='Доля удержаний, которые оплачивают')
+        parser.add_argument('--sweep-interval', type=float, default=1.0, help='Пауза между проходами обработчика, с')
+        parser.add_argument('--flights', type=int, default=60)
+        parser.add_argument('--rows', type=int, default=30)
+        parser.add_argument('--seats', type=int, default=6, help='Мест в ряду')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовые данные после теста')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['rate'] < 1 or options['flights'] < 1 or options['ttl'] <= 0:
+            raise CommandError('Нужны положительные частота, число рейсов и срок удержания')
+
+        created = {'board': None, 'airports': [], 'user': None}
+        try:
+            with override_settings(SEAT_HOLD_TTL=timedelta(seconds=options['ttl'])):
+                self.simulate(options, created)
+        finally:
+            if not options['keep']:
+                self.cleanup(created)
+
+    def setup(self, options, created):
+        run = secrets.token_hex(2)
+        created['board'] = create_board(options['rows'], options['seats'], number=f'Hold-{run}')
+        created['airports'] = create_airports(2)
+        flights = create_flights(created['board'], created['airports'], options['flights'])
+        materialize_flight_seats(flights)
+        created['user'] = User.objects.create_user(f'hold{run}', None, role='client')
+        client = Client.objects.create(user=created['user'], phone='+7 (900) 000-00-00')
+        seat_ids = list(FlightSeat.objects.filter(flight__in=flights).values_list('id', flat=True))
+        return [flight.id for flight in flights], client, seat_ids
+
+    def cleanup(self, created):
+        # Производитель каскадом удаляет модель, борт, рейсы, места, билеты и сводки
+        if created['board'] is not None:
+            Manufacturer.all_objects.filter(id=created['board'].model.manufacturer_id).delete()
+        Airport.all_objects.filter(id__in=[airport.id for airport in created['airports']]).delete()
+        Place.all_objects.filter(id__in=[airport.place_id for airport in created['airports']]).delete()
+        if created['user'] is not None:
+            User.objects.filter(id=created['user'].id).delete()
+
+    def simulate(self, options, created):
+        flight_ids, client, seat_ids = self.setup(options, created)
+        rng = random.Random(options['seed'])
+        stats = {
+            'held': 0, 'conflicts': 0, 'paid': 0, 'paid_late': 0, 'swept_before_pay': 0, 'errors': 0,
+            'hold_latencies': [], 'pay_latencies': [], 'sweeps': [], 'released': 0,
+        }
+        done = threading.Event()
+
+        def sweeper():
+            try:
+                while not done.wait(options['sweep_interval']):
+                    started = time.perf_counter()
+                    try:
+                        stats['released'] += release_expired_holds()
+                    except DatabaseError:
+                        stats['errors'] += 1
+                    stats['sweeps'].append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        def pay(ticket):
+            started = time.perf_counter()
+            try:
+                pay_ticket(ticket)
+                stats['paid'] += 1
+                stats['pay_latencies'].append(time.perf_counter() - started)
+            except FlightSeat.DoesNotExist:
+                # Удержание истекло, но обработчик до него еще не дошел
+                stats['paid_late'] += 1
+            except Ticket.DoesNotExist:
+                # Обработчик уже отменил неоплаченный билет
+                stats['swept_before_pay'] += 1
+            except DatabaseError:
+                stats['errors'] += 1
+
+        sweep_thread = threading.Thread(target=sweeper)
+        sweep_thread.start()
+        payments = []
+        interval = 60 / options['rate']
+        began = time.perf_counter()
+        deadline = began + options['seconds']
+        try:
+            attempt = 0
+            while time.perf_counter() < deadline:
+                now = time.perf_counter()
+                while payments and payments[0][0] <= now:
+                    _, _, ticket = heapq.heappop(payments)
+                    pay(ticket)
+
+                next_at = began + attempt * interval
+                if next_at > now:
+                    time.sleep(min(next_at - now, payments[0][0] - now if payments else next_at - now))
+                    continue
+                attempt += 1
+
+                started = time.perf_counter()
+                try:
+                    ticket = book_seat(client, rng.choice(seat_ids), hold=True)
+                except FlightSeat.DoesNotExist:
+                    stats['conflicts'] += 1
+                    continue
+                except DatabaseError:
+                    stats['errors'] += 1
+                    continue
+                stats['hold_latencies'].append(time.perf_counter() - started)
+                stats['held'] += 1
+                if rng.random() < options['pay_share']:
+                    # Часть покупателей платит уже после истечения удержания
+                    heapq.heappush(payments, (started + rng.uniform(0, options['ttl'] * 1.2), ticket.id, ticket))
+        finally:
+            done.set()
+            sweep_thread.join()
+        elapsed = time.perf_counter() - began
+
+        self.report(stats, elapsed, options)
+        self.check_consistency(flight_ids)
+
+    def report(self, stats, elapsed, options):
+        self.stdout.write(
+            f'Удержаний: {stats["held"]} за {elapsed:.0f} с ({stats["held"] / elapsed * 60:.0f} в минуту при цели '
+            f'{options["rate"]}), занятых мест при выборе: {stats["conflicts"]}; удержание p50 '
+            f'{_percentile(stats["hold_latencies"], 0.5) * 1000:.1f} мс, p99 {_percentile(stats["hold_latencies"], 0.99) * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'Оплачено: {stats["paid"]} (p99 {_percentile(stats["pay_latencies"], 0.99) * 1000:.1f} мс), '
+            f'поздно: {stats["paid_late"]}, уже снято обработчиком: {stats["swept_before_pay"]}'
+        )
+        self.stdout.write(
+            f'Обработчик: {len(stats["sweeps"])} проходов, освобождено {stats["released"]}, проход p50 '
+            f'{_percentile(stats["sweeps"], 0.5) * 1000:.1f} мс, макс {max(stats["sweeps"], default=0) * 1000:.1f} мс; '
+            f'ошибок базы: {stats["errors"]}'
+        )
+
+    def check_consistency(self, flight_ids):
+        with transaction.atomic():
+            stale = refresh_inventory(flight_ids)
+            stale_prices = refresh_min_prices(flight_ids)
+            transaction.set_rollback(True)
+        differences = rollup_differences(compute_rollups(flight_ids), stored_rollups(flight_ids))
+        if stale or stale_prices or differences:
+            raise CommandError(
+                f'Расхождения: счетчики рейсов {stale[:10]}, минимальные цены {stale_prices[:10]}, сводки {differences[:10]}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счетчики мест, минимальные цены и сводки продаж сходятся'))
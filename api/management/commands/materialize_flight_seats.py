@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Flight, FlightSeat
+from api.seating import SEAT_BATCH_SIZE, materialize_flight_seats
+
+
+class Command(BaseCommand):
+    help = 'Создает места для рейсов, у которых их еще нет (пакетными INSERT).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', type=int, nargs='*', dest='flight_ids', help='ID рейсов')
+        parser.add_argument('--include-past', action='store_true', help='Обрабатывать и прошедшие рейсы')
+        parser.add_argument('--batch-size', type=int, default=SEAT_BATCH_SIZE)
+        parser.add_argument('--chunk', type=int, default=200, help='Рейсов на одну транзакцию')
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.exclude(
+            id__in=FlightSeat.all_objects.values('flight_id')
+        ).order_by('id')
+        if options['flight_ids']:
+            flights = flights.filter(id__in=options['flight_ids'])
+        if not options['include_past']:
+            flights = flights.filter(departure_time__gte=timezone.now())
+
+        flight_ids = list(flights.values_list('id', flat=True))
+        created = 0
+        for start in range(0, len(flight_ids), options['chunk']):
+            chunk = Flight.objects.filter(id__in=flight_ids[start:start + options['chunk']])
+            created += materialize_flight_seats(chunk, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано мест: {created} для рейсов: {len(flight_ids)}'
+        ))
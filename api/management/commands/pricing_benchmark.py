@@ -0,0 +1,129 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Airport, Board, FareClass, Flight, Manufacturer, Model, Place
+from api.pricing import PRICING_FIELDS, flight_fares, get_fare_table, invalidate_fare_table, reprice_flights
+from api.seating import generate_layout, materialize_flight_seats, save_board_layout
+from api.seatmap import get_seat_map, invalidate_seat_map
+
+
+BENCHMARK_PREFIX = 'Bench'
+# Ценовые корзины по загрузке: (порог, множитель, код)
+BENCHMARK_BUCKETS = ((0.0, 1.0, 'Y'), (0.5, 1.2, 'M'), (0.8, 1.5, 'B'))
+
+
+def _timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеры цен: перецена расписания одним UPDATE, расчет тарифов рейсов '
+        'и карта мест с ценами при выборе места. Данные создаются в транзакции '
+        'и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flights', type=int, default=10000, help='Рейсов в расписании')
+        parser.add_argument('--seat-flights', type=int, default=100, help='Рейсов с местами для карты мест')
+        parser.add_argument('--rows', type=int, default=30)
+        parser.add_argument('--seats', type=int, default=6, help='Мест в ряду')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера (берется медиана)')
+
+    def setup(self, options):
+        manufacturer = Manufacturer.objects.create(name=BENCHMARK_PREFIX)
+        model = Model.objects.create(name=BENCHMARK_PREFIX, manufacturer=manufacturer)
+        board = Board.objects.create(
+            model=model, board_number=BENCHMARK_PREFIX, year=2020, seats_amount=options['rows'] * options['seats'],
+        )
+        seats_version = save_board_layout(board, generate_layout(options['rows'], options['seats'], 2))
+        airports = [
+            Airport.objects.create(place=Place.objects.create(name=f'{BENCHMARK_PREFIX} {number}'), name=f'{BENCHMARK_PREFIX}{number}')
+            for number in range(2)
+        ]
+        FareClass.objects.bulk_create([
+            FareClass(seat_type=seat_type, code=code, min_load_factor=min_load_factor, multiplier=multiplier)
+            for seat_type in ('Business', 'Economy')
+            for min_load_factor, multiplier, code in BENCHMARK_BUCKETS
+        ])
+
+        # bulk_create не вызывает сигналы: места создаются только для рейсов карты мест
+        departure_time = timezone.now() + timedelta(days=30)
+        flights = Flight.objects.bulk_create([
+            Flight(
+                board=board,
+                departure_time=departure_time + timedelta(minutes=number),
+                arrival_time=departure_time + timedelta(minutes=number, hours=2),
+                departure_airport=airports[0],
+                arrival_airport=airports[1],
+                economy_class_price=100,
+                business_class_price=500,
+            )
+            for number in range(options['flights'])
+        ], batch_size=1000)
+        materialize_flight_seats(flights[:options['seat_flights']])
+        return board, seats_version, flights
+
+    def handle(self, *args, **options):
+        if options['flights'] < 1 or options['repeat'] < 1:
+            raise CommandError('Нужен хотя бы один рейс и один повтор')
+        options['seat_flights'] = max(1, min(options['seat_flights'], options['flights']))
+
+        with transaction.atomic():
+            board, seats_version, flights = self.setup(options)
+            try:
+                self.measure(board, flights, options)
+            finally:
+                # Данные откатываются, а id в SQLite могут быть выданы снова:
+                # кеши, построенные по ним, сбрасываются
+                transaction.set_rollback(True)
+                invalidate_fare_table()
+                cache.delete(f'seat_layout:{board.id}:{seats_version}')
+                for flight in flights[:options['seat_flights']]:
+                    invalidate_seat_map(flight.id)
+
+    def measure(self, board, flights, options):
+        repeat = options['repeat']
+        schedule = Flight.objects.filter(board=board)
+
+        reprice = _timed(lambda: reprice_flights(schedule, 1.01), repeat)
+        self.stdout.write(f'Перецена {len(flights)} рейсов (UPDATE и пересчет минимальной цены): {reprice * 1000:.1f} мс')
+
+        loaded = list(schedule.only(*PRICING_FIELDS))
+        get_fare_table()
+        fares = _timed(lambda: [flight_fares(flight) for flight in loaded], repeat)
+        self.stdout.write(
+            f'Тарифы всех классов для {len(loaded)} рейсов: {fares * 1000:.1f} мс '
+            f'({fares / len(loaded) * 1e6:.1f} мкс на рейс)'
+        )
+
+        seat_flights = loaded[:options['seat_flights']]
+
+        def cold():
+            for flight in seat_flights:
+                invalidate_seat_map(flight.id)
+                get_seat_map(flight.id, flight)
+
+        def warm():
+            for flight in seat_flights:
+                get_seat_map(flight.id, flight)
+
+        seats = options['rows'] * options['seats']
+        cold_time = _timed(cold, repeat) / len(seat_flights)
+        warm_time = _timed(warm, repeat) / len(seat_flights)
+        self.stdout.write(
+            f'Карта мест с ценами ({seats} мест): построение {cold_time * 1000:.2f} мс, '
+            f'из кеша {warm_time * 1000:.3f} мс'
+        )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
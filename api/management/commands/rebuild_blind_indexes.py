@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from api.blind_index import rebuild_blind_indexes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает blind index зашифрованных полей (после смены BLIND_INDEX_KEY или FIELD_ENCRYPTION_KEY).'
+
+    def handle(self, *args, **options):
+        for model_class in apps.get_app_config('api').get_models():
+            if getattr(model_class, 'BLIND_INDEXES', None):
+                total = rebuild_blind_indexes(model_class)
+                self.stdout.write(f'{model_class.__name__}: {total}')
+        self.stdout.write(self.style.SUCCESS('Индексы пересчитаны'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.inventory import INVENTORY_BATCH_SIZE, refresh_inventory
+from api.models import Flight
+from api.pricing import refresh_min_prices
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики мест и минимальные цены рейсов с местами и тарифами и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', type=int, nargs='*', dest='flight_ids', help='ID рейсов')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения')
+        parser.add_argument('--chunk', type=int, default=INVENTORY_BATCH_SIZE, help='Рейсов на одну транзакцию')
+
+    def handle(self, *args, **options):
+        flights = Flight.all_objects.order_by('id')
+        if options['flight_ids']:
+            flights = flights.filter(id__in=options['flight_ids'])
+        flight_ids = list(flights.values_list('id', flat=True))
+
+        changed = []
+        for start in range(0, len(flight_ids), options['chunk']):
+            chunk = flight_ids[start:start + options['chunk']]
+            with transaction.atomic():
+                stale = set(refresh_inventory(chunk)) | set(refresh_min_prices(chunk))
+                changed.extend(sorted(stale))
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+
+        if changed:
+            self.stdout.write(f'Расхождения в рейсах: {", ".join(map(str, changed[:50]))}{" ..." if len(changed) > 50 else ""}')
+        verb = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено рейсов: {len(flight_ids)}. {verb} расхождений: {len(changed)}'
+        ))
@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from api.models import Flight
+from api.revenue import invalidate_revenue_days, invalidate_sales_days
+from api.rollups import (
+    ROLLUP_CHUNK_SIZE, compute_rollups, flight_id_chunks, rollup_differences, stored_rollups, write_rollups,
+)
+
+
+def _compute_chunk(flight_ids):
+    # Поток читает своим соединением и закрывает его сам
+    try:
+        return flight_ids, compute_rollups(flight_ids), stored_rollups(flight_ids)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Сверяет дневные сводки продаж с билетами и пересобирает расходящиеся.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', type=int, nargs='*', dest='flight_ids', help='ID рейсов')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения')
+        parser.add_argument('--full', action='store_true', help='Переписать сводки всех рейсов, даже совпадающие')
+        parser.add_argument('--chunk', type=int, default=ROLLUP_CHUNK_SIZE, help='Рейсов на одну транзакцию')
+        parser.add_argument('--workers', type=int, default=1, help='Потоков, считающих сводки по билетам')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunks = flight_id_chunks(options['chunk'], options['flight_ids'])
+
+        if options['workers'] > 1:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+            results = executor.map(_compute_chunk, chunks)
+        else:
+            executor = None
+            results = (
+                (flight_ids, compute_rollups(flight_ids), stored_rollups(flight_ids))
+                for flight_ids in chunks
+            )
+
+        # Чтение идет в потоках, запись — только в основном: у SQLite один писатель
+        checked = 0
+        changed = []
+        try:
+            for flight_ids, expected, stored in results:
+                checked += len(flight_ids)
+                differences = rollup_differences(expected, stored)
+                changed.extend(differences)
+                if options['dry_run'] or not (differences or options['full']):
+                    continue
+                write_rollups(flight_ids, expected)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        changed_flights = sorted({flight_id for flight_id, _ in changed})
+        if changed_flights and not options['dry_run']:
+            invalidate_sales_days(day for _, day in changed)
+            invalidate_revenue_days(
+                timezone.localdate(departure_time)
+                for departure_time in Flight.all_objects.filter(id__in=changed_flights).values_list('departure_time', flat=True)
+            )
+
+        if changed:
+            shown = ', '.join(f'{flight_id}/{day}' for flight_id, day in changed[:50])
+            self.stdout.write(f'Расхождения (рейс/день): {shown}{" ..." if len(changed) > 50 else ""}')
+        verb = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено рейсов: {checked}. {verb} расхождений: {len(changed)} '
+            f'в {len(changed_flights)} рейсах. Время: {time.perf_counter() - started:.2f} с'
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.booking import HOLD_SWEEP_BATCH_SIZE, release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Снимает просроченные удержания мест и отменяет неоплаченные билеты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=HOLD_SWEEP_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно как фоновый обработчик')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между проходами в секундах')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(batch_size=options['batch_size'])
+            if released or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Освобождено мест: {released}'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from api.models import Flight
+from api.pricing import BASE_PRICE_FIELDS, reprice_flights
+
+
+class Command(BaseCommand):
+    help = 'Изменяет базовые цены рейсов одним запросом (цены мест следуют за ними).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('factor', type=float, help='Множитель цены, например 1.1')
+        parser.add_argument('--seat-type', choices=list(BASE_PRICE_FIELDS), help='Только один класс')
+        parser.add_argument('--since', help='Вылет не раньше (ISO 8601)')
+        parser.add_argument('--until', help='Вылет не позже (ISO 8601)')
+        parser.add_argument('--departure-airport', type=int, help='ID аэропорта вылета')
+        parser.add_argument('--arrival-airport', type=int, help='ID аэропорта прилета')
+
+    def handle(self, *args, **options):
+        if options['factor'] <= 0:
+            raise CommandError('Множитель должен быть положительным')
+
+        flights = Flight.objects.all()
+        for option, lookup in (('since', 'departure_time__gte'), ('until', 'departure_time__lte')):
+            if options[option]:
+                value = parse_datetime(options[option])
+                if value is None:
+                    raise CommandError(f'Неверная дата: {options[option]}')
+                flights = flights.filter(**{lookup: value})
+        if options['departure_airport']:
+            flights = flights.filter(departure_airport_id=options['departure_airport'])
+        if options['arrival_airport']:
+            flights = flights.filter(arrival_airport_id=options['arrival_airport'])
+
+        updated = reprice_flights(flights, options['factor'], options['seat_type'])
+        self.stdout.write(self.style.SUCCESS(f'Изменены цены рейсов: {updated}'))
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import resource
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.seatstream import InProcessBroker, get_broker, publish_seat_status, seat_event_stream
+
+
+LOAD_FLIGHT_ID = 0
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест потока событий мест: одновременные подписчики '
+        'seat_event_stream одного рейса в одном event loop, события '
+        'публикуются из отдельного потока, как после коммита продажи. '
+        'Снимок карты мест не читается из базы. Брокер — из '
+        'SEAT_EVENTS_BROKER_URL (по умолчанию внутри процесса).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000, help='Одновременных подписчиков')
+        parser.add_argument('--events', type=int, default=50, help='Событий на рейс')
+        parser.add_argument('--interval', type=float, default=0.1, help='Пауза между событиями, с')
+        parser.add_argument('--seats', type=int, default=180, help='Мест в снимке карты')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Предельная длительность теста, с')
+
+    def handle(self, *args, **options):
+        if options['subscribers'] < 1 or options['events'] < 1:
+            raise CommandError('Нужен хотя бы один подписчик и одно событие')
+        stats = asyncio.run(self.run(options))
+
+        latencies = stats['latencies']
+        self.stdout.write(
+            f'Подписчиков: {options["subscribers"]}, подключены за {stats["connected"]:.2f} с; '
+            f'{options["events"]} событий доставлены за {stats["delivered"]:.2f} с'
+        )
+        self.stdout.write(
+            f'Доставлено {len(latencies)} из {options["subscribers"] * options["events"]}: '
+            f'p50 {_percentile(latencies, 0.5) * 1000:.1f} мс, p99 {_percentile(latencies, 0.99) * 1000:.1f} мс, '
+            f'макс {max(latencies, default=0) * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'Пересинхронизаций (переполнена очередь): {stats["resyncs"]}; '
+            f'пик памяти процесса {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} МБ'
+        )
+        if stats['timed_out']:
+            raise CommandError(f'Не все подписчики получили события за {options["timeout"]} с')
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    async def run(self, options):
+        seat_map = {'ids': list(range(options['seats'])), 'status': 'A' * options['seats']}
+        sent = {}
+        stats = {'latencies': [], 'resyncs': 0, 'timed_out': False}
+        connected = asyncio.Event()
+        subscribed = 0
+
+        async def snapshot():
+            return seat_map
+
+        async def subscriber():
+            nonlocal subscribed
+            stream = seat_event_stream(LOAD_FLIGHT_ID, snapshot)
+            last_seat = options['events'] - 1
+            try:
+                await anext(stream)
+                subscribed += 1
+                if subscribed == options['subscribers']:
+                    connected.set()
+                async for chunk in stream:
+                    if chunk.startswith('event: snapshot'):
+                        # Очередь переполнилась, события заменены снимком
+                        stats['resyncs'] += 1
+                        if last_seat in sent:
+                            return
+                    elif chunk.startswith('event: seat'):
+                        event = json.loads(chunk.split('data: ', 1)[1])
+                        stats['latencies'].append(time.perf_counter() - sent[event['seat']])
+                        if event['seat'] == last_seat:
+                            return
+            finally:
+                await stream.aclose()
+
+        def publish():
+            # Так же, как on_commit синхронного представления: из другого потока
+            for seat in range(options['events']):
+                sent[seat] = time.perf_counter()
+                publish_seat_status(LOAD_FLIGHT_ID, seat, 'sold')
+                time.sleep(options['interval'])
+
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(subscriber()) for _ in range(options['subscribers'])]
+        await asyncio.wait_for(connected.wait(), options['timeout'])
+        stats['connected'] = time.perf_counter() - started
+        broker = get_broker()
+        if isinstance(broker, InProcessBroker):
+            assert broker.subscriber_count(LOAD_FLIGHT_ID) == options['subscribers']
+
+        started = time.perf_counter()
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        _, pending = await asyncio.wait(tasks, timeout=options['timeout'])
+        stats['delivered'] = time.perf_counter() - started
+        publisher.join()
+        for task in pending:
+            task.cancel()
+        stats['timed_out'] = bool(pending)
+        await asyncio.gather(*pending, return_exceptions=True)
+        return stats
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import create_board, rolled_back, timed
+from api.models import BoardSeat
+from api.seating import generate_layout, get_seat_layout, latest_seats_version, save_board_layout
+
+
+def save_per_seat(board, layout):
+    # Прежний редактор: новая версия по одному INSERT на место
+    new_version = (latest_seats_version(board.id) or 0) + 1
+    for row_number, seat_number, seat_type in layout:
+        BoardSeat.objects.create(
+            board=board,
+            seat_type=seat_type,
+            row_number=row_number,
+            seat_number=seat_number,
+            seats_version=new_version,
+            is_deleted=False,
+        )
+
+
+def parse_layout(value):
+    try:
+        rows, seats = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise CommandError(f'Раскладка задается как РЯДЫxМЕСТА, получено {value!r}')
+    if rows < 1 or seats < 1:
+        raise CommandError(f'Пустая раскладка {value!r}')
+    return rows, seats
+
+
+class Command(BaseCommand):
+    help = (
+        'Время записи новой версии мест борта: прежний INSERT на каждое место '
+        'против пакетного save_board_layout, повторное сохранение той же '
+        'раскладки и чтение раскладки редактором. Данные создаются в '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layouts', nargs='+', default=['10x5', '50x6', '85x10'],
+            help='Раскладки РЯДЫxМЕСТА (по умолчанию 50, 300 и 850 мест)',
+        )
+        parser.add_argument('--business', type=int, default=1, help='Мест бизнес-класса в ряду')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера (берется медиана)')
+
+    def handle(self, *args, **options):
+        layouts = [parse_layout(value) for value in options['layouts']]
+        if options['repeat'] < 1:
+            raise CommandError('Нужен хотя бы один повтор')
+        repeat = options['repeat']
+
+        with rolled_back():
+            for number, (rows, seats) in enumerate(layouts):
+                board = create_board(1, 1, number=f'Bench-{number}')
+                # Каждый повтор пишет новую версию: раскладки чередуются
+                variants = [generate_layout(rows, seats, business) for business in (options['business'], 0)]
+                per_seat_runs = iter(range(repeat))
+                batched_runs = iter(range(repeat))
+
+                per_seat = timed(lambda: save_per_seat(board, variants[next(per_seat_runs) % 2]), repeat)
+                batched = timed(lambda: save_board_layout(board, variants[next(batched_runs) % 2]), repeat)
+                current = get_seat_layout(board.id)
+                unchanged = timed(lambda: save_board_layout(board, current), repeat)
+
+                def cold_read():
+                    cache.delete(f'seat_layout:{board.id}:{latest_seats_version(board.id)}')
+                    get_seat_layout(board.id)
+
+                cold = timed(cold_read, repeat)
+                warm = timed(lambda: get_seat_layout(board.id), repeat)
+
+                self.stdout.write(
+                    f'{rows}x{seats} ({rows * seats} мест): по месту {per_seat * 1000:.1f} мс, '
+                    f'пакетно {batched * 1000:.1f} мс ({per_seat / batched:.1f}x), '
+                    f'без изменений {unchanged * 1000:.2f} мс; чтение {cold * 1000:.2f} мс, '
+                    f'из кеша {warm * 1000:.3f} мс'
+                )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
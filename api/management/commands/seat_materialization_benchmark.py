@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import create_airports, create_board, create_flights, rolled_back, timed
+from api.models import BoardSeat, FlightSeat
+from api.seating import build_flight_seats, latest_seats_version, materialize_flight_seats
+
+
+def create_seats_per_row(flights):
+    # Прежний путь сигнала: раскладка читается из базы для каждого рейса,
+    # каждое место — отдельный INSERT
+    for flight in flights:
+        layout = BoardSeat.objects.filter(
+            board_id=flight.board_id,
+            seats_version=latest_seats_version(flight.board_id),
+        ).values_list('row_number', 'seat_number', 'seat_type')
+        for seat in build_flight_seats(flight, layout):
+            FlightSeat.objects.bulk_create([seat])
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает создание мест рейсов по одному INSERT на место с пакетным '
+        'materialize_flight_seats. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flights', type=int, nargs='+', default=[10, 100, 1000], help='Размеры пачек рейсов')
+        parser.add_argument('--rows', type=int, default=30)
+        parser.add_argument('--seats', type=int, default=6, help='Мест в ряду')
+
+    def handle(self, *args, **options):
+        if min(options['flights']) < 1:
+            raise CommandError('Нужен хотя бы один рейс')
+
+        with rolled_back():
+            board = create_board(options['rows'], options['seats'])
+            airports = create_airports(2)
+            for count in options['flights']:
+                per_row_flights = create_flights(board, airports, count)
+                batched_flights = create_flights(board, airports, count)
+                per_row = timed(lambda: create_seats_per_row(per_row_flights))
+                batched = timed(lambda: materialize_flight_seats(batched_flights))
+                self.stdout.write(
+                    f'{count} рейсов ({count * options["rows"] * options["seats"]} мест): '
+                    f'по строке {per_row * 1000:.0f} мс, пакетно {batched * 1000:.0f} мс, '
+                    f'ускорение {per_row / batched:.1f}x'
+                )
+        self.stdout.write(self.style.SUCCESS('Данные замера откатываются'))
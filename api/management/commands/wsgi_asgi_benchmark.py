@@ -0,0 +1,167 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import create_airports, create_board, generate_schedule
+from api.models import Airport, Manufacturer, Place
+
+
+SERVER_START_TIMEOUT = 30
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(port):
+    """
+    WSGI — многопоточный сервер Django (runserver), ASGI — uvicorn:
+    оба с одним процессом, чтобы сравнивать модели обработки, а не число
+    процессов.
+    """
+    return {
+        'WSGI': [sys.executable, '-m', 'django', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+        'ASGI': [
+            sys.executable, '-m', 'uvicorn', 'OsakaAirlines.asgi:application',
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--backlog', '2048',
+        ],
+    }
+
+
+async def fetch(port, path):
+    # Один запрос на соединение: каждое соединение занимает сервер заново
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def run_load(port, path, connections, seconds, timeout):
+    latencies = []
+    statuses = Counter()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+
+    async def connection():
+        while loop.time() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(fetch(port, path), timeout)
+            except (OSError, IndexError, ValueError, asyncio.TimeoutError) as e:
+                statuses[type(e).__name__] += 1
+                continue
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return latencies, statuses, time.perf_counter() - began
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение WSGI и ASGI под нагрузкой: одновременные соединения к '
+        'синхронному (DRF) и асинхронному поиску рейсов. Сервер запускается '
+        'отдельным процессом на текущей базе; созданные тестом рейсы '
+        'удаляются после теста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500, help='Одновременных соединений')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Длительность каждого прогона')
+        parser.add_argument('--flights', type=int, default=1000)
+        parser.add_argument('--timeout', type=float, default=30.0, help='Предельное время запроса, с')
+        parser.add_argument('--servers', nargs='+', choices=['WSGI', 'ASGI'], default=['WSGI', 'ASGI'])
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовые данные после теста')
+
+    def handle(self, *args, **options):
+        if options['connections'] < 1 or options['flights'] < 1:
+            raise CommandError('Нужно хотя бы одно соединение и один рейс')
+        if 'ASGI' in options['servers']:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError('Для ASGI нужен пакет uvicorn')
+
+        board = create_board(30, 6)
+        airports = create_airports(2)
+        try:
+            generate_schedule(board, airports, options['flights'], days=30)
+            query = urlencode({
+                'departure_place': airports[0].place.name,
+                'arrival_place': airports[1].place.name,
+                'page_size': 10,
+            })
+            paths = {'sync': f'/api/find_flights/?{query}', 'async': f'/api/async/find_flights/?{query}'}
+            for server in options['servers']:
+                self.benchmark(server, paths, options)
+        finally:
+            if not options['keep']:
+                # Производитель каскадом удаляет модель, борт и рейсы
+                Manufacturer.all_objects.filter(id=board.model.manufacturer_id).delete()
+                Airport.all_objects.filter(id__in=[airport.id for airport in airports]).delete()
+                Place.all_objects.filter(id__in=[airport.place_id for airport in airports]).delete()
+
+    def benchmark(self, server, paths, options):
+        port = free_port()
+        process = subprocess.Popen(
+            server_commands(port)[server],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'OsakaAirlines.settings')},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_server(process, port)
+            for name, path in paths.items():
+                # Прогрев: кеши аэропортов и первые соединения с базой
+                asyncio.run(run_load(port, path, 1, 0.5, options['timeout']))
+                latencies, statuses, elapsed = asyncio.run(
+                    run_load(port, path, options['connections'], options['seconds'], options['timeout'])
+                )
+                failed = {str(status): count for status, count in statuses.items() if status != 200}
+                self.stdout.write(
+                    f'{server}, {name} ({options["connections"]} соединений): '
+                    f'{len(latencies) / elapsed:.0f} запросов/с, p50 {_percentile(latencies, 0.5) * 1000:.0f} мс, '
+                    f'p99 {_percentile(latencies, 0.99) * 1000:.0f} мс, ошибок {sum(failed.values())} {failed or ""}'
+                )
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def wait_for_server(self, process, port):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Сервер завершился с кодом {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Сервер не начал слушать порт {port} за {SERVER_START_TIMEOUT} с')
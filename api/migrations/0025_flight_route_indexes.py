@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_delete_entitylog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100, verbose_name='Название'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_airport', 'arrival_airport', 'departure_time'], name='flight_route_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flight_departure_time_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:02
+
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Копия api.blind_index на момент миграции: миграция не зависит от
+# дальнейших изменений кода приложения
+
+def normalize_name(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', str(value))
+
+
+def blind_index(value, normalizer):
+    if value is None:
+        return None
+    normalized = normalizer(value)
+    if not normalized:
+        return None
+    key = getattr(settings, 'BLIND_INDEX_KEY', None) or settings.FIELD_ENCRYPTION_KEY
+    key = key.encode() if isinstance(key, str) else key
+    return hmac.new(key, normalized.encode(), hashlib.sha256).hexdigest()
+
+
+def fill_blind_indexes(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Client = apps.get_model('api', 'Client')
+
+    users = list(User.objects.all())
+    for user in users:
+        for field in ('first_name', 'middle_name', 'last_name'):
+            setattr(user, field + '_bidx', blind_index(getattr(user, field), normalize_name))
+    User.objects.bulk_update(users, ['first_name_bidx', 'middle_name_bidx', 'last_name_bidx'], batch_size=1000)
+
+    clients = list(Client.objects.all())
+    for client in clients:
+        client.phone_bidx = blind_index(client.phone, normalize_phone)
+    Client.objects.bulk_update(clients, ['phone_bidx'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_flight_route_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_bidx',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='first_name_bidx',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_name_bidx',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='middle_name_bidx',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_blind_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_blind_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatLayoutTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('rows', models.IntegerField(verbose_name='Количество рядов')),
+                ('seats', models.IntegerField(verbose_name='Мест в ряду')),
+                ('business', models.IntegerField(verbose_name='Мест бизнес-класса в ряду')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Удален')),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_layout_templates', to='api.model', verbose_name='Модель')),
+            ],
+            options={
+                'verbose_name': 'Шаблон раскладки мест',
+                'verbose_name_plural': 'Шаблоны раскладки мест',
+            },
+        ),
+    ]
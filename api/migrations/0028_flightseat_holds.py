@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_seatlayouttemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightseat',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Удерживается до'),
+        ),
+        migrations.AlterField(
+            model_name='flightseat',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('held', 'Held'), ('sold', 'Sold'), ('cancelled', 'Cancelled'), ('disabled', 'Disabled')], max_length=9, verbose_name='Статус'),
+        ),
+        migrations.AddIndex(
+            model_name='flightseat',
+            index=models.Index(condition=models.Q(('status', 'held')), fields=['held_until'], name='flightseat_hold_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:10
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+# Копия api.inventory.compute_inventory на момент миграции: миграция не
+# зависит от дальнейших изменений кода приложения
+CABINS = {'Business': 'business', 'Economy': 'economy'}
+COUNTED_STATUSES = ('available', 'held', 'sold')
+
+
+def compute_inventory(seats):
+    result = {}
+    for flight_id, seat_type, status, price in seats:
+        inventory = result.get(flight_id)
+        if inventory is None:
+            inventory = {f'{cabin}_{counted}': 0 for cabin in CABINS.values() for counted in COUNTED_STATUSES}
+            inventory['min_available_price'] = None
+            result[flight_id] = inventory
+        if status in COUNTED_STATUSES:
+            inventory[f"{CABINS.get(seat_type, 'economy')}_{status}"] += 1
+        if status == 'available' and price is not None and (
+            inventory['min_available_price'] is None or price < inventory['min_available_price']
+        ):
+            inventory['min_available_price'] = price
+    return result
+
+
+def fill_inventory(apps, schema_editor):
+    Flight = apps.get_model('api', 'Flight')
+    FlightSeat = apps.get_model('api', 'FlightSeat')
+    BoardSeat = apps.get_model('api', 'BoardSeat')
+
+    # Тип места берется из последней версии раскладки борта
+    latest = dict(
+        BoardSeat.objects.values('board_id').annotate(version=Max('seats_version')).values_list('board_id', 'version')
+    )
+    business = set(
+        (board_id, row_number, seat_number)
+        for board_id, version, row_number, seat_number in BoardSeat.objects.filter(
+            seat_type='Business', is_deleted=False
+        ).values_list('board_id', 'seats_version', 'row_number', 'seat_number')
+        if latest.get(board_id) == version
+    )
+    seats = list(FlightSeat.objects.select_related('flight').only('id', 'row_number', 'seat', 'flight__board_id'))
+    for seat in seats:
+        seat.seat_type = 'Business' if (seat.flight.board_id, seat.row_number, seat.seat) in business else 'Economy'
+    FlightSeat.objects.bulk_update(seats, ['seat_type'], batch_size=1000)
+
+    inventory = compute_inventory(
+        FlightSeat.objects.filter(is_deleted=False).values_list('flight_id', 'seat_type', 'status', 'price')
+    )
+    flights = list(Flight.objects.filter(id__in=inventory))
+    for flight in flights:
+        for field, value in inventory[flight.id].items():
+            setattr(flight, field, value)
+    if flights:
+        Flight.objects.bulk_update(flights, list(inventory[flights[0].id]), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_flightseat_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='business_available',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Свободно (бизнес)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='business_held',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Удерживается (бизнес)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='business_sold',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Продано (бизнес)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='economy_available',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Свободно (эконом)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='economy_held',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Удерживается (эконом)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='economy_sold',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Продано (эконом)'),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='min_available_price',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Минимальная цена свободного места'),
+        ),
+        migrations.AddField(
+            model_name='flightseat',
+            name='seat_type',
+            field=models.CharField(default='Economy', max_length=20, verbose_name='Тип места'),
+        ),
+        migrations.RunPython(fill_inventory, migrations.RunPython.noop),
+    ]
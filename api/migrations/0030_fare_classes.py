@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_available_prices(apps, schema_editor):
+    # Цены свободных мест были копиями цен рейса, теперь их дает api.pricing
+    FlightSeat = apps.get_model('api', 'FlightSeat')
+    FlightSeat.objects.filter(status='available').update(price=None)
+
+
+def restore_seat_prices(apps, schema_editor):
+    FlightSeat = apps.get_model('api', 'FlightSeat')
+    Flight = apps.get_model('api', 'Flight')
+    for seat_type, field in (('Business', 'business_class_price'), ('Economy', 'economy_class_price')):
+        FlightSeat.objects.filter(price__isnull=True, seat_type=seat_type).update(
+            price=Flight.objects.filter(id=models.OuterRef('flight_id')).values(field)[:1]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_flight_inventory'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='flight',
+            name='min_available_price',
+        ),
+        migrations.AlterField(
+            model_name='flightseat',
+            name='price',
+            field=models.FloatField(blank=True, null=True, verbose_name='Цена'),
+        ),
+        migrations.RunPython(clear_available_prices, restore_seat_prices),
+        migrations.CreateModel(
+            name='FareClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_type', models.CharField(choices=[('Economy', 'Economy'), ('Business', 'Business')], max_length=20, verbose_name='Тип места')),
+                ('code', models.CharField(max_length=10, verbose_name='Код тарифа')),
+                ('min_load_factor', models.FloatField(default=0.0, verbose_name='Загрузка от')),
+                ('multiplier', models.FloatField(default=1.0, verbose_name='Множитель цены')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Удален')),
+                ('flight', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fare_classes', to='api.flight', verbose_name='Рейс')),
+            ],
+            options={
+                'verbose_name': 'Тариф',
+                'verbose_name_plural': 'Тарифы',
+                'ordering': ['seat_type', 'min_load_factor'],
+            },
+        ),
+    ]
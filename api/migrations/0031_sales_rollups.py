@@ -0,0 +1,117 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+# Логика сводок на момент миграции: последующие правки api.rollups ее не меняют
+ROLLUP_FIELDS = ('sold', 'cancelled', 'paid', 'revenue', 'paid_revenue')
+
+
+def aggregate_sales(tickets):
+    tickets = tickets.filter(is_deleted=False).order_by()
+    rollups = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    for row in tickets.annotate(day=TruncDate('created_at')).values('flight_seat__flight_id', 'day').annotate(
+        count=Count('id'), amount=Sum('price'),
+    ):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['sold'] += row['count']
+        rollup['revenue'] += row['amount'] or 0.0
+
+    for row in tickets.filter(paid_at__isnull=False).annotate(day=TruncDate('paid_at')).values(
+        'flight_seat__flight_id', 'day',
+    ).annotate(count=Count('id'), amount=Sum('price')):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['paid'] += row['count']
+        rollup['paid_revenue'] += row['amount'] or 0.0
+
+    for row in tickets.filter(is_canceled=True, canceled_at__isnull=False).annotate(day=TruncDate('canceled_at')).values(
+        'flight_seat__flight_id', 'day',
+    ).annotate(
+        count=Count('id'),
+        amount=Sum('price'),
+        paid_count=Count('id', filter=Q(is_paid=True)),
+        paid_amount=Sum('price', filter=Q(is_paid=True)),
+    ):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['cancelled'] += row['count']
+        rollup['revenue'] -= row['amount'] or 0.0
+        rollup['paid'] -= row['paid_count']
+        rollup['paid_revenue'] -= row['paid_amount'] or 0.0
+
+    return dict(rollups)
+
+
+def fill_ticket_events(apps, schema_editor):
+    Ticket = apps.get_model('api', 'Ticket')
+    FlightSeat = apps.get_model('api', 'FlightSeat')
+    FlightSalesDaily = apps.get_model('api', 'FlightSalesDaily')
+
+    # Время прежних событий неизвестно — считаем их моментом создания
+    Ticket.objects.update(price=Subquery(FlightSeat.objects.filter(id=OuterRef('flight_seat_id')).values('price')[:1]))
+    Ticket.objects.filter(is_paid=True).update(paid_at=F('created_at'))
+    Ticket.objects.filter(is_canceled=True).update(canceled_at=F('created_at'))
+
+    FlightSalesDaily.objects.bulk_create(
+        [
+            FlightSalesDaily(flight_id=flight_id, day=day, **values)
+            for (flight_id, day), values in aggregate_sales(Ticket.objects.all()).items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_fare_classes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='canceled_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отменен в'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создан'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Оплачен в'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='price',
+            field=models.FloatField(blank=True, null=True, verbose_name='Цена'),
+        ),
+        migrations.CreateModel(
+            name='FlightSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('sold', models.IntegerField(default=0, verbose_name='Продано')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='Отменено')),
+                ('paid', models.IntegerField(default=0, verbose_name='Оплачено')),
+                ('revenue', models.FloatField(default=0.0, verbose_name='Выручка')),
+                ('paid_revenue', models.FloatField(default=0.0, verbose_name='Оплаченная выручка')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.flight', verbose_name='Рейс')),
+            ],
+            options={
+                'verbose_name': 'Продажи рейса за день',
+                'verbose_name_plural': 'Продажи рейсов по дням',
+                'indexes': [models.Index(fields=['day'], name='flight_sales_daily_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('flight', 'day'), name='flight_sales_daily_unique')],
+            },
+        ),
+        migrations.RunPython(fill_ticket_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,172 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:48
+
+import django.db.models.deletion
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='airport',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Аэропорт', 'verbose_name_plural': 'Аэропорты'},
+        ),
+        migrations.AlterModelOptions(
+            name='board',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Борт', 'verbose_name_plural': 'Борты'},
+        ),
+        migrations.AlterModelOptions(
+            name='boardseat',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Место на борту', 'verbose_name_plural': 'Места на борту'},
+        ),
+        migrations.AlterModelOptions(
+            name='client',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Клиент', 'verbose_name_plural': 'Клиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='employee',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Сотрудник', 'verbose_name_plural': 'Сотрудники'},
+        ),
+        migrations.AlterModelOptions(
+            name='fareclass',
+            options={'default_manager_name': 'all_objects', 'ordering': ['seat_type', 'min_load_factor'], 'verbose_name': 'Тариф', 'verbose_name_plural': 'Тарифы'},
+        ),
+        migrations.AlterModelOptions(
+            name='flight',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Рейс', 'verbose_name_plural': 'Рейсы'},
+        ),
+        migrations.AlterModelOptions(
+            name='flightseat',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Место на рейсе', 'verbose_name_plural': 'Места на рейсах'},
+        ),
+        migrations.AlterModelOptions(
+            name='manufacturer',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Производитель', 'verbose_name_plural': 'Производители'},
+        ),
+        migrations.AlterModelOptions(
+            name='model',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Модель', 'verbose_name_plural': 'Модели'},
+        ),
+        migrations.AlterModelOptions(
+            name='place',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Место', 'verbose_name_plural': 'Места'},
+        ),
+        migrations.AlterModelOptions(
+            name='seatlayouttemplate',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Шаблон раскладки мест', 'verbose_name_plural': 'Шаблоны раскладки мест'},
+        ),
+        migrations.AlterModelOptions(
+            name='ticket',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Билет', 'verbose_name_plural': 'Билеты'},
+        ),
+        migrations.AlterModelManagers(
+            name='airport',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='board',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='boardseat',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='client',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='employee',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='fareclass',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='flight',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='flightseat',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='manufacturer',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='model',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='place',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='seatlayouttemplate',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='ticket',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='boardseat',
+            name='board',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.board', verbose_name='Борт'),
+        ),
+        migrations.AlterField(
+            model_name='flightseat',
+            name='flight',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.flight', verbose_name='Рейс'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='client',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.client', verbose_name='Клиент'),
+        ),
+        migrations.AddIndex(
+            model_name='boardseat',
+            index=models.Index(fields=['board', 'seats_version'], name='boardseat_board_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightseat',
+            index=models.Index(fields=['flight', 'status', 'seat_type', 'is_deleted'], name='flightseat_flight_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['client', 'is_canceled', 'is_deleted'], name='ticket_client_active_idx'),
+        ),
+    ]
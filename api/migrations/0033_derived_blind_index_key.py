@@ -0,0 +1,65 @@
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Копия api.blind_index на момент миграции: индекс считается ключом,
+# выведенным из FIELD_ENCRYPTION_KEY, а не самим ключом шифрования
+
+def normalize_name(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', str(value))
+
+
+def _encode(key):
+    return key.encode() if isinstance(key, str) else key
+
+
+def blind_index_key():
+    key = getattr(settings, 'BLIND_INDEX_KEY', None)
+    if key:
+        return _encode(key)
+    return hmac.new(_encode(settings.FIELD_ENCRYPTION_KEY), b'blind-index', hashlib.sha256).digest()
+
+
+def blind_index(key, value, normalizer):
+    if value is None:
+        return None
+    normalized = normalizer(value)
+    if not normalized:
+        return None
+    return hmac.new(key, normalized.encode(), hashlib.sha256).hexdigest()
+
+
+def refill_blind_indexes(apps, schema_editor):
+    key = blind_index_key()
+    User = apps.get_model('api', 'User')
+    Client = apps.get_model('api', 'Client')
+
+    users = list(User._base_manager.all())
+    for user in users:
+        for field in ('first_name', 'middle_name', 'last_name'):
+            setattr(user, field + '_bidx', blind_index(key, getattr(user, field), normalize_name))
+    User._base_manager.bulk_update(users, ['first_name_bidx', 'middle_name_bidx', 'last_name_bidx'], batch_size=1000)
+
+    clients = list(Client._base_manager.all())
+    for client in clients:
+        client.phone_bidx = blind_index(key, client.phone, normalize_phone)
+    Client._base_manager.bulk_update(clients, ['phone_bidx'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_soft_delete_managers_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(refill_blind_indexes, migrations.RunPython.noop),
+    ]
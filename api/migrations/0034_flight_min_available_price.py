@@ -0,0 +1,64 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+# Копия расчета api.pricing на момент миграции: миграция не зависит от
+# дальнейших изменений кода приложения
+CABINS = {'Business': 'business', 'Economy': 'economy'}
+BASE_PRICE_FIELDS = {'Business': 'business_class_price', 'Economy': 'economy_class_price'}
+BATCH_SIZE = 1000
+
+
+def fare_price(flight, seat_type, table):
+    cabin = CABINS[seat_type]
+    taken = getattr(flight, f'{cabin}_held') + getattr(flight, f'{cabin}_sold')
+    total = taken + getattr(flight, f'{cabin}_available')
+    load = taken / total if total else 0.0
+    multiplier = 1.0
+    for min_load_factor, bucket_multiplier in table.get((flight.id, seat_type)) or table.get((None, seat_type)) or ():
+        if load < min_load_factor:
+            break
+        multiplier = bucket_multiplier
+    return round(getattr(flight, BASE_PRICE_FIELDS[seat_type]) * multiplier, 2)
+
+
+def fill_min_prices(apps, schema_editor):
+    Flight = apps.get_model('api', 'Flight')
+    FareClass = apps.get_model('api', 'FareClass')
+
+    table = {}
+    for flight_id, seat_type, min_load_factor, multiplier in FareClass._base_manager.filter(is_deleted=False).order_by(
+        'flight_id', 'seat_type', 'min_load_factor',
+    ).values_list('flight_id', 'seat_type', 'min_load_factor', 'multiplier'):
+        table.setdefault((flight_id, seat_type), []).append((min_load_factor, multiplier))
+
+    batch = []
+    for flight in Flight._base_manager.iterator(chunk_size=BATCH_SIZE):
+        flight.min_available_price = min((
+            fare_price(flight, seat_type, table)
+            for seat_type, cabin in CABINS.items() if getattr(flight, f'{cabin}_available')
+        ), default=None)
+        if flight.min_available_price is not None:
+            batch.append(flight)
+        if len(batch) >= BATCH_SIZE:
+            Flight._base_manager.bulk_update(batch, ['min_available_price'])
+            batch = []
+    if batch:
+        Flight._base_manager.bulk_update(batch, ['min_available_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_derived_blind_index_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='min_available_price',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Минимальная цена свободного места'),
+        ),
+        migrations.RunPython(fill_min_prices, migrations.RunPython.noop),
+    ]
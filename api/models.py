@@ -1,11 +1,31 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.contrib.auth.models import BaseUserManager
+from django.utils import timezone
 from encrypted_model_fields.fields import EncryptedCharField
 from django.contrib.auth.models import User
+from .blind_index import normalize_name, normalize_phone, update_blind_indexes
 
 
 
+class SoftDeleteQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        return self.filter(is_deleted=True)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Менеджер objects моделей с is_deleted: скрывает удаленные записи.
+    Все записи доступны через all_objects — он же менеджер по умолчанию
+    для админки, форм, связей и резервных копий (Meta.default_manager_name).
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, login, password=None, **extra_fields):
         if not login:
@@ -41,6 +61,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     first_name = EncryptedCharField(max_length=100, null=True, blank=True)
     middle_name = EncryptedCharField(max_length=100, null=True, blank=True)
     last_name = EncryptedCharField(max_length=100, null=True, blank=True)
+    first_name_bidx = models.CharField(max_length=64, null=True, blank=True, editable=False, db_index=True)
+    middle_name_bidx = models.CharField(max_length=64, null=True, blank=True, editable=False, db_index=True)
+    last_name_bidx = models.CharField(max_length=64, null=True, blank=True, editable=False, db_index=True)
     login = models.CharField(max_length=12, unique=True, verbose_name="Логин")
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name="Роль")
     is_active = models.BooleanField(default=True, verbose_name="Активен")
@@ -67,9 +90,19 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'login'
     REQUIRED_FIELDS = []
 
+    BLIND_INDEXES = {
+        'first_name': normalize_name,
+        'middle_name': normalize_name,
+        'last_name': normalize_name,
+    }
+
     def __str__(self):
         return self.login
 
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = update_blind_indexes(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
     def get_model_name(self):
         return self.__class__.__name__
 
@@ -81,15 +114,28 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Client(models.Model):
     phone = EncryptedCharField(max_length=15, verbose_name="Телефон")
+    phone_bidx = models.CharField(max_length=64, null=True, blank=True, editable=False, db_index=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="Пользователь")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    BLIND_INDEXES = {
+        'phone': normalize_phone,
+    }
+
     def get_model_name(self):
         return self.__class__.__name__
 
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = update_blind_indexes(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Клиент'
         verbose_name_plural = 'Клиенты'
+        default_manager_name = 'all_objects'
 
 
 class Employee(models.Model):
@@ -97,17 +143,22 @@ class Employee(models.Model):
     email = models.EmailField(verbose_name="Электронная почта")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def get_model_name(self):
         return self.__class__.__name__
 
     class Meta:
         verbose_name = 'Сотрудник'
         verbose_name_plural = 'Сотрудники'
+        default_manager_name = 'all_objects'
 
 
 class FlightSeat(models.Model):
     STATUS_CHOICES = [
         ('available', 'Available'),
+        ('held', 'Held'),
         ('sold', 'Sold'),
         ('cancelled', 'Cancelled'),
         ('disabled', 'Disabled'),
@@ -116,11 +167,17 @@ class FlightSeat(models.Model):
     id = models.AutoField(primary_key=True)
     seat = models.IntegerField(verbose_name="Место")
     row_number = models.IntegerField(verbose_name="Номер ряда")
-    flight = models.ForeignKey('Flight', on_delete=models.CASCADE, verbose_name="Рейс")
+    flight = models.ForeignKey('Flight', on_delete=models.CASCADE, db_index=False, verbose_name="Рейс")
     status = models.CharField(max_length=9, choices=STATUS_CHOICES, verbose_name="Статус")
-    price = models.FloatField(verbose_name="Цена")
+    # Цена, по которой место продано; у свободных мест цену дает api.pricing
+    price = models.FloatField(null=True, blank=True, verbose_name="Цена")
+    seat_type = models.CharField(max_length=20, default='Economy', verbose_name="Тип места")
+    held_until = models.DateTimeField(null=True, blank=True, verbose_name="Удерживается до")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def row_letter(self):
         return chr(64 + self.row_number)  # 65 in ASCII is 'A'
 
@@ -133,14 +190,30 @@ class FlightSeat(models.Model):
     class Meta:
         verbose_name = 'Место на рейсе'
         verbose_name_plural = 'Места на рейсах'
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Частичный индекс: очистка просроченных удержаний не сканирует проданные места
+            models.Index(fields=['held_until'], name='flightseat_hold_expiry_idx', condition=models.Q(status='held')),
+            # Заменяет индекс внешнего ключа flight; покрывающий для пересчета
+            # счетчиков: группировка по классу и статусу не читает таблицу
+            models.Index(fields=['flight', 'status', 'seat_type', 'is_deleted'], name='flightseat_flight_status_idx'),
+        ]
 
 
 class Ticket(models.Model):
-    client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name="Клиент")
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, db_index=False, verbose_name="Клиент")
     flight_seat = models.ForeignKey(FlightSeat, on_delete=models.CASCADE, verbose_name="Место на рейсе")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
     is_canceled = models.BooleanField(default=False, verbose_name="Отменен")
     is_paid = models.BooleanField(default=False, verbose_name="Оплачен")
+    # Цена и время событий билета — по ним строятся дневные сводки продаж
+    price = models.FloatField(null=True, blank=True, verbose_name="Цена")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Создан")
+    paid_at = models.DateTimeField(null=True, blank=True, verbose_name="Оплачен в")
+    canceled_at = models.DateTimeField(null=True, blank=True, verbose_name="Отменен в")
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
     def get_model_name(self):
         return self.__class__.__name__
@@ -148,16 +221,54 @@ class Ticket(models.Model):
     class Meta:
         verbose_name = 'Билет'
         verbose_name_plural = 'Билеты'
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Заменяет индекс внешнего ключа client: действующие билеты клиента
+            models.Index(fields=['client', 'is_canceled', 'is_deleted'], name='ticket_client_active_idx'),
+        ]
+
+
+class FlightSalesDaily(models.Model):
+    """
+    Сводка продаж рейса за день событий: сколько билетов продано, отменено
+    и оплачено в этот день и как изменилась выручка. Значения — приращения,
+    поэтому отмены дают отрицательную выручку в день отмены. Ведется
+    api.rollups при бронировании, оплате и отмене, а изменения билетов
+    через формы, админку и REST API — сигналами сохранения билета.
+    """
+    flight = models.ForeignKey('Flight', on_delete=models.CASCADE, related_name='daily_sales', verbose_name="Рейс")
+    day = models.DateField(verbose_name="День")
+    sold = models.IntegerField(default=0, verbose_name="Продано")
+    cancelled = models.IntegerField(default=0, verbose_name="Отменено")
+    paid = models.IntegerField(default=0, verbose_name="Оплачено")
+    revenue = models.FloatField(default=0.0, verbose_name="Выручка")
+    paid_revenue = models.FloatField(default=0.0, verbose_name="Оплаченная выручка")
+
+    def get_model_name(self):
+        return self.__class__.__name__
+
+    class Meta:
+        verbose_name = 'Продажи рейса за день'
+        verbose_name_plural = 'Продажи рейсов по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'day'], name='flight_sales_daily_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='flight_sales_daily_day_idx'),
+        ]
 
 
 class BoardSeat(models.Model):
-    board = models.ForeignKey('Board', on_delete=models.CASCADE, verbose_name="Борт")
+    board = models.ForeignKey('Board', on_delete=models.CASCADE, db_index=False, verbose_name="Борт")
     seat_type = models.CharField(max_length=20, verbose_name="Тип места") 
     row_number = models.IntegerField(verbose_name="Номер ряда")
     seat_number = models.IntegerField(verbose_name="Номер места")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
     seats_version = models.IntegerField(verbose_name="Версия мест")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     SEAT_TYPE_CHOICES = [
         ('Economy', 'Economy'),
         ('Business', 'Business'),
@@ -169,14 +280,22 @@ class BoardSeat(models.Model):
     class Meta:
         verbose_name = 'Место на борту'
         verbose_name_plural = 'Места на борту'
+        default_manager_name = 'all_objects'
+        indexes = [
+            # Заменяет индекс внешнего ключа board: раскладка версии и последняя версия мест
+            models.Index(fields=['board', 'seats_version'], name='boardseat_board_version_idx'),
+        ]
 
 
 class Place(models.Model):
-    name = models.CharField(max_length=100, verbose_name="Название")
+    name = models.CharField(max_length=100, db_index=True, verbose_name="Название")
     latitude = models.DecimalField(max_digits=9, decimal_places=6, default=0.000000, verbose_name="Широта")
     longitude = models.DecimalField(max_digits=9, decimal_places=6, default=0.000000, verbose_name="Долгота")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -186,6 +305,7 @@ class Place(models.Model):
     class Meta:
         verbose_name = 'Место'
         verbose_name_plural = 'Места'
+        default_manager_name = 'all_objects'
 
 
 class Airport(models.Model):
@@ -194,6 +314,9 @@ class Airport(models.Model):
     full_name = models.CharField(max_length=100, verbose_name="Полное название")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.place.name})"
 
@@ -203,6 +326,7 @@ class Airport(models.Model):
     class Meta:
         verbose_name = 'Аэропорт'
         verbose_name_plural = 'Аэропорты'
+        default_manager_name = 'all_objects'
 
 
 class Flight(models.Model):
@@ -219,6 +343,40 @@ class Flight(models.Model):
     business_class_price = models.FloatField(default=0.0, verbose_name="Цена бизнес класса")
     economy_class_price = models.FloatField(default=0.0, verbose_name="Цена эконом класса")
 
+    # Денормализованные счетчики мест, их ведет api.inventory
+    business_available = models.PositiveIntegerField(default=0, editable=False, verbose_name="Свободно (бизнес)")
+    business_held = models.PositiveIntegerField(default=0, editable=False, verbose_name="Удерживается (бизнес)")
+    business_sold = models.PositiveIntegerField(default=0, editable=False, verbose_name="Продано (бизнес)")
+    economy_available = models.PositiveIntegerField(default=0, editable=False, verbose_name="Свободно (эконом)")
+    economy_held = models.PositiveIntegerField(default=0, editable=False, verbose_name="Удерживается (эконом)")
+    economy_sold = models.PositiveIntegerField(default=0, editable=False, verbose_name="Продано (эконом)")
+    # Цена самого дешевого свободного места по текущим тарифам, ее ведет api.pricing
+    min_available_price = models.FloatField(null=True, blank=True, editable=False, verbose_name="Минимальная цена свободного места")
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    INVENTORY_FIELDS = (
+        'business_available', 'business_held', 'business_sold',
+        'economy_available', 'economy_held', 'economy_sold',
+    )
+    # Поля, которые пересчитываются по местам и тарифам, а не редактируются
+    DERIVED_FIELDS = INVENTORY_FIELDS + ('min_available_price',)
+
+    @property
+    def seats_available(self):
+        return self.business_available + self.economy_available
+
+    def save(self, *args, **kwargs):
+        # Обычное сохранение не перезаписывает счетчики и цену, измененные параллельными продажами
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skip = set(self.DERIVED_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skip and field.name not in skip
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         departure_airport = self.departure_airport.name if self.departure_airport else "Unknown Departure"
         arrival_airport = self.arrival_airport.name if self.arrival_airport else "Unknown Arrival"
@@ -230,6 +388,40 @@ class Flight(models.Model):
     class Meta:
         verbose_name = 'Рейс'
         verbose_name_plural = 'Рейсы'
+        default_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['departure_airport', 'arrival_airport', 'departure_time'], name='flight_route_time_idx'),
+            models.Index(fields=['departure_time'], name='flight_departure_time_idx'),
+        ]
+
+
+class FareClass(models.Model):
+    """
+    Ценовая корзина класса обслуживания: когда доля занятых мест класса
+    достигает min_load_factor, базовая цена рейса умножается на multiplier.
+    Корзины без рейса действуют для всех рейсов, у которых нет своих.
+    """
+    flight = models.ForeignKey('Flight', on_delete=models.CASCADE, null=True, blank=True, related_name='fare_classes', verbose_name="Рейс")
+    seat_type = models.CharField(max_length=20, choices=BoardSeat.SEAT_TYPE_CHOICES, verbose_name="Тип места")
+    code = models.CharField(max_length=10, verbose_name="Код тарифа")
+    min_load_factor = models.FloatField(default=0.0, verbose_name="Загрузка от")
+    multiplier = models.FloatField(default=1.0, verbose_name="Множитель цены")
+    is_deleted = models.BooleanField(default=False, verbose_name="Удален")
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.code} ({self.seat_type}, от {self.min_load_factor:.0%})"
+
+    def get_model_name(self):
+        return self.__class__.__name__
+
+    class Meta:
+        verbose_name = 'Тариф'
+        verbose_name_plural = 'Тарифы'
+        default_manager_name = 'all_objects'
+        ordering = ['seat_type', 'min_load_factor']
 
 
 class Board(models.Model):
@@ -239,6 +431,9 @@ class Board(models.Model):
     seats_amount = models.IntegerField(verbose_name="Количество мест")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         if self.model and self.model.manufacturer:
             return f"{self.model.manufacturer.name} {self.model.name} {self.board_number}"
@@ -250,6 +445,7 @@ class Board(models.Model):
     class Meta:
         verbose_name = 'Борт'
         verbose_name_plural = 'Борты'
+        default_manager_name = 'all_objects'
 
 
 class Model(models.Model):
@@ -257,6 +453,9 @@ class Model(models.Model):
     name = models.CharField(max_length=100, verbose_name="Название модели")
     is_deleted = models.BooleanField(default=False, verbose_name="Удалена")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         if self.manufacturer:
             return f"{self.manufacturer.name} {self.name}"
@@ -268,12 +467,39 @@ class Model(models.Model):
     class Meta:
         verbose_name = 'Модель'
         verbose_name_plural = 'Модели'
+        default_manager_name = 'all_objects'
+
+
+class SeatLayoutTemplate(models.Model):
+    model = models.ForeignKey('Model', on_delete=models.CASCADE, related_name='seat_layout_templates', verbose_name="Модель")
+    name = models.CharField(max_length=100, verbose_name="Название")
+    rows = models.IntegerField(verbose_name="Количество рядов")
+    seats = models.IntegerField(verbose_name="Мест в ряду")
+    business = models.IntegerField(verbose_name="Мест бизнес-класса в ряду")
+    is_deleted = models.BooleanField(default=False, verbose_name="Удален")
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name} ({self.rows}x{self.seats})"
+
+    def get_model_name(self):
+        return self.__class__.__name__
+
+    class Meta:
+        verbose_name = 'Шаблон раскладки мест'
+        verbose_name_plural = 'Шаблоны раскладки мест'
+        default_manager_name = 'all_objects'
 
 
 class Manufacturer(models.Model):
     name = models.CharField(max_length=100, verbose_name="Название производителя")
     is_deleted = models.BooleanField(default=False, verbose_name="Удален")
 
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -283,3 +509,4 @@ class Manufacturer(models.Model):
     class Meta:
         verbose_name = 'Производитель'
         verbose_name_plural = 'Производители'
+        default_manager_name = 'all_objects'
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Round
+
+from .inventory import CABINS, INVENTORY_BATCH_SIZE
+from .models import FareClass, Flight
+
+
+FARE_TABLE_KEY = 'fares:table'
+FARE_TABLE_TIMEOUT = 60 * 60
+BASE_PRICE_FIELDS = {'Business': 'business_class_price', 'Economy': 'economy_class_price'}
+# Поля рейса, достаточные для расчета цены (базовые цены и счетчики мест)
+PRICING_FIELDS = ('id', *BASE_PRICE_FIELDS.values(), *Flight.INVENTORY_FIELDS)
+
+
+def fare_table_timeout():
+    # Сброс таблицы виден другим процессам только через общий кеш (CACHE_URL);
+    # с локальным кешем новые корзины применятся по истечении срока
+    return getattr(settings, 'FARE_TABLE_TIMEOUT', FARE_TABLE_TIMEOUT)
+
+
+@dataclass(frozen=True)
+class Fare:
+    code: str
+    price: float
+
+
+def get_fare_table():
+    """
+    Все действующие ценовые корзины одним словарем
+    {(flight_id или None, seat_type): [(min_load_factor, multiplier, code), ...]}
+    по возрастанию загрузки. Таблица маленькая и кешируется целиком до
+    изменения тарифов, но не дольше fare_table_timeout().
+    """
+    table = cache.get(FARE_TABLE_KEY)
+    if table is None:
+        table = {}
+        for flight_id, seat_type, code, min_load_factor, multiplier in FareClass.objects.order_by('flight_id', 'seat_type', 'min_load_factor').values_list(
+            'flight_id', 'seat_type', 'code', 'min_load_factor', 'multiplier',
+        ):
+            table.setdefault((flight_id, seat_type), []).append((min_load_factor, multiplier, code))
+        cache.set(FARE_TABLE_KEY, table, fare_table_timeout())
+    return table
+
+
+def invalidate_fare_table():
+    cache.delete(FARE_TABLE_KEY)
+
+
+def load_factor(flight, seat_type):
+    """
+    Доля удерживаемых и проданных мест класса по счетчикам рейса.
+    """
+    cabin = CABINS.get(seat_type, 'economy')
+    taken = getattr(flight, f'{cabin}_held') + getattr(flight, f'{cabin}_sold')
+    total = taken + getattr(flight, f'{cabin}_available')
+    return taken / total if total else 0.0
+
+
+def fare_for(flight, seat_type, table=None):
+    """
+    Текущий тариф места класса seat_type: корзина рейса (или общая) с
+    наибольшим порогом загрузки, не превышающим текущую загрузку.
+    Без корзин действует базовая цена рейса.
+    """
+    table = get_fare_table() if table is None else table
+    buckets = table.get((flight.id, seat_type)) or table.get((None, seat_type)) or ()
+    load = load_factor(flight, seat_type)
+
+    code, multiplier = '', 1.0
+    for min_load_factor, bucket_multiplier, bucket_code in buckets:
+        if load < min_load_factor:
+            break
+        code, multiplier = bucket_code, bucket_multiplier
+
+    base_price = getattr(flight, BASE_PRICE_FIELDS.get(seat_type, 'economy_class_price'))
+    return Fare(code, round(base_price * multiplier, 2))
+
+
+def flight_fares(flight, table=None):
+    """
+    Тарифы всех классов рейса: {seat_type: Fare}.
+    """
+    table = get_fare_table() if table is None else table
+    return {seat_type: fare_for(flight, seat_type, table) for seat_type in CABINS}
+
+
+def current_fares(flight_id):
+    return flight_fares(Flight.all_objects.only(*PRICING_FIELDS).get(id=flight_id))
+
+
+def min_available_price(flight, table=None):
+    """
+    Цена самого дешевого свободного места рейса по текущим тарифам или
+    None, если свободных мест нет.
+    """
+    table = get_fare_table() if table is None else table
+    return min((
+        fare_for(flight, seat_type, table).price
+        for seat_type, cabin in CABINS.items() if getattr(flight, f'{cabin}_available')
+    ), default=None)
+
+
+def refresh_min_prices(flight_ids):
+    """
+    Пересчитывает Flight.min_available_price и сохраняет пакетно только
+    изменившиеся рейсы. Вызывается везде, где меняются счетчики мест,
+    базовые цены или ценовые корзины. Возвращает список рейсов, у
+    которых цена отличалась.
+    """
+    flight_ids = list(flight_ids)
+    table = get_fare_table()
+    changed = []
+    for start in range(0, len(flight_ids), INVENTORY_BATCH_SIZE):
+        chunk = flight_ids[start:start + INVENTORY_BATCH_SIZE]
+        stale = []
+        for flight in Flight.all_objects.filter(id__in=chunk).only(*PRICING_FIELDS, 'min_available_price'):
+            price = min_available_price(flight, table)
+            if flight.min_available_price != price:
+                flight.min_available_price = price
+                stale.append(flight)
+        if stale:
+            Flight.all_objects.bulk_update(stale, ['min_available_price'], batch_size=INVENTORY_BATCH_SIZE)
+            changed.extend(flight.id for flight in stale)
+    return changed
+
+
+def reprice_flights(flights, factor=None, seat_type=None):
+    """
+    Умножает базовые цены рейсов queryset flights на factor одним UPDATE.
+    Цены мест вычисляются от базовых при чтении, поэтому места рейсов не
+    обновляются, пересчитывается только min_available_price рейсов.
+    Возвращает количество измененных рейсов.
+    """
+    fields = [BASE_PRICE_FIELDS[seat_type]] if seat_type else list(BASE_PRICE_FIELDS.values())
+    # Рейсы запоминаются до UPDATE: фильтр flights может зависеть от цен
+    flight_ids = list(flights.values_list('id', flat=True))
+    updated = flights.update(**{field: Round(F(field) * factor, 2) for field in fields})
+    refresh_min_prices(flight_ids)
+    return updated
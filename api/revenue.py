@@ -0,0 +1,267 @@
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Airport, Flight, FlightSalesDaily, FlightSeat
+
+
+REVENUE_DAY_TIMEOUT = 60 * 60 * 24
+REVENUE_TOP = 20
+# Колонки дневного среза: по одному значению на рейс
+BUCKET_COLUMNS = ('flight', 'route', 'capacity', 'sold', 'tickets', 'paid', 'revenue', 'paid_revenue')
+
+
+def revenue_day_timeout():
+    """
+    Срок хранения дневных срезов. Сброс срезов при изменении билетов и
+    рейсов доходит до всех процессов только через общий кеш (CACHE_URL);
+    с локальным кешем процесса срез другого воркера обновится по истечении
+    этого срока.
+    """
+    return getattr(settings, 'REVENUE_DAY_TIMEOUT', REVENUE_DAY_TIMEOUT)
+
+
+def revenue_day_key(day):
+    return f'revenue:day:{day.isoformat()}'
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def empty_bucket():
+    return {column: [] for column in BUCKET_COLUMNS}
+
+
+def compute_days(first_day, last_day):
+    """
+    Дневные срезы за [first_day, last_day] двумя агрегирующими запросами:
+    рейсы со счетчиками мест и суммы их дневных сводок продаж.
+    Возвращает {день: срез}, срез — колонки BUCKET_COLUMNS.
+    """
+    start, end = day_start(first_day), day_start(last_day + timedelta(days=1))
+    flights = Flight.objects.filter(
+        departure_time__gte=start,
+        departure_time__lt=end,
+    ).order_by('departure_time', 'id').values_list(
+        'id', 'departure_time', 'departure_airport_id', 'arrival_airport_id',
+        *(f'{cabin}_{status}' for cabin in ('business', 'economy') for status in ('available', 'held', 'sold')),
+    )
+
+    # Продажи берутся из дневных сводок рейсов, таблица билетов не читается
+    tickets = {
+        row['flight_id']: row
+        for row in FlightSalesDaily.objects.filter(
+            flight__departure_time__gte=start,
+            flight__departure_time__lt=end,
+        ).order_by().values('flight_id').annotate(
+            total_sold=Sum('sold'),
+            total_cancelled=Sum('cancelled'),
+            total_paid=Sum('paid'),
+            total_revenue=Sum('revenue'),
+            total_paid_revenue=Sum('paid_revenue'),
+        )
+    }
+
+    buckets = {}
+    day = first_day
+    while day <= last_day:
+        buckets[day] = empty_bucket()
+        day += timedelta(days=1)
+
+    for flight_id, departure_time, departure_id, arrival_id, *counters in flights:
+        bucket = buckets[timezone.localdate(departure_time)]
+        business_available, business_held, business_sold, economy_available, economy_held, economy_sold = counters
+        sales = tickets.get(flight_id, {})
+        bucket['flight'].append(flight_id)
+        bucket['route'].append((departure_id, arrival_id))
+        bucket['capacity'].append(sum(counters))
+        bucket['sold'].append(business_sold + economy_sold)
+        bucket['tickets'].append(sales.get('total_sold', 0) - sales.get('total_cancelled', 0))
+        bucket['paid'].append(sales.get('total_paid', 0))
+        bucket['revenue'].append(sales.get('total_revenue') or 0.0)
+        bucket['paid_revenue'].append(sales.get('total_paid_revenue') or 0.0)
+    return buckets
+
+
+def _missing_ranges(days):
+    """
+    Группирует отсутствующие в кеше дни в непрерывные отрезки: каждый
+    отрезок считается одной парой запросов.
+    """
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def get_revenue_days(first_day, last_day):
+    """
+    Дневные срезы за период из кеша; недостающие дни досчитываются и
+    кешируются. Возвращает список (день, срез) по возрастанию дат.
+    """
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    cached = cache.get_many([revenue_day_key(day) for day in days])
+    buckets = {day: cached[revenue_day_key(day)] for day in days if revenue_day_key(day) in cached}
+
+    missing = [day for day in days if day not in buckets]
+    for range_start, range_end in _missing_ranges(missing):
+        computed = compute_days(range_start, range_end)
+        cache.set_many({revenue_day_key(day): bucket for day, bucket in computed.items()}, revenue_day_timeout())
+        buckets.update(computed)
+    return [(day, buckets[day]) for day in days]
+
+
+def invalidate_revenue_days(days):
+    cache.delete_many([revenue_day_key(day) for day in set(days)])
+
+
+def revenue_seats_changed(seat_ids):
+    """
+    Сбрасывает дневные срезы рейсов, к которым относятся места: следующий
+    запрос пересчитает только эти дни.
+    """
+    invalidate_revenue_days(
+        timezone.localdate(departure_time)
+        for departure_time in FlightSeat.all_objects.filter(id__in=list(seat_ids)).values_list(
+            'flight__departure_time', flat=True,
+        )
+    )
+
+
+def revenue_sales_key(day):
+    return f'revenue:sales:{day.isoformat()}'
+
+
+def compute_sales_days(first_day, last_day):
+    """
+    Продажи, оплаты и отмены по дням событий за [first_day, last_day]
+    одним запросом по индексу дня сводок. Возвращает {день: итоги}.
+    """
+    sales = {}
+    day = first_day
+    while day <= last_day:
+        sales[day] = {'day': day, 'sold': 0, 'cancelled': 0, 'paid': 0, 'revenue': 0.0, 'paid_revenue': 0.0}
+        day += timedelta(days=1)
+
+    for row in FlightSalesDaily.objects.filter(day__gte=first_day, day__lte=last_day).values('day').annotate(
+        total_sold=Sum('sold'),
+        total_cancelled=Sum('cancelled'),
+        total_paid=Sum('paid'),
+        total_revenue=Sum('revenue'),
+        total_paid_revenue=Sum('paid_revenue'),
+    ).order_by():
+        sales[row['day']].update(
+            sold=row['total_sold'],
+            cancelled=row['total_cancelled'],
+            paid=row['total_paid'],
+            revenue=row['total_revenue'],
+            paid_revenue=row['total_paid_revenue'],
+        )
+    return sales
+
+
+def sales_by_day(first_day, last_day):
+    """
+    Ряд продаж по дням событий. Прошедшие дни не меняются (события
+    пишутся в сводку текущего дня) и берутся из кеша; сегодняшний и
+    будущие считаются всегда.
+    """
+    today = timezone.localdate()
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    past = [day for day in days if day < today]
+    cached = cache.get_many([revenue_sales_key(day) for day in past])
+    sales = {day: cached[revenue_sales_key(day)] for day in past if revenue_sales_key(day) in cached}
+
+    for range_start, range_end in _missing_ranges([day for day in past if day not in sales]):
+        computed = compute_sales_days(range_start, range_end)
+        cache.set_many({revenue_sales_key(day): values for day, values in computed.items()}, revenue_day_timeout())
+        sales.update(computed)
+    if last_day >= today:
+        sales.update(compute_sales_days(max(first_day, today), last_day))
+    return [sales[day] for day in days]
+
+
+def invalidate_sales_days(days):
+    cache.delete_many([revenue_sales_key(day) for day in set(days)])
+
+
+def _ratio(part, whole):
+    return part / whole if whole else 0.0
+
+
+def _summary(capacity, sold, tickets, paid, revenue, paid_revenue):
+    return {
+        'capacity': capacity,
+        'sold': sold,
+        'load_factor': _ratio(sold, capacity),
+        'tickets': tickets,
+        'paid': paid,
+        'unpaid': tickets - paid,
+        'paid_ratio': _ratio(paid, tickets),
+        'revenue': revenue,
+        'paid_revenue': paid_revenue,
+        'unpaid_revenue': revenue - paid_revenue,
+    }
+
+
+def revenue_dashboard(first_day, last_day, top=REVENUE_TOP):
+    """
+    Сводка для Revenue Manager за период: итоги и ряды по дням вылета,
+    продажи по дням событий, лучшие направления и рейсы по выручке, доли
+    оплаченных билетов. Все суммы считаются по дневным срезам и сводкам
+    продаж без запросов к таблицам билетов.
+    """
+    days = get_revenue_days(first_day, last_day)
+
+    daily = []
+    routes = {}
+    totals = [0, 0, 0, 0, 0.0, 0.0]
+    best_flights = []
+    for day, bucket in days:
+        columns = [bucket[column] for column in ('capacity', 'sold', 'tickets', 'paid', 'revenue', 'paid_revenue')]
+        day_totals = [sum(column) for column in columns]
+        daily.append({'day': day, 'flights': len(bucket['flight']), **_summary(*day_totals)})
+        totals = [total + value for total, value in zip(totals, day_totals)]
+
+        for route, *values in zip(bucket['route'], *columns):
+            route_totals = routes.setdefault(route, [0, 0, 0, 0, 0.0, 0.0, 0])
+            for index, value in enumerate(values):
+                route_totals[index] += value
+            route_totals[6] += 1
+        best_flights = heapq.nlargest(
+            top,
+            best_flights + list(zip(bucket['revenue'], bucket['flight'], bucket['capacity'], bucket['sold'])),
+        )
+
+    top_routes = heapq.nlargest(top, routes.items(), key=lambda item: item[1][4])
+    airport_ids = {airport_id for route, _ in top_routes for airport_id in route}
+    airport_names = dict(Airport.all_objects.filter(id__in=airport_ids).values_list('id', 'name'))
+
+    return {
+        'first_day': first_day,
+        'last_day': last_day,
+        'totals': {'flights': sum(item['flights'] for item in daily), **_summary(*totals)},
+        'daily': daily,
+        'sales': sales_by_day(first_day, last_day),
+        'routes': [
+            {
+                'departure': airport_names.get(departure_id),
+                'arrival': airport_names.get(arrival_id),
+                'flights': values[6],
+                **_summary(*values[:6]),
+            }
+            for (departure_id, arrival_id), values in top_routes
+        ],
+        'flights': [
+            {'flight': flight_id, 'revenue': revenue, 'capacity': capacity, 'sold': sold, 'load_factor': _ratio(sold, capacity)}
+            for revenue, flight_id, capacity, sold in best_flights
+        ],
+    }
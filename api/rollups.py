@@ -0,0 +1,205 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Flight, FlightSalesDaily, Ticket
+
+
+ROLLUP_FIELDS = ('sold', 'cancelled', 'paid', 'revenue', 'paid_revenue')
+ROLLUP_CHUNK_SIZE = 500
+
+
+def empty_rollup():
+    return dict.fromkeys(ROLLUP_FIELDS, 0)
+
+
+def record_sales(flight_id, day=None, **deltas):
+    """
+    Прибавляет приращения к сводке рейса за день одним UPDATE с
+    F-выражениями; строка создается при первом событии дня. Вызывается в
+    транзакции события, поэтому сводка не расходится с билетами.
+    """
+    day = day or timezone.localdate()
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    rows = FlightSalesDaily.objects.filter(flight_id=flight_id, day=day)
+    if rows.update(**{field: F(field) + value for field, value in deltas.items()}):
+        return
+    try:
+        with transaction.atomic():
+            FlightSalesDaily.objects.create(flight_id=flight_id, day=day, **deltas)
+    except IntegrityError:
+        # Строку дня успел создать параллельный запрос
+        rows.update(**{field: F(field) + value for field, value in deltas.items()})
+
+
+TICKET_SALES_FIELDS = ('price', 'created_at', 'paid_at', 'canceled_at', 'is_paid', 'is_canceled', 'is_deleted')
+
+
+def ticket_sales_state(ticket_id):
+    """
+    Сохраненное состояние билета, от которого зависят сводки, или None.
+    """
+    return Ticket.all_objects.filter(id=ticket_id).values(
+        *TICKET_SALES_FIELDS, flight_id=F('flight_seat__flight_id'),
+    ).first()
+
+
+def ticket_rollups(state):
+    """
+    Вклад одного билета в сводки — так же, как его считает aggregate_sales:
+    {(flight_id, day): {поле: значение}}.
+    """
+    rollups = defaultdict(empty_rollup)
+    if state is None or state['is_deleted']:
+        return rollups
+    flight_id, price = state['flight_id'], state['price'] or 0.0
+
+    rollup = rollups[flight_id, timezone.localdate(state['created_at'])]
+    rollup['sold'] += 1
+    rollup['revenue'] += price
+    if state['paid_at'] is not None:
+        rollup = rollups[flight_id, timezone.localdate(state['paid_at'])]
+        rollup['paid'] += 1
+        rollup['paid_revenue'] += price
+    if state['is_canceled'] and state['canceled_at'] is not None:
+        rollup = rollups[flight_id, timezone.localdate(state['canceled_at'])]
+        rollup['cancelled'] += 1
+        rollup['revenue'] -= price
+        if state['is_paid']:
+            rollup['paid'] -= 1
+            rollup['paid_revenue'] -= price
+    return rollups
+
+
+def record_ticket_change(previous, current):
+    """
+    Переносит в сводки разницу между прежним и новым состоянием билета
+    (None — билета нет). Нужна изменениям через save() и delete(): формы,
+    админка, REST API. Сервисы api.booking меняют билеты UPDATE-ом и
+    пишут сводки сами.
+
+    Удаление только вычитает из существующих строк: при каскадном
+    удалении рейса новая строка сводки сослалась бы на удаленный рейс.
+    Возвращает дни, сводки которых изменились.
+    """
+    before, after = ticket_rollups(previous), ticket_rollups(current)
+    days = set()
+    for flight_id, day in before.keys() | after.keys():
+        deltas = {
+            field: after[flight_id, day][field] - before[flight_id, day][field]
+            for field in ROLLUP_FIELDS
+            if after[flight_id, day][field] != before[flight_id, day][field]
+        }
+        if not deltas:
+            continue
+        days.add(day)
+        if current is None:
+            FlightSalesDaily.objects.filter(flight_id=flight_id, day=day).update(
+                **{field: F(field) + value for field, value in deltas.items()}
+            )
+        else:
+            record_sales(flight_id, day, **deltas)
+    return days
+
+
+def aggregate_sales(tickets):
+    """
+    Сводки из билетов queryset tickets: {(flight_id, day): {поле: значение}}.
+    Три группирующих запроса — по дням продажи, оплаты и отмены.
+    """
+    tickets = tickets.filter(is_deleted=False).order_by()
+    rollups = defaultdict(empty_rollup)
+
+    for row in tickets.annotate(day=TruncDate('created_at')).values('flight_seat__flight_id', 'day').annotate(
+        count=Count('id'), amount=Sum('price'),
+    ):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['sold'] += row['count']
+        rollup['revenue'] += row['amount'] or 0.0
+
+    for row in tickets.filter(paid_at__isnull=False).annotate(day=TruncDate('paid_at')).values(
+        'flight_seat__flight_id', 'day',
+    ).annotate(count=Count('id'), amount=Sum('price')):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['paid'] += row['count']
+        rollup['paid_revenue'] += row['amount'] or 0.0
+
+    # Отмена оплаченного билета возвращает и оплату
+    for row in tickets.filter(is_canceled=True, canceled_at__isnull=False).annotate(day=TruncDate('canceled_at')).values(
+        'flight_seat__flight_id', 'day',
+    ).annotate(
+        count=Count('id'),
+        amount=Sum('price'),
+        paid_count=Count('id', filter=Q(is_paid=True)),
+        paid_amount=Sum('price', filter=Q(is_paid=True)),
+    ):
+        rollup = rollups[row['flight_seat__flight_id'], row['day']]
+        rollup['cancelled'] += row['count']
+        rollup['revenue'] -= row['amount'] or 0.0
+        rollup['paid'] -= row['paid_count']
+        rollup['paid_revenue'] -= row['paid_amount'] or 0.0
+
+    return dict(rollups)
+
+
+def compute_rollups(flight_ids):
+    return aggregate_sales(Ticket.objects.filter(flight_seat__flight_id__in=list(flight_ids)))
+
+
+def stored_rollups(flight_ids):
+    return {
+        (row['flight_id'], row['day']): {field: row[field] for field in ROLLUP_FIELDS}
+        for row in FlightSalesDaily.objects.filter(flight_id__in=list(flight_ids)).values('flight_id', 'day', *ROLLUP_FIELDS)
+    }
+
+
+def write_rollups(flight_ids, rollups):
+    """
+    Заменяет сводки рейсов flight_ids на rollups в одной транзакции.
+    """
+    with transaction.atomic():
+        FlightSalesDaily.objects.filter(flight_id__in=list(flight_ids)).delete()
+        FlightSalesDaily.objects.bulk_create(
+            [FlightSalesDaily(flight_id=flight_id, day=day, **values) for (flight_id, day), values in rollups.items()],
+            batch_size=ROLLUP_CHUNK_SIZE,
+        )
+
+
+def rebuild_rollups(flight_ids):
+    """
+    Пересобирает сводки рейсов по их билетам, если они разошлись, — для
+    пакетных изменений билетов мимо сигналов (импорт). Возвращает дни,
+    сводки которых изменились.
+    """
+    flight_ids = list(flight_ids)
+    expected = compute_rollups(flight_ids)
+    changed = rollup_differences(expected, stored_rollups(flight_ids))
+    if changed:
+        write_rollups(flight_ids, expected)
+    return {day for _, day in changed}
+
+
+def rollup_differences(expected, stored, tolerance=0.005):
+    """
+    Ключи (flight_id, day), по которым сохраненные сводки расходятся с
+    посчитанными по билетам.
+    """
+    differences = []
+    for key in expected.keys() | stored.keys():
+        left, right = expected.get(key, empty_rollup()), stored.get(key, empty_rollup())
+        if any(abs(left[field] - right[field]) > tolerance for field in ROLLUP_FIELDS):
+            differences.append(key)
+    return sorted(differences)
+
+
+def flight_id_chunks(chunk_size=ROLLUP_CHUNK_SIZE, flight_ids=None):
+    flights = Flight.all_objects.order_by('id')
+    if flight_ids:
+        flights = flights.filter(id__in=flight_ids)
+    flight_ids = list(flights.values_list('id', flat=True))
+    return [flight_ids[start:start + chunk_size] for start in range(0, len(flight_ids), chunk_size)]
@@ -0,0 +1,133 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.pagination import CursorPagination
+
+from .models import Airport, Flight
+
+
+PLACE_AIRPORTS_TIMEOUT = 60 * 60
+PLACE_AIRPORTS_GENERATION_KEY = 'place_airports:generation'
+
+
+class FlightSearchPagination(CursorPagination):
+    """
+    Keyset-пагинация по времени вылета: стоимость страницы не зависит
+    от ее номера и размера таблицы рейсов.
+    """
+    ordering = ('departure_time', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+def place_airports_timeout():
+    # Смена поколения видна другим процессам только через общий кеш (CACHE_URL);
+    # с локальным кешем новый или перенесенный аэропорт найдется по истечении срока
+    return getattr(settings, 'PLACE_AIRPORTS_TIMEOUT', PLACE_AIRPORTS_TIMEOUT)
+
+
+def _place_airports_generation():
+    return cache.get_or_set(PLACE_AIRPORTS_GENERATION_KEY, 0, None)
+
+
+def invalidate_place_airports():
+    """
+    Сбрасывает кеш соответствия место -> аэропорты (при изменении Place/Airport).
+    """
+    try:
+        cache.incr(PLACE_AIRPORTS_GENERATION_KEY)
+    except ValueError:
+        cache.set(PLACE_AIRPORTS_GENERATION_KEY, 0, None)
+
+
+def _place_airports_key(place_name, generation):
+    digest = hashlib.md5(place_name.encode()).hexdigest()
+    return f'place_airports:{generation}:{digest}'
+
+
+def _place_airports(place_name):
+    return Airport.objects.filter(
+        place__name=place_name,
+        place__is_deleted=False,
+    ).values_list('id', flat=True)
+
+
+def resolve_airport_ids(place_name):
+    """
+    Возвращает ID неудаленных аэропортов места с указанным названием.
+    Результат кешируется до изменения мест или аэропортов, но не дольше
+    place_airports_timeout().
+    """
+    if not place_name:
+        return []
+
+    cache_key = _place_airports_key(place_name, _place_airports_generation())
+    airport_ids = cache.get(cache_key)
+    if airport_ids is None:
+        airport_ids = list(_place_airports(place_name))
+        cache.set(cache_key, airport_ids, place_airports_timeout())
+    return airport_ids
+
+
+async def aresolve_airport_ids(place_name):
+    """
+    Асинхронный вариант resolve_airport_ids с тем же ключом кеша.
+    """
+    if not place_name:
+        return []
+
+    generation = await cache.aget_or_set(PLACE_AIRPORTS_GENERATION_KEY, 0, None)
+    cache_key = _place_airports_key(place_name, generation)
+    airport_ids = await cache.aget(cache_key)
+    if airport_ids is None:
+        airport_ids = [airport_id async for airport_id in _place_airports(place_name)]
+        await cache.aset(cache_key, airport_ids, place_airports_timeout())
+    return airport_ids
+
+
+def flights_between(departure_ids, arrival_ids, start_date=None, end_date=None, min_seats=None):
+    if not departure_ids or not arrival_ids:
+        return Flight.objects.none()
+
+    flights = Flight.objects.filter(
+        departure_airport_id__in=departure_ids,
+        arrival_airport_id__in=arrival_ids,
+    )
+    if start_date:
+        flights = flights.filter(departure_time__gte=start_date)
+    if end_date:
+        flights = flights.filter(departure_time__lte=end_date)
+    if min_seats:
+        # Счетчики мест хранятся в строке рейса, join с местами не нужен
+        flights = flights.alias(
+            seats_left=F('economy_available') + F('business_available')
+        ).filter(seats_left__gte=min_seats)
+    return flights.order_by('departure_time', 'id')
+
+
+def search_flights(departure_place, arrival_place, start_date=None, end_date=None, min_seats=None):
+    """
+    Рейсы между двумя местами, упорядоченные по времени вылета.
+    Фильтр идет по ID аэропортов, поэтому запрос обслуживается составным
+    индексом (departure_airport, arrival_airport, departure_time) без join.
+    """
+    return flights_between(
+        resolve_airport_ids(departure_place),
+        resolve_airport_ids(arrival_place),
+        start_date,
+        end_date,
+        min_seats,
+    )
+
+
+async def asearch_flights(departure_place, arrival_place, start_date=None, end_date=None, min_seats=None):
+    return flights_between(
+        await aresolve_airport_ids(departure_place),
+        await aresolve_airport_ids(arrival_place),
+        start_date,
+        end_date,
+        min_seats,
+    )
@@ -0,0 +1,151 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .inventory import refresh_inventory
+from .models import BoardSeat, FlightSeat
+from .pricing import refresh_min_prices
+
+
+SEAT_BATCH_SIZE = 500
+LAYOUT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def latest_seats_version(board_id):
+    """
+    Возвращает последнюю версию мест борта (или None, если мест нет).
+    """
+    return BoardSeat.all_objects.filter(board_id=board_id).aggregate(
+        max_version=Max('seats_version')
+    )['max_version']
+
+
+def get_seat_layout(board_id, seats_version=None):
+    """
+    Возвращает шаблон раскладки мест борта: список кортежей
+    (row_number, seat_number, seat_type).
+
+    Версия мест неизменяема после создания, поэтому шаблон кешируется
+    по паре (борт, версия) без инвалидации.
+    """
+    if seats_version is None:
+        seats_version = latest_seats_version(board_id)
+    if seats_version is None:
+        return []
+
+    cache_key = f'seat_layout:{board_id}:{seats_version}'
+    layout = cache.get(cache_key)
+    if layout is None:
+        layout = list(
+            BoardSeat.objects.filter(
+                board_id=board_id,
+                seats_version=seats_version,
+            ).order_by('row_number', 'seat_number').values_list('row_number', 'seat_number', 'seat_type')
+        )
+        cache.set(cache_key, layout, LAYOUT_CACHE_TIMEOUT)
+    return layout
+
+
+def generate_layout(rows, seats, business):
+    """
+    Строит раскладку в формате get_seat_layout: номера мест 1..seats в
+    каждом из rows рядов, первые business номеров — бизнес-класс.
+    """
+    return [
+        (row_number, seat_number, 'Business' if seat_number <= business else 'Economy')
+        for row_number in range(1, rows + 1)
+        for seat_number in range(1, seats + 1)
+    ]
+
+
+def layout_summary(layout):
+    """
+    Параметры раскладки (rows, seats, business) для формы редактора.
+    """
+    rows = {row_number for row_number, _, _ in layout}
+    seats = max((seat_number for _, seat_number, _ in layout), default=0)
+    business = max((seat_number for _, seat_number, seat_type in layout if seat_type == 'Business'), default=0)
+    return len(rows), seats, business
+
+
+def save_board_layout(board, layout):
+    """
+    Сохраняет раскладку как новую версию мест борта одним пакетным INSERT.
+
+    Версии неизменяемы (по ним создаются места рейсов), поэтому при
+    совпадении с текущей версией ничего не записывается. Возвращает
+    номер актуальной версии.
+    """
+    with transaction.atomic():
+        current_version = latest_seats_version(board.id)
+        if current_version is not None and get_seat_layout(board.id, current_version) == layout:
+            return current_version
+
+        new_version = (current_version or 0) + 1
+        BoardSeat.objects.bulk_create([
+            BoardSeat(
+                board=board,
+                seat_type=seat_type,
+                row_number=row_number,
+                seat_number=seat_number,
+                seats_version=new_version,
+                is_deleted=False,
+            )
+            for row_number, seat_number, seat_type in layout
+        ], batch_size=SEAT_BATCH_SIZE)
+
+    cache.set(f'seat_layout:{board.id}:{new_version}', layout, LAYOUT_CACHE_TIMEOUT)
+    return new_version
+
+
+def apply_layout_template(board, template):
+    return save_board_layout(board, generate_layout(template.rows, template.seats, template.business))
+
+
+def build_flight_seats(flight, layout):
+    return [
+        FlightSeat(
+            seat=seat_number,
+            row_number=row_number,
+            flight=flight,
+            status='available',
+            seat_type=seat_type,
+            is_deleted=False,
+        )
+        for row_number, seat_number, seat_type in layout
+    ]
+
+
+def materialize_flight_seats(flights, batch_size=SEAT_BATCH_SIZE):
+    """
+    Создает места для рейсов пакетными INSERT в одной транзакции.
+    Раскладка каждого борта загружается один раз на вызов, счетчики мест
+    и минимальные цены рейсов пересчитываются в той же транзакции.
+
+    Возвращает количество созданных мест.
+    """
+    layouts = {}
+    created = 0
+    pending = []
+    flight_ids = []
+
+    with transaction.atomic():
+        for flight in flights:
+            flight_ids.append(flight.id)
+            if flight.board_id not in layouts:
+                layouts[flight.board_id] = get_seat_layout(flight.board_id)
+            pending.extend(build_flight_seats(flight, layouts[flight.board_id]))
+
+            if len(pending) >= batch_size:
+                FlightSeat.objects.bulk_create(pending, batch_size=batch_size)
+                created += len(pending)
+                pending = []
+
+        if pending:
+            FlightSeat.objects.bulk_create(pending, batch_size=batch_size)
+            created += len(pending)
+
+        refresh_inventory(flight_ids)
+        refresh_min_prices(flight_ids)
+
+    return created
@@ -0,0 +1,116 @@
+import time
+
+from django.core.cache import cache
+
+from .inventory import CABINS
+from .models import Flight, FlightSeat
+from .pricing import PRICING_FIELDS, flight_fares
+
+
+SEAT_MAP_TIMEOUT = 60
+STATUS_CODES = {
+    'available': 'A',
+    'held': 'H',
+    'sold': 'S',
+    'cancelled': 'C',
+    'disabled': 'D',
+}
+NO_SEAT = 'X'
+
+
+def seat_map_version_key(flight_id):
+    return f'seatmap:version:{flight_id}'
+
+
+def seat_map_version(flight_id):
+    """
+    Текущая версия карты рейса. Начальное значение берется из времени,
+    чтобы после вытеснения счетчика не вернуться к старой версии.
+    """
+    key = seat_map_version_key(flight_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def seat_map_key(flight_id, version):
+    return f'seatmap:{flight_id}:{version}'
+
+
+def build_seat_map(flight_id):
+    """
+    Компактная карта мест рейса: сетка rows x columns в порядке рядов,
+    где каждой ячейке соответствуют id места (0 — нет места), номер,
+    код статуса (один символ в строке status) и индекс класса в cabins.
+    Цены классов в кешируемую карту не входят: их добавляет get_seat_map.
+    """
+    seats = FlightSeat.objects.filter(flight_id=flight_id).order_by('row_number', 'id').values_list(
+        'id', 'row_number', 'seat', 'status', 'seat_type'
+    )
+
+    by_row = {}
+    for seat in seats:
+        by_row.setdefault(seat[1], []).append(seat)
+    rows = sorted(by_row)
+    columns = max((len(row) for row in by_row.values()), default=0)
+
+    ids, numbers, status, price_index = [], [], [], []
+    cabins = list(CABINS)
+    for row_number in rows:
+        row = by_row[row_number]
+        for column in range(columns):
+            if column < len(row):
+                seat_id, _, number, seat_status, seat_type = row[column]
+                ids.append(seat_id)
+                numbers.append(number)
+                status.append(STATUS_CODES.get(seat_status, NO_SEAT))
+                price_index.append(cabins.index(seat_type) if seat_type in cabins else 0)
+            else:
+                ids.append(0)
+                numbers.append(0)
+                status.append(NO_SEAT)
+                price_index.append(-1)
+
+    return {
+        'flight': flight_id,
+        'rows': rows,
+        'columns': columns,
+        'ids': ids,
+        'numbers': numbers,
+        'status': ''.join(status),
+        'cabins': cabins,
+        'price_index': price_index,
+    }
+
+
+def get_seat_map(flight_id, flight=None):
+    """
+    Карта мест с текущими ценами классов (prices по индексам cabins).
+    Цены считаются при каждом запросе по счетчикам рейса, поэтому смена
+    ценовой корзины видна сразу, без сброса кеша карты.
+    """
+    # Карту, построенную до смены версии, запишем под старым ключом —
+    # ее больше никто не прочитает
+    key = seat_map_key(flight_id, seat_map_version(flight_id))
+    seat_map = cache.get(key)
+    if seat_map is None:
+        seat_map = build_seat_map(flight_id)
+        cache.set(key, seat_map, SEAT_MAP_TIMEOUT)
+    if flight is None:
+        flight = Flight.all_objects.only(*PRICING_FIELDS).get(id=flight_id)
+    fares = flight_fares(flight)
+    return {**seat_map, 'prices': [fares[cabin].price for cabin in seat_map['cabins']]}
+
+
+def invalidate_seat_map(flight_id):
+    """
+    Сбрасывает карту рейса сменой версии. Атомарный incr не теряет
+    одновременные изменения, в отличие от правки закешированной карты.
+    """
+    key = seat_map_version_key(flight_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
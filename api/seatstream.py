@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_INTERVAL = 15
+RESYNC = {'resync': True}
+
+logger = logging.getLogger(__name__)
+
+
+def seat_channel(flight_id):
+    return f'seat-events:{flight_id}'
+
+
+class InProcessBroker:
+    """
+    Брокер событий мест внутри одного процесса.
+
+    Подписчики — очереди asyncio в своих event loop, публикация возможна
+    из любого потока (в том числе из on_commit синхронного представления).
+    Если подписчик не успевает читать и очередь переполнена, она
+    очищается и получает RESYNC: клиент перечитывает карту целиком.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscriber_count(self, flight_id):
+        with self._lock:
+            return len(self._subscribers.get(flight_id, ()))
+
+    def publish(self, flight_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(flight_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                pass
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+            event = RESYNC
+        queue.put_nowait(event)
+
+    async def subscribe(self, flight_id):
+        return InProcessSubscription(self, flight_id)
+
+    def _add(self, flight_id, subscriber):
+        with self._lock:
+            self._subscribers[flight_id].add(subscriber)
+
+    def _remove(self, flight_id, subscriber):
+        with self._lock:
+            self._subscribers[flight_id].discard(subscriber)
+            if not self._subscribers[flight_id]:
+                del self._subscribers[flight_id]
+
+
+class InProcessSubscription:
+    def __init__(self, broker, flight_id):
+        self._broker = broker
+        self._flight_id = flight_id
+        self._queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self._subscriber = (asyncio.get_running_loop(), self._queue)
+        broker._add(flight_id, self._subscriber)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+    async def aclose(self):
+        self._broker._remove(self._flight_id, self._subscriber)
+
+
+class RedisBroker:
+    """
+    Брокер через Redis pub/sub (или совместимый сервер) для нескольких
+    процессов ASGI. Требует пакет redis.
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured('SEAT_EVENTS_BROKER_URL requires the "redis" package.')
+        self._url = url
+        self._publisher = redis.Redis.from_url(url)
+        self._async_redis = redis.asyncio
+
+    def publish(self, flight_id, event):
+        self._publisher.publish(seat_channel(flight_id), json.dumps(event))
+
+    async def subscribe(self, flight_id):
+        subscription = RedisSubscription(self._async_redis.Redis.from_url(self._url), flight_id)
+        await subscription.start()
+        return subscription
+
+
+class RedisSubscription:
+    def __init__(self, client, flight_id):
+        self._client = client
+        self._channel = seat_channel(flight_id)
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+
+    async def start(self):
+        await self._pubsub.subscribe(self._channel)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message is not None:
+                return json.loads(message['data'])
+
+    async def aclose(self):
+        await self._pubsub.unsubscribe(self._channel)
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'SEAT_EVENTS_BROKER_URL', '')
+                _broker = RedisBroker(url) if url else InProcessBroker()
+    return _broker
+
+
+def publish_seat_status(flight_id, seat_id, status):
+    """
+    Рассылает подписчикам рейса изменение статуса места. Вызывается после
+    коммита бронирования или отмены; сбой брокера не влияет на продажу.
+    """
+    try:
+        get_broker().publish(flight_id, {'seat': seat_id, 'status': status})
+    except Exception:
+        # Продажа уже зафиксирована: теряется только событие, его нужно видеть в логах
+        logger.exception('Failed to publish seat status: flight %s, seat %s', flight_id, seat_id)
+
+
+def seat_events_enabled(request):
+    """
+    Поток событий держит соединение открытым бесконечно. Под WSGI это
+    занятый поток сервера на каждого зрителя, поэтому события отдаются
+    только приложению ASGI.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def format_sse(data, event=None):
+    lines = []
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def seat_event_stream(flight_id, snapshot):
+    """
+    Поток server-sent events для рейса: сначала снимок карты мест, затем
+    изменения статусов по мере продаж и отмен. Раз в HEARTBEAT_INTERVAL
+    секунд отправляется комментарий, чтобы прокси не рвали соединение.
+
+    snapshot — асинхронная функция, возвращающая актуальную карту мест.
+    """
+    # Подписка оформляется до снимка, чтобы не потерять изменения между ними
+    subscription = await get_broker().subscribe(flight_id)
+    next_event = asyncio.ensure_future(anext(subscription))
+    try:
+        yield format_sse(await snapshot(), event='snapshot')
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=HEARTBEAT_INTERVAL)
+            if not done:
+                yield ': keep-alive\n\n'
+                continue
+            event = next_event.result()
+            next_event = asyncio.ensure_future(anext(subscription))
+            if event.get('resync'):
+                yield format_sse(await snapshot(), event='snapshot')
+            else:
+                yield format_sse(event, event='seat')
+    finally:
+        next_event.cancel()
+        await subscription.aclose()
@@ -21,14 +21,14 @@ class UserSerializer(ModelSerializer):
 
     class Meta:
         model = User
-        fields = '__all__'
+        exclude = ['first_name_bidx', 'middle_name_bidx', 'last_name_bidx']
 
 
 class ClientSerializer(ModelSerializer):
 
     class Meta:
         model = Client
-        fields = '__all__'
+        exclude = ['phone_bidx']
 
 
 class FlightSeatSerializer(ModelSerializer):
@@ -72,6 +72,19 @@ class FlightSerializer(ModelSerializer):
         model = Flight
         fields = '__all__'
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        expand = self.context.get('expand', ())
+        if 'airports' in expand:
+            for field in ('departure_airport', 'arrival_airport'):
+                if field not in data:
+                    continue
+                airport = getattr(instance, field)
+                data[field] = AirportDetailSerializer(airport).data if airport else None
+        if 'board' in expand and 'board' in data:
+            data['board'] = BoardDetailSerializer(instance.board).data
+        return data
+
 
 class AirportSerializer(ModelSerializer):
 
@@ -99,3 +112,56 @@ class ManufacturerSerializer(ModelSerializer):
     class Meta:
         model = Manufacturer
         fields = '__all__'
+
+
+FLIGHT_EXPAND_RELATED = {
+    'airports': ('departure_airport__place', 'arrival_airport__place'),
+    'board': ('board__model__manufacturer',),
+}
+
+
+def parse_expand(request):
+    """
+    Разбирает параметр ?expand=airports,board (или ?expand=all).
+    """
+    params = getattr(request, 'query_params', request.GET)
+    value = params.get('expand', '')
+    expand = {item.strip() for item in value.split(',') if item.strip()}
+    if 'all' in expand:
+        return set(FLIGHT_EXPAND_RELATED)
+    return expand & set(FLIGHT_EXPAND_RELATED)
+
+
+def expand_flights(queryset, expand):
+    """
+    Подгружает связанные объекты одним запросом, чтобы раскрытое
+    представление не делало запросов на каждую строку.
+    """
+    related = [path for key in expand for path in FLIGHT_EXPAND_RELATED[key]]
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
+
+
+class AirportDetailSerializer(serializers.ModelSerializer):
+    place = PlaceSerializer(read_only=True)
+
+    class Meta:
+        model = Airport
+        fields = '__all__'
+
+
+class ModelDetailSerializer(serializers.ModelSerializer):
+    manufacturer = ManufacturerSerializer(read_only=True)
+
+    class Meta:
+        model = Model
+        fields = '__all__'
+
+
+class BoardDetailSerializer(serializers.ModelSerializer):
+    model = ModelDetailSerializer(read_only=True)
+
+    class Meta:
+        model = Board
+        fields = '__all__'
@@ -1,39 +1,103 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from django.db.models import Max
-from .models import Flight, FlightSeat, Board, BoardSeat
+from .models import FareClass, Flight, FlightSeat, Place, Airport, Ticket
+from .seating import materialize_flight_seats
+from .search import invalidate_place_airports
+from .seatmap import invalidate_seat_map
+from .inventory import refresh_inventory
+from .distances import refresh_distance_matrix
+from .connections import record_flight_change
+from .pricing import invalidate_fare_table, refresh_min_prices
+from .revenue import invalidate_revenue_days, invalidate_sales_days, revenue_seats_changed
+from .rollups import TICKET_SALES_FIELDS, record_ticket_change, ticket_sales_state
+from functools import partial
+from django.db import transaction
+from django.utils import timezone
 
 @receiver(post_save, sender=Flight)
 def create_flight_seats(sender, instance, created, **kwargs):
     if created:
-        # Получаем максимальную версию мест на борту для этого борта
-        max_seats_version = BoardSeat.objects.filter(
-            board=instance.board
-        ).aggregate(max_version=Max('seats_version'))['max_version']
-
-        # Получаем все места на борту с максимальной версией
-        board_seats = BoardSeat.objects.filter(
-            board=instance.board,
-            seats_version=max_seats_version
-        )
-
-        print(instance.board)
-        print(max_seats_version)
-        print(board_seats.count())
-
-        
-
-        # Создаем FlightSeat для каждого места на борту
-        for seat in board_seats:
-            if seat.seat_type == 'business':
-                price = instance.business_class_price
-            else:
-                price = instance.business_class_price
-            FlightSeat.objects.create(
-                seat=seat.seat_number,
-                row_number=seat.row_number,
-                flight=instance,
-                status='available',
-                price=price,
-                is_deleted=False
-            )
+        # Места рейса создаются пакетно по закешированной раскладке борта
+        materialize_flight_seats([instance])
+    elif kwargs.get('update_fields') is None or 'min_available_price' not in kwargs['update_fields']:
+        # Базовые цены могли измениться
+        refresh_min_prices([instance.id])
+
+
+@receiver(pre_save, sender=Flight)
+def remember_departure_time(sender, instance, **kwargs):
+    # При переносе рейса срез выручки сбрасывается и для прежнего дня вылета
+    instance._previous_departure_time = Flight.all_objects.filter(pk=instance.pk).values_list(
+        'departure_time', flat=True,
+    ).first() if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=Flight)
+def reset_connection_schedule(sender, instance, **kwargs):
+    # Расписания пересадок в процессах обновят только этот рейс
+    transaction.on_commit(partial(record_flight_change, instance.id))
+    departure_times = [instance.departure_time, getattr(instance, '_previous_departure_time', None)]
+    transaction.on_commit(partial(invalidate_revenue_days, [
+        timezone.localdate(departure_time) for departure_time in departure_times if departure_time is not None
+    ]))
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def reset_revenue_day(sender, instance, **kwargs):
+    # Оплата и отмена через api.booking идут UPDATE-ом и сбрасывают срезы сами
+    transaction.on_commit(partial(revenue_seats_changed, [instance.flight_seat_id]))
+
+
+@receiver([pre_save, pre_delete], sender=Ticket)
+def remember_ticket_sales(sender, instance, **kwargs):
+    instance._previous_sales_state = ticket_sales_state(instance.pk) if instance.pk else None
+    if kwargs.get('signal') is pre_delete:
+        return
+    # Оплата и отмена из форм и админки приходят без времени события
+    now = timezone.now()
+    if not instance.is_paid:
+        instance.paid_at = None
+    elif instance.paid_at is None:
+        instance.paid_at = now
+    if not instance.is_canceled:
+        instance.canceled_at = None
+    elif instance.canceled_at is None:
+        instance.canceled_at = now
+
+
+@receiver([post_save, post_delete], sender=Ticket)
+def record_ticket_sales(sender, instance, **kwargs):
+    # Сводки продаж следуют за любым изменением билета через save() и delete()
+    current = None
+    if kwargs.get('signal') is post_save:
+        current = {field: getattr(instance, field) for field in TICKET_SALES_FIELDS}
+        current['flight_id'] = FlightSeat.all_objects.filter(id=instance.flight_seat_id).values_list('flight_id', flat=True).get()
+    days = record_ticket_change(getattr(instance, '_previous_sales_state', None), current)
+    if days:
+        transaction.on_commit(partial(invalidate_sales_days, days))
+
+
+@receiver([post_save, post_delete], sender=Place)
+@receiver([post_save, post_delete], sender=Airport)
+def reset_place_airports(sender, **kwargs):
+    invalidate_place_airports()
+    # Матрица расстояний пересчитывается только по изменившимся аэропортам
+    transaction.on_commit(refresh_distance_matrix)
+
+
+@receiver([post_save, post_delete], sender=FlightSeat)
+def reset_seat_map(sender, instance, **kwargs):
+    invalidate_seat_map(instance.flight_id)
+    # Ручное изменение места (админка, формы) — пересчет счетчиков и цены рейса
+    refresh_inventory([instance.flight_id])
+    refresh_min_prices([instance.flight_id])
+
+
+@receiver([post_save, post_delete], sender=FareClass)
+def reset_fare_table(sender, instance, **kwargs):
+    invalidate_fare_table()
+    # Корзина рейса меняет цену только его, общая — всех рейсов
+    if instance.flight_id is not None:
+        refresh_min_prices([instance.flight_id])
+    else:
+        refresh_min_prices(Flight.all_objects.values_list('id', flat=True))
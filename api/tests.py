@@ -1,3 +1,931 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .async_views import encode_cursor
+from .blind_index import blind_index, blind_search, normalize_phone, rebuild_blind_indexes
+from . import connections
+from .booking import book_seat, cancel_ticket, pay_ticket, release_expired_holds
+from .inventory import refresh_inventory
+from .revenue import revenue_dashboard
+from .search import resolve_airport_ids, search_flights
+from .distances import STALE_FILE, current_version, get_distance_matrix, rebuild_distance_matrix
+from .models import (
+    Airport, Board, BoardSeat, Client, Employee, FareClass, Flight, FlightSeat, Manufacturer, Model, Place, SeatLayoutTemplate, Ticket,
+    User,
+)
+from .pricing import FARE_TABLE_KEY, current_fares, get_fare_table, refresh_min_prices, reprice_flights
+from .seatmap import build_seat_map, get_seat_map, invalidate_seat_map, seat_map_key, seat_map_version
+from .rollups import compute_rollups, rollup_differences, stored_rollups
+from .seating import (
+    apply_layout_template, generate_layout, get_seat_layout, latest_seats_version, layout_summary, save_board_layout,
+)
+
+
+def create_board(rows=2, seats=2, business=1, number='T-1'):
+    manufacturer = Manufacturer.objects.create(name='Test')
+    model = Model.objects.create(name='Test', manufacturer=manufacturer)
+    board = Board.objects.create(model=model, board_number=number, year=2020, seats_amount=rows * seats)
+    save_board_layout(board, generate_layout(rows, seats, business))
+    return board
+
+
+def create_airport(name):
+    return Airport.objects.create(place=Place.objects.create(name=name), name=name, full_name=name)
+
+
+def create_flight(board=None, departure_airport=None, arrival_airport=None, **fields):
+    """
+    Рейс с бортом, аэропортами и местами (их создает сигнал сохранения рейса).
+    """
+    departure_time = fields.pop('departure_time', timezone.now() + timedelta(days=1))
+    return Flight.objects.create(
+        board=board or create_board(),
+        departure_time=departure_time,
+        arrival_time=fields.pop('arrival_time', departure_time + timedelta(hours=2)),
+        departure_airport=departure_airport or create_airport('From'),
+        arrival_airport=arrival_airport or create_airport('To'),
+        economy_class_price=fields.pop('economy_class_price', 100),
+        business_class_price=fields.pop('business_class_price', 500),
+        **fields,
+    )
+
+
+# Полный просмотр таблицы: SQLite — «SCAN таблица» без индекса, PostgreSQL — Seq Scan
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING)|Seq Scan on (\w+)')
+
+
+class QueryPlanMixin:
+
+    @contextmanager
+    def assertIndexedQueries(self):
+        """
+        Пропускает каждый SELECT блока через EXPLAIN: ни один не должен
+        читать таблицу целиком.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+                plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+            scans = {table for match in FULL_SCAN.finditer(plan) for table in match.groups() if table}
+            self.assertFalse(scans, f'{sql}\n{plan}')
+
+
+def create_client(login):
+    user = User.objects.create_user(login, None, role='client')
+    return Client.objects.create(user=user, phone='+7 (900) 000-00-00')
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Одновременные покупки одного места: потоки ходят в тестовую базу
+    своими соединениями, поэтому нужен TransactionTestCase.
+    """
+
+    BUYERS = 50
+
+    def test_one_winner_per_seat(self):
+        flight = create_flight()
+        seat = FlightSeat.objects.filter(flight=flight).first()
+        clients = [create_client(f'buyer{number}') for number in range(self.BUYERS)]
+
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(clients))
+
+        def buy(client):
+            try:
+                start.wait()
+                try:
+                    book_seat(client, seat.id)
+                    result = 'booked'
+                except FlightSeat.DoesNotExist:
+                    result = 'taken'
+            finally:
+                connection.close()
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=buy, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), self.BUYERS)
+        self.assertEqual(results.count('booked'), 1)
+        self.assertEqual(results.count('taken'), self.BUYERS - 1)
+        self.assertEqual(Ticket.objects.filter(flight_seat=seat).count(), 1)
+        self.assertEqual(FlightSeat.objects.get(id=seat.id).status, 'sold')
+        flight.refresh_from_db()
+        self.assertEqual(flight.business_sold + flight.economy_sold, 1)
+
+
+class FlightExpandQueryTests(TestCase):
+    """
+    ?expand= подгружает связанные объекты тем же запросом: число запросов
+    не зависит ни от раскрытия, ни от количества рейсов на странице.
+    """
+
+    def setUp(self):
+        board = create_board()
+        airports = [create_airport(name) for name in ('From', 'To')]
+        self.flights = [create_flight(board, *airports) for _ in range(5)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', None, role='admin', is_staff=True))
+
+    def test_list(self):
+        for expand in ('', 'airports', 'board', 'all'):
+            with self.subTest(expand=expand), self.assertNumQueries(1):
+                response = self.client.get('/api/flight/', {'expand': expand})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), len(self.flights))
+
+        flight = self.client.get('/api/flight/', {'expand': 'all'}).data['results'][0]
+        self.assertEqual(flight['departure_airport']['place']['name'], 'From')
+        self.assertEqual(flight['board']['model']['manufacturer']['name'], 'Test')
+
+    def test_detail(self):
+        url = f'/api/flight/{self.flights[0].id}/'
+        for expand in ('', 'airports', 'board', 'all'):
+            with self.subTest(expand=expand), self.assertNumQueries(1):
+                response = self.client.get(url, {'expand': expand})
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(url).data['arrival_airport'], self.flights[0].arrival_airport_id)
+        self.assertEqual(self.client.get(url, {'expand': 'airports'}).data['arrival_airport']['name'], 'To')
+
+
+class FlightSearchTests(TestCase):
+    """
+    Поиск рейсов между местами: маршрут, окно дат, свободные места,
+    удаленные рейсы и keyset-страницы по времени вылета.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.board = create_board()
+        self.origin, self.destination, self.other = (create_airport(name) for name in ('From', 'To', 'Other'))
+        self.start = timezone.now()
+        self.flights = [self.create(hours=hours) for hours in (5, 1, 4, 2, 3)]
+        self.flights.sort(key=lambda flight: flight.departure_time)
+        # Не подходят: обратный маршрут, другой пункт, вне окна, удаленный
+        self.create(self.destination, self.origin)
+        self.create(arrival=self.other)
+        self.create(hours=24 * 30)
+        Flight.all_objects.filter(id=self.create().id).update(is_deleted=True)
+
+    def create(self, departure=None, arrival=None, hours=1):
+        return create_flight(
+            self.board, departure or self.origin, arrival or self.destination,
+            departure_time=self.start + timedelta(hours=hours),
+        )
+
+    def search(self, **kwargs):
+        return list(search_flights('From', 'To', self.start, self.start + timedelta(days=7), **kwargs))
+
+    def test_route_window_and_order(self):
+        self.assertEqual(self.search(), self.flights)
+
+    def test_min_seats(self):
+        Flight.all_objects.filter(id=self.flights[0].id).update(economy_available=0, business_available=0)
+        self.assertEqual(self.search(min_seats=1), self.flights[1:])
+
+    def test_keyset_pages(self):
+        found = []
+        url, params = '/api/find_flights/', {
+            'departure_place': 'From',
+            'arrival_place': 'To',
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=7)).isoformat(),
+            'page_size': 2,
+        }
+        while url:
+            response = APIClient().get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            found.extend(flight['id'] for flight in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(found, [flight.id for flight in self.flights])
+
+    def test_new_airport_of_place(self):
+        self.assertEqual(resolve_airport_ids('To'), [self.destination.id])
+        second = Airport.objects.create(place=self.destination.place, name='To-2', full_name='To-2')
+        self.assertEqual(sorted(resolve_airport_ids('To')), [self.destination.id, second.id])
+
+
+class ListQueryCountTests(TestCase):
+    """
+    Число запросов списочных ручек не зависит от размера страницы: связанные
+    объекты подгружаются теми же запросами, а не по одному на строку.
+    """
+
+    LIST_URLS = (
+        '/api/user/', '/api/client/', '/api/flightseat/', '/api/ticket/', '/api/employee/', '/api/boardseat/',
+        '/api/place/', '/api/flight/', '/api/airport/', '/api/board/', '/api/model/', '/api/manufacturer/',
+    )
+    ASYNC_LIST_URLS = ('/api/async/flight/', '/api/async/flightseat/')
+    PAGE_SIZES = (1, 3)
+
+    @classmethod
+    def setUpTestData(cls):
+        origin, destination = create_airport('From'), create_airport('To')
+        create_airport('Other')
+        for number in range(3):
+            flight = create_flight(create_board(number=f'T-{number}'), origin, destination)
+            client = create_client(f'buyer{number}')
+            book_seat(client, FlightSeat.objects.filter(flight=flight).first().id)
+            Employee.objects.create(user=User.objects.create_user(f'staff{number}', None, role='flight'), email=f'staff{number}@example.com')
+        cls.admin = User.objects.create_user('admin', None, role='admin', is_staff=True)
+
+    def query_counts(self, url, params=None, **headers):
+        counts = []
+        for page_size in self.PAGE_SIZES:
+            # Одинаковые условия: кеши (аэропорты мест поиска) холодные на обеих страницах
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {**(params or {}), 'page_size': page_size}, **headers)
+            self.assertEqual(response.status_code, 200)
+            results = response.json()['results']
+            self.assertEqual(len(results), page_size)
+            counts.append(len(context.captured_queries))
+        return counts
+
+    def assertConstant(self, counts):
+        self.assertEqual(len(set(counts)), 1, f'запросов на страницах {self.PAGE_SIZES}: {counts}')
+
+    def test_model_lists(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        for url in self.LIST_URLS:
+            for expand in ('', 'all') if url == '/api/flight/' else ('',):
+                with self.subTest(url=url, expand=expand):
+                    self.assertConstant(self.query_counts(url, {'expand': expand} if expand else None))
+
+    def test_async_lists(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.admin)}'}
+        for url in self.ASYNC_LIST_URLS:
+            with self.subTest(url=url):
+                self.assertConstant(self.query_counts(url, **headers))
+
+    def test_flight_search(self):
+        params = {'departure_place': 'From', 'arrival_place': 'To', 'expand': 'all'}
+        for url in ('/api/find_flights/', '/api/async/find_flights/'):
+            with self.subTest(url=url):
+                self.assertConstant(self.query_counts(url, params))
+
+
+class ModelViewSetPermissionTests(TestCase):
+    """
+    CRUD моделей через /api/<модель>/ доступен только сотрудникам и
+    администраторам.
+    """
+
+    URLS = ('/api/client/', '/api/ticket/', '/api/employee/', '/api/flightseat/', '/api/flight/', '/api/user/')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_anonymous(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.post('/api/employee/', {}).status_code, 401)
+
+    def test_client_role(self):
+        self.client.force_authenticate(create_client('client').user)
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.post('/api/employee/', {}).status_code, 403)
+
+    def test_staff_and_admin(self):
+        for user in (
+            User.objects.create_user('admin', None, role='admin'),
+            User.objects.create_user('staff', None, role='flight', is_staff=True),
+        ):
+            self.client.force_authenticate(user)
+            for url in self.URLS:
+                with self.subTest(user=user.login, url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class BlindIndexTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', None, role='admin'))
+        self.found = create_client('found')
+        self.found.user.last_name = 'Иванов'
+        self.found.user.save()
+        self.other = create_client('other')
+        self.other.phone = '+7 (900) 111-22-33'
+        self.other.save()
+
+    def lookup(self, url, **params):
+        return [row['id'] for row in self.client.get(url, params).data['results']]
+
+    def test_lookup_ignores_formatting(self):
+        self.assertEqual(self.lookup('/api/client/', phone='7 900 000 00 00'), [self.found.id])
+        self.assertEqual(self.lookup('/api/client/', phone='79001112233'), [self.other.id])
+        self.assertEqual(self.lookup('/api/client/', phone='79009999999'), [])
+        self.assertEqual(self.lookup('/api/user/', last_name='  иванов '), [self.found.user_id])
+
+    def test_dashboard_search(self):
+        self.assertEqual(list(User.objects.filter(blind_search(User, 'ИВАНОВ')).values_list('id', flat=True)), [self.found.user_id])
+        self.assertEqual(list(Client.objects.filter(blind_search(Client, '+79001112233')).values_list('phone', flat=True)), ['+7 (900) 111-22-33'])
+
+    def test_key_is_not_encryption_key(self):
+        raw = hmac.new(settings.FIELD_ENCRYPTION_KEY.encode(), b'79000000000', hashlib.sha256).hexdigest()
+        self.assertNotEqual(blind_index('79000000000', normalize_phone), raw)
+        self.assertNotEqual(Client.objects.get(pk=self.found.pk).phone_bidx, raw)
+
+    def test_rebuild_after_key_change(self):
+        with override_settings(BLIND_INDEX_KEY='rotated'):
+            self.assertEqual(self.lookup('/api/client/', phone='79000000000'), [])
+            self.assertEqual(rebuild_blind_indexes(Client), 2)
+            self.assertEqual(self.lookup('/api/client/', phone='79000000000'), [self.found.id])
+
+
+class SeatLayoutTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.board = create_board(rows=3, seats=4, business=2)
+
+    def test_unchanged_layout_keeps_version(self):
+        seats = BoardSeat.objects.count()
+        self.assertEqual(save_board_layout(self.board, generate_layout(3, 4, 2)), 1)
+        self.assertEqual(BoardSeat.objects.count(), seats)
+
+    def test_new_layout_is_new_version(self):
+        flight = create_flight(board=self.board)
+        self.assertEqual(save_board_layout(self.board, generate_layout(2, 6, 1)), 2)
+        self.assertEqual(latest_seats_version(self.board.id), 2)
+        self.assertEqual(layout_summary(get_seat_layout(self.board.id)), (2, 6, 1))
+        # Прежняя версия неизменна: по ней созданы места уже существующих рейсов
+        self.assertEqual(layout_summary(get_seat_layout(self.board.id, 1)), (3, 4, 2))
+        self.assertEqual(FlightSeat.objects.filter(flight=flight).count(), 12)
+        self.assertEqual(FlightSeat.objects.filter(flight=create_flight(board=self.board)).count(), 12)
+
+    def test_apply_template(self):
+        template = SeatLayoutTemplate.objects.create(model=self.board.model, name='A320', rows=30, seats=6, business=2)
+        self.assertEqual(apply_layout_template(self.board, template), 2)
+        layout = get_seat_layout(self.board.id)
+        self.assertEqual(len(layout), 180)
+        self.assertEqual(layout_summary(layout), (30, 6, 2))
+        self.assertEqual(apply_layout_template(self.board, template), 2)
+
+    def test_editor_saves_and_applies_templates(self):
+        response = self.client.post(f'/edit-seats/{self.board.id}/', {'rows': 5, 'seats': 4, 'business': 1, 'template_name': 'Small'})
+        self.assertEqual(response.status_code, 302)
+        template = SeatLayoutTemplate.objects.get(model=self.board.model)
+        self.assertEqual((template.name, template.rows, template.seats, template.business), ('Small', 5, 4, 1))
+        self.assertEqual(latest_seats_version(self.board.id), 2)
+
+        template.rows = 7
+        template.save()
+        self.client.post(f'/edit-seats/{self.board.id}/', {'template': template.id})
+        self.assertEqual(layout_summary(get_seat_layout(self.board.id)), (7, 4, 1))
+
+        other = SeatLayoutTemplate.objects.create(model=create_board(number='T-2').model, name='Other', rows=1, seats=1, business=0)
+        self.assertEqual(self.client.post(f'/edit-seats/{self.board.id}/', {'template': other.id}).status_code, 404)
+
+
+class SeatMapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.flight = create_flight()
+        self.seats = list(FlightSeat.objects.filter(flight=self.flight).order_by('row_number', 'id'))
+
+    def status_of(self, seat_map, seat):
+        return seat_map['status'][seat_map['ids'].index(seat.id)]
+
+    def test_bookings_reach_cached_map(self):
+        get_seat_map(self.flight.id)
+        client = create_client('buyer')
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(client, self.seats[0].id)
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(client, self.seats[1].id, hold=True)
+
+        seat_map = get_seat_map(self.flight.id)
+        self.assertEqual(self.status_of(seat_map, self.seats[0]), 'S')
+        self.assertEqual(self.status_of(seat_map, self.seats[1]), 'H')
+
+    def test_stale_build_is_not_served(self):
+        # Карта, собранная до изменения и записанная после него, уходит под старую версию
+        version = seat_map_version(self.flight.id)
+        stale = build_seat_map(self.flight.id)
+        FlightSeat.objects.filter(id=self.seats[0].id).update(status='sold')
+        invalidate_seat_map(self.flight.id)
+        cache.set(seat_map_key(self.flight.id, version), stale)
+
+        self.assertEqual(self.status_of(get_seat_map(self.flight.id), self.seats[0]), 'S')
+
+
+class AsyncReadViewTests(TestCase):
+
+    def setUp(self):
+        self.flight = create_flight()
+        self.admin = User.objects.create_user('admin', None, role='admin')
+
+    def authorize(self, user):
+        # Асинхронные ручки аутентифицируются тем же JWT, что и DRF
+        token = AccessToken.for_user(user)
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_permissions(self):
+        self.assertEqual(self.client.get('/api/async/flightseat/').status_code, 401)
+        self.assertEqual(self.client.get('/api/async/flight/', HTTP_AUTHORIZATION='Bearer broken').status_code, 401)
+        client_user = create_client('client').user
+        self.assertEqual(self.client.get('/api/async/flight/', **self.authorize(client_user)).status_code, 403)
+        response = self.client.get('/api/async/flight/', **self.authorize(self.admin))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([flight['id'] for flight in response.json()['results']], [self.flight.id])
+
+    def test_filters_and_fields(self):
+        seats = FlightSeat.objects.filter(flight=self.flight)
+        response = self.client.get(
+            '/api/async/flightseat/',
+            {'flight': self.flight.id, 'status': 'available', 'fields': 'id,status', 'page_size': 2},
+            **self.authorize(self.admin),
+        )
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([sorted(seat) for seat in page['results']], [['id', 'status']] * 2)
+        self.assertIsNotNone(page['next'])
+        self.assertEqual(seats.count(), 4)
+
+    def test_malformed_cursor(self):
+        for cursor in ('not base64!', encode_cursor({}), encode_cursor([]), encode_cursor([1, 2]), encode_cursor([{}]), encode_cursor(['x'])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/async/flightseat/', {'cursor': cursor}, **self.authorize(self.admin))
+                self.assertEqual(response.status_code, 400)
+
+
+class DistanceMatrixTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(DISTANCE_MATRIX_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.moscow = create_airport('Moscow')
+        self.osaka = create_airport('Osaka')
+        self.set_coordinates(self.moscow, 55.7558, 37.6173)
+        self.set_coordinates(self.osaka, 34.6937, 135.5023)
+
+    def set_coordinates(self, airport, latitude, longitude):
+        place = airport.place
+        place.latitude, place.longitude = latitude, longitude
+        with self.captureOnCommitCallbacks(execute=True):
+            place.save()
+
+    def test_changes_are_batched_into_one_rebuild(self):
+        matrix = get_distance_matrix()
+        self.assertAlmostEqual(matrix.distance(self.moscow.id, self.osaka.id), 7340, delta=30)
+        version = current_version()
+
+        # Сохранения только отмечают матрицу устаревшей
+        tokyo = create_airport('Tokyo')
+        self.set_coordinates(tokyo, 35.6762, 139.6503)
+        self.set_coordinates(self.osaka, 34.7, 135.5)
+        self.assertEqual(current_version(), version)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, STALE_FILE)))
+
+        matrix = get_distance_matrix()
+        self.assertNotEqual(matrix.version, version)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, STALE_FILE)))
+        self.assertAlmostEqual(matrix.distance(self.osaka.id, tokyo.id), 400, delta=20)
+        self.assertEqual(matrix.distance(tokyo.id, self.osaka.id), matrix.distance(self.osaka.id, tokyo.id))
+
+    def test_versions_are_swapped_whole(self):
+        first = get_distance_matrix()
+        for latitude in (10, 20, 30):
+            self.set_coordinates(self.osaka, latitude, 135.5)
+            rebuild_distance_matrix()
+        versions = sorted(name for name in os.listdir(self.directory) if name.startswith('v'))
+        # Текущая и предыдущая версии; отображенная в память первая читается по-прежнему
+        self.assertEqual(len(versions), 2)
+        self.assertIn(current_version(), versions)
+        self.assertEqual(len(first.ids), len(first.matrix))
+        self.assertAlmostEqual(first.distance(self.moscow.id, self.osaka.id), 7340, delta=30)
+
+
+class ConnectionScheduleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        connections._schedule = None
+        self.addCleanup(setattr, connections, '_schedule', None)
+        self.board = create_board()
+        self.airports = [create_airport(name) for name in ('A', 'B')]
+
+    def add_flight_elsewhere(self):
+        # bulk_create не вызывает сигналы — как изменение в другом процессе с локальным кешем
+        departure_time = timezone.now() + timedelta(days=1)
+        return Flight.objects.bulk_create([Flight(
+            board=self.board,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=2),
+            departure_airport=self.airports[0],
+            arrival_airport=self.airports[1],
+        )])[0]
+
+    def test_own_changes_are_replayed(self):
+        first = create_flight(self.board, *self.airports)
+        self.assertIn(first.id, connections.get_schedule().flight_ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            second = create_flight(self.board, *self.airports)
+        self.assertIn(second.id, connections.get_schedule().flight_ids)
+
+    def test_unlogged_changes_appear_after_ttl(self):
+        connections.get_schedule()
+        flight = self.add_flight_elsewhere()
+        self.assertNotIn(flight.id, connections.get_schedule().flight_ids)
+        with override_settings(CONNECTION_SCHEDULE_TTL=timedelta(0)):
+            self.assertIn(flight.id, connections.get_schedule().flight_ids)
+
+    def test_max_legs_is_clamped(self):
+        # Цепочка на один рейс длиннее предела: A -> B -> C -> D -> E
+        airports = self.airports + [create_airport(name) for name in ('C', 'D', 'E')]
+        start = timezone.now() + timedelta(days=1)
+        for leg, (departure, arrival) in enumerate(zip(airports, airports[1:])):
+            create_flight(self.board, departure, arrival, departure_time=start + timedelta(hours=4 * leg))
+        params = {'departure_place': 'A', 'arrival_place': 'E', 'max_legs': connections.MAX_LEGS + 5}
+        response = APIClient().get('/api/find_connections/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+        params['arrival_place'] = 'D'
+        legs = [itinerary['legs'] for itinerary in APIClient().get('/api/find_connections/', params).data['results']]
+        self.assertEqual(legs, [connections.MAX_LEGS])
+
+    def test_invalid_max_legs(self):
+        response = APIClient().get('/api/find_connections/', {'departure_place': 'A', 'arrival_place': 'B', 'max_legs': 'two'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SeatHoldTests(TestCase):
+    """
+    Удержание места: оплата до срока продает место, после срока — нет;
+    просроченные удержания снимает release_expired_holds.
+    """
+
+    def setUp(self):
+        self.flight = create_flight(create_board(rows=2, seats=2))
+        self.seats = list(FlightSeat.objects.filter(flight=self.flight, seat_type='Economy').values_list('id', flat=True))
+        self.client_ = create_client('buyer')
+
+    def seat(self, seat_id):
+        return FlightSeat.objects.get(id=seat_id)
+
+    def inventory(self):
+        return Flight.objects.values('economy_available', 'economy_held', 'economy_sold').get(id=self.flight.id)
+
+    def test_hold_then_pay(self):
+        ticket = book_seat(self.client_, self.seats[0], hold=True)
+        seat = self.seat(self.seats[0])
+        self.assertEqual(seat.status, 'held')
+        self.assertAlmostEqual(seat.held_until, timezone.now() + timedelta(minutes=15), delta=timedelta(seconds=5))
+        self.assertEqual(self.inventory(), {'economy_available': 1, 'economy_held': 1, 'economy_sold': 0})
+
+        pay_ticket(ticket)
+        seat = self.seat(self.seats[0])
+        self.assertEqual((seat.status, seat.held_until), ('sold', None))
+        self.assertTrue(Ticket.objects.get(id=ticket.id).is_paid)
+        self.assertEqual(self.inventory(), {'economy_available': 1, 'economy_held': 0, 'economy_sold': 1})
+        with self.assertRaises(Ticket.DoesNotExist):
+            pay_ticket(ticket)
+        # Проданное место обработчик не трогает
+        self.assertEqual(release_expired_holds(timezone.now() + timedelta(days=1)), 0)
+
+    def test_expired_hold_is_released(self):
+        expiring = book_seat(self.client_, self.seats[0], hold=True)
+        with override_settings(SEAT_HOLD_TTL=timedelta(hours=1)):
+            kept = book_seat(self.client_, self.seats[1], hold=True)
+
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(release_expired_holds(timezone.now() + timedelta(minutes=30)), 1)
+        seat = self.seat(self.seats[0])
+        self.assertEqual((seat.status, seat.held_until, seat.price), ('available', None, None))
+        self.assertTrue(Ticket.objects.get(id=expiring.id).is_canceled)
+        self.assertFalse(Ticket.objects.get(id=kept.id).is_canceled)
+        self.assertEqual(self.inventory(), {'economy_available': 1, 'economy_held': 1, 'economy_sold': 0})
+
+        # Освобожденное место снова продается, а отмененный билет не оплатить
+        book_seat(create_client('other'), self.seats[0])
+        with self.assertRaises(Ticket.DoesNotExist):
+            pay_ticket(expiring)
+
+    def test_pay_after_expiry_before_sweep(self):
+        with override_settings(SEAT_HOLD_TTL=timedelta(0)):
+            ticket = book_seat(self.client_, self.seats[0], hold=True)
+        with self.assertRaises(FlightSeat.DoesNotExist):
+            pay_ticket(ticket)
+        # Оплата откатилась целиком: билет не оплачен, сводка не изменилась
+        self.assertFalse(Ticket.objects.get(id=ticket.id).is_paid)
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(self.inventory(), {'economy_available': 2, 'economy_held': 0, 'economy_sold': 0})
+        flight_ids = [self.flight.id]
+        self.assertEqual(rollup_differences(compute_rollups(flight_ids), stored_rollups(flight_ids)), [])
+
+
+class InventoryConsistencyTests(TestCase):
+    """
+    Счетчики мест в строке рейса совпадают с пересчетом по местам после
+    любых продаж, отмен и снятия удержаний.
+    """
+
+    def setUp(self):
+        self.flight = create_flight(create_board(rows=2, seats=3, business=1))
+        self.seats = list(FlightSeat.objects.filter(flight=self.flight).order_by('seat_type', 'id').values_list('id', flat=True))
+        self.client_ = create_client('buyer')
+
+    def assertCountersMatch(self):
+        # refresh_inventory возвращает рейсы, чьи счетчики пришлось исправить
+        with transaction.atomic():
+            self.assertEqual(refresh_inventory([self.flight.id]), [])
+            transaction.set_rollback(True)
+
+    def seats_left(self):
+        return Flight.objects.get(id=self.flight.id).seats_available
+
+    def test_cancel(self):
+        tickets = [book_seat(self.client_, seat_id) for seat_id in self.seats[:3]]
+        self.assertEqual(self.seats_left(), 3)
+        for ticket in tickets:
+            cancel_ticket(ticket)
+            self.assertCountersMatch()
+        self.assertEqual(self.seats_left(), 6)
+
+    def test_cancel_held_and_paid(self):
+        held = book_seat(self.client_, self.seats[0], hold=True)
+        paid = pay_ticket(book_seat(self.client_, self.seats[1], hold=True))
+        self.assertCountersMatch()
+        cancel_ticket(held)
+        cancel_ticket(paid)
+        self.assertCountersMatch()
+        self.assertEqual(self.seats_left(), 6)
+
+    def test_release_expired_holds(self):
+        for seat_id in self.seats:
+            book_seat(self.client_, seat_id, hold=True)
+        pay_ticket(Ticket.objects.get(flight_seat_id=self.seats[0]))
+        self.assertEqual(self.seats_left(), 0)
+        self.assertEqual(release_expired_holds(timezone.now() + timedelta(days=1)), 5)
+        self.assertCountersMatch()
+        self.assertEqual(self.seats_left(), 5)
+
+    def test_cancel_on_deleted_seat(self):
+        ticket = book_seat(self.client_, self.seats[0])
+        FlightSeat.objects.filter(id=self.seats[0]).update(is_deleted=True)
+        refresh_inventory([self.flight.id])
+        cancel_ticket(ticket)
+        self.assertCountersMatch()
+
+    def test_search_sees_released_seats(self):
+        for seat_id in self.seats:
+            book_seat(self.client_, seat_id, hold=True)
+        self.assertEqual(list(search_flights('From', 'To', min_seats=1)), [])
+        release_expired_holds(timezone.now() + timedelta(days=1))
+        self.assertEqual(list(search_flights('From', 'To', min_seats=1)), [self.flight])
+
+
+class PricingTests(TestCase):
+    """
+    Тарифы по загрузке: выбор корзины, корзины рейса вместо общих,
+    перецена рейсов и сброс закешированной таблицы корзин.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # Восемь мест эконома: корзины меняются после второго и четвертого
+        self.flight = create_flight(create_board(rows=2, seats=5, business=1))
+        self.economy = list(FlightSeat.objects.filter(flight=self.flight, seat_type='Economy').values_list('id', flat=True))
+        self.client_ = create_client('buyer')
+
+    def add_buckets(self, flight=None, buckets=((0.0, 1.0, 'Y'), (0.25, 1.2, 'M'), (0.5, 1.5, 'B'))):
+        for min_load_factor, multiplier, code in buckets:
+            FareClass.objects.create(
+                flight=flight, seat_type='Economy', code=code, min_load_factor=min_load_factor, multiplier=multiplier,
+            )
+
+    def economy_fare(self):
+        fare = current_fares(self.flight.id)['Economy']
+        return fare.code, fare.price
+
+    def test_bucket_by_load_factor(self):
+        self.assertEqual(self.economy_fare(), ('', 100))
+        self.add_buckets()
+        self.assertEqual(self.economy_fare(), ('Y', 100))
+        tickets = [book_seat(self.client_, seat_id) for seat_id in self.economy[:4]]
+        # Цена билета — тариф на момент бронирования
+        self.assertEqual([ticket.price for ticket in tickets], [100, 100, 120, 120])
+        self.assertEqual(self.economy_fare(), ('B', 150))
+        cancel_ticket(tickets[0])
+        self.assertEqual(self.economy_fare(), ('M', 120))
+
+    def test_flight_buckets_replace_global(self):
+        other = create_flight(create_board(number='T-2'))
+        self.add_buckets()
+        self.add_buckets(self.flight, ((0.0, 0.5, 'Q'),))
+        self.assertEqual(self.economy_fare(), ('Q', 50))
+        self.assertEqual(current_fares(other.id)['Economy'].code, 'Y')
+        self.assertEqual(current_fares(self.flight.id)['Business'].price, 500)
+
+    def test_reprice_flights(self):
+        other = create_flight(create_board(number='T-2'))
+        self.assertEqual(reprice_flights(Flight.objects.filter(id=self.flight.id), 1.1, 'Economy'), 1)
+        flight = Flight.objects.get(id=self.flight.id)
+        self.assertEqual((flight.economy_class_price, flight.business_class_price), (110, 500))
+        self.assertEqual(Flight.objects.get(id=other.id).economy_class_price, 100)
+        # Свободные места не хранят цену: она вычисляется от базовой
+        self.assertFalse(FlightSeat.objects.filter(flight=self.flight, price__isnull=False).exists())
+        self.assertEqual(book_seat(self.client_, self.economy[0]).price, 110)
+
+    def test_fare_table_invalidation(self):
+        self.assertEqual(get_fare_table(), {})
+        self.assertIn(FARE_TABLE_KEY, cache)
+        self.add_buckets()
+        self.assertEqual(self.economy_fare(), ('Y', 100))
+        FareClass.objects.filter(code='Y').get().delete()
+        self.assertEqual(self.economy_fare(), ('', 100))
+
+    def test_fare_table_expires_without_shared_cache(self):
+        get_fare_table()
+        # bulk_create не вызывает сигналы — как изменение в другом процессе с локальным кешем
+        FareClass.objects.bulk_create([FareClass(seat_type='Economy', code='Y', min_load_factor=0.0, multiplier=2.0)])
+        self.assertEqual(self.economy_fare(), ('', 100))
+        cache.delete(FARE_TABLE_KEY)
+        with override_settings(FARE_TABLE_TIMEOUT=0):
+            self.assertEqual(self.economy_fare(), ('Y', 200))
+            self.assertNotIn(FARE_TABLE_KEY, cache)
+
+
+class MinAvailablePriceTests(TestCase):
+    """
+    Flight.min_available_price следует за продажами, базовыми ценами и
+    ценовыми корзинами, и по нему можно фильтровать рейсы.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.flight = create_flight(create_board(rows=2, seats=3, business=1))
+        self.economy = list(FlightSeat.objects.filter(flight=self.flight, seat_type='Economy').values_list('id', flat=True))
+        self.business = list(FlightSeat.objects.filter(flight=self.flight, seat_type='Business').values_list('id', flat=True))
+        self.client_ = create_client('buyer')
+
+    def min_price(self):
+        # refresh_min_prices возвращает рейсы, чью цену пришлось исправить
+        with transaction.atomic():
+            self.assertEqual(refresh_min_prices([self.flight.id]), [])
+            transaction.set_rollback(True)
+        return Flight.objects.get(id=self.flight.id).min_available_price
+
+    def test_follows_bookings(self):
+        self.assertEqual(self.min_price(), 100)
+        tickets = [book_seat(self.client_, seat_id) for seat_id in self.economy]
+        self.assertEqual(self.min_price(), 500)
+        held = [book_seat(self.client_, seat_id, hold=True) for seat_id in self.business]
+        self.assertIsNone(self.min_price())
+        cancel_ticket(tickets[0])
+        self.assertEqual(self.min_price(), 100)
+        pay_ticket(held[0])
+        release_expired_holds(timezone.now() + timedelta(days=1))
+        self.assertEqual(self.min_price(), 100)
+
+    def test_follows_fares(self):
+        fare = FareClass.objects.create(seat_type='Economy', code='Y', min_load_factor=0.0, multiplier=1.5)
+        self.assertEqual(self.min_price(), 150)
+        FareClass.objects.create(flight=self.flight, seat_type='Economy', code='Q', min_load_factor=0.0, multiplier=0.5)
+        self.assertEqual(self.min_price(), 50)
+        fare.delete()
+        self.assertEqual(self.min_price(), 50)
+
+    def test_follows_base_prices(self):
+        self.flight.economy_class_price = 80
+        self.flight.save()
+        self.assertEqual(self.min_price(), 80)
+        reprice_flights(Flight.objects.filter(id=self.flight.id), 2)
+        self.assertEqual(self.min_price(), 160)
+
+    def test_api_filter(self):
+        create_flight(create_board(number='T-2'), economy_class_price=300, business_class_price=900)
+        api = APIClient()
+        api.force_authenticate(User.objects.create_user('admin', None, role='admin', is_staff=True))
+        results = api.get('/api/flight/', {'max_price': 200}).data['results']
+        self.assertEqual([flight['id'] for flight in results], [self.flight.id])
+        self.assertEqual(results[0]['min_available_price'], 100)
+
+
+class SalesRollupTests(TestCase):
+    """
+    Дневные сводки продаж совпадают с билетами, как бы билет ни менялся:
+    сервисами бронирования, через save() форм и админки или удалением.
+    """
+
+    def setUp(self):
+        self.flight = create_flight(create_board(rows=2, seats=2))
+        self.seats = list(FlightSeat.objects.filter(flight=self.flight).values_list('id', flat=True))
+        self.client_ = create_client('buyer')
+
+    def assertRollupsMatch(self):
+        flight_ids = Flight.all_objects.values_list('id', flat=True)
+        self.assertEqual(rollup_differences(compute_rollups(flight_ids), stored_rollups(flight_ids)), [])
+
+    def test_booking_services(self):
+        paid = book_seat(self.client_, self.seats[0], hold=True)
+        pay_ticket(paid)
+        cancel_ticket(paid)
+        book_seat(self.client_, self.seats[1])
+        self.assertRollupsMatch()
+        self.assertEqual(stored_rollups([self.flight.id])[self.flight.id, timezone.localdate()]['sold'], 2)
+
+    def test_ticket_saved_directly(self):
+        ticket = Ticket.objects.create(client=self.client_, flight_seat_id=self.seats[0], price=150)
+        self.assertRollupsMatch()
+
+        ticket.is_paid = True
+        ticket.save()
+        self.assertIsNotNone(ticket.paid_at)
+        self.assertRollupsMatch()
+
+        ticket.is_canceled = True
+        ticket.save()
+        self.assertRollupsMatch()
+
+        other = create_flight(create_board(number='T-2'))
+        ticket.flight_seat_id = FlightSeat.objects.filter(flight=other).values_list('id', flat=True)[0]
+        ticket.save()
+        self.assertRollupsMatch()
+
+    def test_deleted_ticket(self):
+        ticket = book_seat(self.client_, self.seats[0])
+        ticket.is_deleted = True
+        ticket.save()
+        self.assertRollupsMatch()
+
+        Ticket.all_objects.get(id=ticket.id).delete()
+        book_seat(self.client_, self.seats[1]).delete()
+        self.assertRollupsMatch()
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    Горячие запросы в том виде, в каком их выполняют сервисы, идут по индексам.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.flight = create_flight(create_board(rows=3, seats=4))
+        self.seats = list(FlightSeat.objects.filter(flight=self.flight).values_list('id', flat=True))
+
+    def test_seat_map(self):
+        with self.assertIndexedQueries():
+            get_seat_map(self.flight.id)
+
+    def test_inventory_refresh(self):
+        with self.assertIndexedQueries():
+            refresh_inventory([self.flight.id])
+
+    def test_board_layout(self):
+        with self.assertIndexedQueries():
+            get_seat_layout(self.flight.board_id)
+
+    def test_booking_and_hold_sweep(self):
+        with self.assertIndexedQueries():
+            book_seat(create_client('buyer'), self.seats[0], hold=True)
+            release_expired_holds(timezone.now() + timedelta(days=1))
+
+    def test_flight_search(self):
+        with self.assertIndexedQueries():
+            list(search_flights('From', 'To', timezone.now(), timezone.now() + timedelta(days=7), min_seats=1))
+
+    def test_revenue_dashboard(self):
+        today = timezone.localdate()
+        with self.assertIndexedQueries():
+            revenue_dashboard(today - timedelta(days=30), today + timedelta(days=30))
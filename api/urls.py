@@ -1,5 +1,5 @@
 from rest_framework.routers import SimpleRouter
-from api import views
+from api import views, async_views
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from rest_framework_simplejwt.views import (
@@ -27,12 +27,20 @@ router.register(r'manufacturer', views.ManufacturerViewSet, 'Manufacturer')
 urlpatterns = [
     path('register/', views.register_user, name='register_user'),
     path('find_flights/', views.find_flights, name='find_flights'),
+    path('find_connections/', views.find_connections, name='find_connections'),
     path('book_flight/', views.book_flight, name='book_flight'),
     path('pay_for_flight/', views.pay_for_flight, name='pay_for_flight'),
     path('cancel_flight/', views.cancel_flight, name='cancel_flight'),
+    path('distance/', views.airport_distance, name='airport_distance'),
+    path('async/find_flights/', async_views.find_flights, name='async_find_flights'),
+    path('async/flight/', async_views.FlightReadView.as_view(), name='async_flight_list'),
+    path('async/flight/<int:pk>/', async_views.FlightReadView.as_view(), name='async_flight_detail'),
+    path('async/flightseat/', async_views.FlightSeatReadView.as_view(), name='async_flightseat_list'),
+    path('async/flightseat/<int:pk>/', async_views.FlightSeatReadView.as_view(), name='async_flightseat_detail'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('', include(router.urls)),
 ]
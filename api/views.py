@@ -1,12 +1,13 @@
-from django.shortcuts import get_object_or_404
-from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from api.serializers import UserSerializer, ClientSerializer, FlightSeatSerializer, TicketSerializer, EmployeeSerializer, BoardSeatSerializer, PlaceSerializer, FlightSerializer, AirportSerializer, BoardSerializer, ModelSerializer, ManufacturerSerializer
 from api.models import User, Client, FlightSeat, Ticket, Employee, BoardSeat, Place, Flight, Airport, Board, Model, Manufacturer
-from .serializers import CustomTokenObtainPairSerializer
+from .serializers import CustomTokenObtainPairSerializer, parse_expand, expand_flights
+from .booking import book_seat, cancel_ticket, pay_ticket
+from .search import FlightSearchPagination, resolve_airport_ids, search_flights
+from . import connections
+from .distances import distances_from
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated
+from .viewsets import BaseModelViewSet
 from rest_framework import status
 from rest_framework.decorators import api_view
 from django.utils.dateparse import parse_datetime
@@ -32,40 +33,77 @@ def find_flights(request):
     arrival_place = request.query_params.get('arrival_place')
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
+    min_seats = request.query_params.get('min_seats')
     
     try:
+        min_seats = int(min_seats) if min_seats else None
         if start_date:
             start_date = parse_datetime(start_date)
         if end_date:
             end_date = parse_datetime(end_date)
         
-        flights = Flight.objects.filter(
-            departure_airport__place__name=departure_place,
-            arrival_airport__place__name=arrival_place,
-            departure_time__range=(start_date, end_date) if start_date and end_date else (None, None)
-        )
-        flight_serializer = FlightSerializer(flights, many=True)
-        return Response(flight_serializer.data, status=status.HTTP_200_OK)
+        expand = parse_expand(request)
+        flights = expand_flights(search_flights(departure_place, arrival_place, start_date, end_date, min_seats), expand)
+        paginator = FlightSearchPagination()
+        page = paginator.paginate_queryset(flights, request)
+        flight_serializer = FlightSerializer(page, many=True, context={'expand': expand})
+        return paginator.get_paginated_response(flight_serializer.data)
     
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+def find_connections(request):
+    departure_place = request.query_params.get('departure_place')
+    arrival_place = request.query_params.get('arrival_place')
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+
+    try:
+        max_legs = max(1, min(int(request.query_params.get('max_legs', connections.MAX_LEGS)), connections.MAX_LEGS))
+        limit = min(int(request.query_params.get('limit', connections.CONNECTIONS_LIMIT)), 50)
+        if start_date:
+            start_date = parse_datetime(start_date)
+        if end_date:
+            end_date = parse_datetime(end_date)
+
+        expand = parse_expand(request)
+        itineraries = connections.find_connections(
+            resolve_airport_ids(departure_place),
+            resolve_airport_ids(arrival_place),
+            start_date,
+            end_date,
+            max_legs,
+            limit,
+        )
+        results = [
+            {
+                'departure_time': itinerary.departure_time,
+                'arrival_time': itinerary.arrival_time,
+                'legs': itinerary.legs,
+                'flights': FlightSerializer(flights, many=True, context={'expand': expand}).data,
+            }
+            for itinerary, flights in connections.connection_flights(itineraries, expand_flights(Flight.objects.all(), expand))
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['POST'])
 def book_flight(request):
     client_id = request.data.get('client_id')
     flight_seat_id = request.data.get('flight_seat_id')
 
     try:
-        client = Client.objects.get(id=client_id, is_deleted=False)
-        flight_seat = FlightSeat.objects.get(id=flight_seat_id, status='available', is_deleted=False)
-
-        ticket = Ticket.objects.create(client=client, flight_seat=flight_seat)
-        flight_seat.status = 'sold'
-        flight_seat.save()
+        client = Client.objects.get(id=client_id)
+        # Место удерживается до оплаты через pay_for_flight
+        ticket = book_seat(client, flight_seat_id, hold=True)
 
         ticket_serializer = TicketSerializer(ticket)
-        return Response(ticket_serializer.data, status=status.HTTP_201_CREATED)
+        return Response({**ticket_serializer.data, 'held_until': ticket.held_until}, status=status.HTTP_201_CREATED)
     except Client.DoesNotExist:
         return Response({"error": "Client not found or deleted"}, status=status.HTTP_400_BAD_REQUEST)
     except FlightSeat.DoesNotExist:
@@ -77,510 +115,152 @@ def pay_for_flight(request):
     ticket_id = request.data.get('ticket_id')
     try:
         ticket = Ticket.objects.get(id=ticket_id, is_paid=False)
-        ticket.is_paid = True
-        ticket.save()
+        pay_ticket(ticket)
         return Response({"message": "Payment successful"}, status=status.HTTP_200_OK)
     except Ticket.DoesNotExist:
         return Response({"error": "Ticket not found or already paid"}, status=status.HTTP_400_BAD_REQUEST)
+    except FlightSeat.DoesNotExist:
+        return Response({"error": "Seat hold expired"}, status=status.HTTP_409_CONFLICT)
 
 @api_view(['POST'])
 def cancel_flight(request):
     ticket_id = request.data.get('ticket_id')
     try:
         ticket = Ticket.objects.get(id=ticket_id, is_canceled=False)
-        ticket.is_canceled = True
-        ticket.save()
-
-        flight_seat = ticket.flight_seat
-        flight_seat.status = 'available'
-        flight_seat.save()
+        cancel_ticket(ticket)
 
         return Response({"message": "Flight canceled successfully"}, status=status.HTTP_200_OK)
     except Ticket.DoesNotExist:
         return Response({"error": "Ticket not found or already canceled"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+def airport_distance(request):
+    # ?from=<id>&to=<id>[,<id>...] — расстояния в км из матрицы аэропортов
+    try:
+        from_id = int(request.query_params.get('from'))
+        to_ids = [int(value) for value in request.query_params.get('to', '').split(',') if value.strip()]
+    except (TypeError, ValueError):
+        return Response({"error": "Parameters 'from' and 'to' must be airport ids"}, status=status.HTTP_400_BAD_REQUEST)
+    if not to_ids:
+        return Response({"error": "Parameter 'to' is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    distances = distances_from(from_id, to_ids)
+    if all(distance is None for distance in distances.values()):
+        return Response({"error": "Airport not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'from': from_id,
+        'distances': [{'to': to_id, 'distance_km': distance} for to_id, distance in distances.items()],
+    }, status=status.HTTP_200_OK)
+
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
-class UserViewSet(ViewSet):
-
-    permission_classes = [IsAuthenticated]
-
-    def list(self, request):
-        queryset = User.objects.order_by('pk')
-        serializer = UserSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = UserSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = User.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = UserSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = User.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Response(status=404)
-        serializer = UserSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = User.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class ClientViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Client.objects.order_by('pk')
-        serializer = ClientSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = ClientSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Client.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = ClientSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Client.objects.get(pk=pk)
-        except Client.DoesNotExist:
-            return Response(status=404)
-        serializer = ClientSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Client.objects.get(pk=pk)
-        except Client.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class FlightSeatViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = FlightSeat.objects.order_by('pk')
-        serializer = FlightSeatSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = FlightSeatSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = FlightSeat.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = FlightSeatSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = FlightSeat.objects.get(pk=pk)
-        except FlightSeat.DoesNotExist:
-            return Response(status=404)
-        serializer = FlightSeatSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = FlightSeat.objects.get(pk=pk)
-        except FlightSeat.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class TicketViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Ticket.objects.order_by('pk')
-        serializer = TicketSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = TicketSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Ticket.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = TicketSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Ticket.objects.get(pk=pk)
-        except Ticket.DoesNotExist:
-            return Response(status=404)
-        serializer = TicketSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Ticket.objects.get(pk=pk)
-        except Ticket.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class EmployeeViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Employee.objects.order_by('pk')
-        serializer = EmployeeSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = EmployeeSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Employee.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = EmployeeSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Employee.objects.get(pk=pk)
-        except Employee.DoesNotExist:
-            return Response(status=404)
-        serializer = EmployeeSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Employee.objects.get(pk=pk)
-        except Employee.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class BoardSeatViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = BoardSeat.objects.order_by('pk')
-        serializer = BoardSeatSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = BoardSeatSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = BoardSeat.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = BoardSeatSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = BoardSeat.objects.get(pk=pk)
-        except BoardSeat.DoesNotExist:
-            return Response(status=404)
-        serializer = BoardSeatSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = BoardSeat.objects.get(pk=pk)
-        except BoardSeat.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class PlaceViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Place.objects.order_by('pk')
-        serializer = PlaceSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = PlaceSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Place.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = PlaceSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Place.objects.get(pk=pk)
-        except Place.DoesNotExist:
-            return Response(status=404)
-        serializer = PlaceSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Place.objects.get(pk=pk)
-        except Place.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class FlightViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Flight.objects.order_by('pk')
-        serializer = FlightSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = FlightSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Flight.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = FlightSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Flight.objects.get(pk=pk)
-        except Flight.DoesNotExist:
-            return Response(status=404)
-        serializer = FlightSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Flight.objects.get(pk=pk)
-        except Flight.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class AirportViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Airport.objects.order_by('pk')
-        serializer = AirportSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = AirportSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Airport.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = AirportSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Airport.objects.get(pk=pk)
-        except Airport.DoesNotExist:
-            return Response(status=404)
-        serializer = AirportSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Airport.objects.get(pk=pk)
-        except Airport.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class BoardViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Board.objects.order_by('pk')
-        serializer = BoardSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = BoardSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Board.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = BoardSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Board.objects.get(pk=pk)
-        except Board.DoesNotExist:
-            return Response(status=404)
-        serializer = BoardSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Board.objects.get(pk=pk)
-        except Board.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class ModelViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Model.objects.order_by('pk')
-        serializer = ModelSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = ModelSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Model.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = ModelSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Model.objects.get(pk=pk)
-        except Model.DoesNotExist:
-            return Response(status=404)
-        serializer = ModelSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Model.objects.get(pk=pk)
-        except Model.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
-
-
-class ManufacturerViewSet(ViewSet):
-
-    def list(self, request):
-        queryset = Manufacturer.objects.order_by('pk')
-        serializer = ManufacturerSerializer(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = ManufacturerSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        queryset = Manufacturer.objects.all()
-        item = get_object_or_404(queryset, pk=pk)
-        serializer = ManufacturerSerializer(item)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        try:
-            item = Manufacturer.objects.get(pk=pk)
-        except Manufacturer.DoesNotExist:
-            return Response(status=404)
-        serializer = ManufacturerSerializer(item, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            item = Manufacturer.objects.get(pk=pk)
-        except Manufacturer.DoesNotExist:
-            return Response(status=404)
-        item.delete()
-        return Response(status=204)
+class UserViewSet(BaseModelViewSet):
+
+    model = User
+    serializer_class = UserSerializer
+    filter_fields = {'role': 'role', 'is_active': 'is_active', 'is_staff': 'is_staff'}
+    blind_filter_fields = ('first_name', 'middle_name', 'last_name')
+
+    def get_queryset(self):
+        # Группы и права сериализуются списками id: по запросу на страницу, а не на пользователя
+        return User.objects.prefetch_related('groups', 'user_permissions')
+
+
+class ClientViewSet(BaseModelViewSet):
+
+    model = Client
+    serializer_class = ClientSerializer
+    filter_fields = {'user': 'user', 'is_deleted': 'is_deleted'}
+    blind_filter_fields = ('phone',)
+
+
+class FlightSeatViewSet(BaseModelViewSet):
+
+    model = FlightSeat
+    serializer_class = FlightSeatSerializer
+    filter_fields = {'flight': 'flight', 'status': 'status', 'row_number': 'row_number', 'is_deleted': 'is_deleted'}
+
+
+class TicketViewSet(BaseModelViewSet):
+
+    model = Ticket
+    serializer_class = TicketSerializer
+    filter_fields = {
+        'client': 'client',
+        'flight_seat': 'flight_seat',
+        'flight': 'flight_seat__flight',
+        'is_paid': 'is_paid',
+        'is_canceled': 'is_canceled',
+        'is_deleted': 'is_deleted',
+    }
+
+
+class EmployeeViewSet(BaseModelViewSet):
+
+    model = Employee
+    serializer_class = EmployeeSerializer
+    filter_fields = {'user': 'user', 'is_deleted': 'is_deleted'}
+
+
+class BoardSeatViewSet(BaseModelViewSet):
+
+    model = BoardSeat
+    serializer_class = BoardSeatSerializer
+    filter_fields = {'board': 'board', 'seats_version': 'seats_version', 'seat_type': 'seat_type', 'is_deleted': 'is_deleted'}
+
+
+class PlaceViewSet(BaseModelViewSet):
+
+    model = Place
+    serializer_class = PlaceSerializer
+    filter_fields = {'name': 'name', 'is_deleted': 'is_deleted'}
+
+
+class FlightViewSet(BaseModelViewSet):
+
+    model = Flight
+    serializer_class = FlightSerializer
+    filter_fields = {
+        'board': 'board',
+        'departure_airport': 'departure_airport',
+        'arrival_airport': 'arrival_airport',
+        'is_deleted': 'is_deleted',
+        'max_price': 'min_available_price__lte',
+    }
+
+    def get_queryset(self):
+        return expand_flights(Flight.all_objects.all(), parse_expand(self.request))
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'expand': parse_expand(self.request)}
+
+
+class AirportViewSet(BaseModelViewSet):
+
+    model = Airport
+    serializer_class = AirportSerializer
+    filter_fields = {'place': 'place', 'is_deleted': 'is_deleted'}
+
+
+class BoardViewSet(BaseModelViewSet):
+
+    model = Board
+    serializer_class = BoardSerializer
+    filter_fields = {'model': 'model', 'is_deleted': 'is_deleted'}
+
+
+class ModelViewSet(BaseModelViewSet):
+
+    model = Model
+    serializer_class = ModelSerializer
+    filter_fields = {'manufacturer': 'manufacturer', 'is_deleted': 'is_deleted'}
+
+
+class ManufacturerViewSet(BaseModelViewSet):
+
+    model = Manufacturer
+    serializer_class = ManufacturerSerializer
+    filter_fields = {'is_deleted': 'is_deleted'}
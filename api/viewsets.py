@@ -0,0 +1,135 @@
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from .blind_index import blind_lookup
+
+
+class ListCursorPagination(CursorPagination):
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class IsStaffOrAdmin(BasePermission):
+    """
+    Доступ к данным моделей — только сотрудникам и администраторам.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.role == 'admin'))
+
+
+class ModelQueryMixin:
+    """
+    Фильтры filter_fields и blind_filter_fields и выборка полей ?fields=a,b.
+    Общие для BaseModelViewSet и асинхронных ручек api.async_views, где
+    запрос — обычный HttpRequest без query_params.
+    """
+    model = None
+    filter_fields = {}
+    blind_filter_fields = ()
+
+    def get_query_params(self):
+        return getattr(self.request, 'query_params', self.request.GET)
+
+    def filter_queryset(self, queryset):
+        params = self.get_query_params()
+        for param, lookup in self.filter_fields.items():
+            value = params.get(param)
+            if value not in (None, ''):
+                queryset = queryset.filter(**{lookup: value})
+        for field_name in self.blind_filter_fields:
+            value = params.get(field_name)
+            if value not in (None, ''):
+                queryset = queryset.filter(blind_lookup(self.model, field_name, value))
+        return queryset
+
+    def get_sparse_fields(self):
+        value = self.get_query_params().get('fields', '')
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def only_sparse_fields(self, queryset, fields):
+        # Связанные объекты из select_related нельзя отсечь only()
+        concrete = {field.name for field in self.model._meta.concrete_fields}
+        if fields and set(fields) <= concrete and not queryset.query.select_related:
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def drop_unrequested_fields(self, serializer, fields):
+        for name in set(serializer.fields) - set(fields):
+            serializer.fields.pop(name)
+
+
+class BaseModelViewSet(ModelQueryMixin, ViewSet):
+    """
+    Общий CRUD для моделей api.
+
+    list() отдает страницы курсорной пагинации, поддерживает фильтры из
+    filter_fields (параметр запроса -> lookup), точный поиск по
+    зашифрованным полям из blind_filter_fields и выборку полей ?fields=a,b.
+    Доступен только аутентифицированным сотрудникам и администраторам.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+    serializer_class = None
+    pagination_class = ListCursorPagination
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def get_serializer_context(self):
+        return {'request': self.request}
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.serializer_class(*args, **kwargs)
+
+    def list(self, request):
+        fields = self.get_sparse_fields()
+        paginator = self.pagination_class()
+        try:
+            queryset = self.only_sparse_fields(self.filter_queryset(self.get_queryset()), fields)
+            page = paginator.paginate_queryset(queryset, request, view=self)
+        except (ValueError, ValidationError) as e:
+            return Response({"error": str(e)}, status=400)
+
+        serializer = self.get_serializer(page, many=True)
+        if fields:
+            self.drop_unrequested_fields(serializer.child, fields)
+        return paginator.get_paginated_response(serializer.data)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=201)
+        return Response(serializer.errors, status=400)
+
+    def retrieve(self, request, pk=None):
+        item = get_object_or_404(self.get_queryset(), pk=pk)
+        serializer = self.get_serializer(item)
+        return Response(serializer.data)
+
+    def update(self, request, pk=None):
+        try:
+            item = self.model._default_manager.get(pk=pk)
+        except self.model.DoesNotExist:
+            return Response(status=404)
+        serializer = self.get_serializer(item, data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data)
+        return Response(serializer.errors, status=400)
+
+    def destroy(self, request, pk=None):
+        try:
+            item = self.model._default_manager.get(pk=pk)
+        except self.model.DoesNotExist:
+            return Response(status=404)
+        item.delete()
+        return Response(status=204)
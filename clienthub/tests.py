@@ -1,3 +1,48 @@
+import json
+
 from django.test import TestCase
 
-# Create your tests here.
+from api.seatstream import get_broker, publish_seat_status
+from api.tests import create_flight
+from staffhub.tests import BaseTemplateMixin
+
+
+class SeatEventsTests(BaseTemplateMixin, TestCase):
+    """
+    Поток событий мест отдается только под ASGI: под WSGI бесконечный
+    ответ занял бы поток сервера на каждого зрителя.
+    """
+
+    def setUp(self):
+        self.flight = create_flight()
+
+    def test_wsgi_has_no_stream(self):
+        response = self.client.get(f'/select-seat/{self.flight.id}/events/')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotContains(self.client.get(f'/select-seat/{self.flight.id}/'), 'EventSource')
+
+    async def test_asgi_page_subscribes(self):
+        response = await self.async_client.get(f'/select-seat/{self.flight.id}/')
+        self.assertContains(response, 'EventSource')
+        self.assertContains(response, f'/select-seat/{self.flight.id}/events/')
+
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(f'/select-seat/{self.flight.id}/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            snapshot = (await anext(stream)).decode()
+            self.assertTrue(snapshot.startswith('event: snapshot'))
+            self.assertEqual(get_broker().subscriber_count(self.flight.id), 1)
+
+            publish_seat_status(self.flight.id, 42, 'sold')
+            event = (await anext(stream)).decode()
+            self.assertTrue(event.startswith('event: seat'))
+            self.assertEqual(json.loads(event.split('data: ', 1)[1]), {'seat': 42, 'status': 'sold'})
+        finally:
+            await stream.aclose()
+
+    async def test_missing_flight(self):
+        response = await self.async_client.get('/select-seat/0/events/')
+        self.assertEqual(response.status_code, 404)
@@ -6,6 +6,8 @@ app_name = 'clienthub'
 urlpatterns = [
     path('find-flights/', views.find_flights, name='find_flights'),
     path('select-seat/<int:flight_id>/', views.select_seat, name='select_seat'),
+    path('select-seat/<int:flight_id>/map/', views.seat_map, name='seat_map'),
+    path('select-seat/<int:flight_id>/events/', views.seat_events, name='seat_events'),
     path('create-ticket/<int:flight_id>/<int:seat_id>/', views.create_ticket, name='create_ticket'),
     path('cancel_ticket/<int:ticket_id>/', views.cancel_ticket, name='cancel_ticket'),
 ]
@@ -1,24 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 from api.models import *
+from api.booking import book_seat, cancel_ticket as release_ticket
+from api.connections import connection_flights, find_connections
+from api.seatmap import get_seat_map
+from api.seatstream import seat_event_stream, seat_events_enabled
 
 @login_required
 def cancel_ticket(request, ticket_id):
     try:
         # Get the ticket object
-        ticket = get_object_or_404(Ticket, id=ticket_id, client__user=request.user, is_canceled=False, is_deleted=False)
-        
-        # Get the associated flight seat
-        flight_seat = ticket.flight_seat
-        
-        # Mark the seat as available again
-        flight_seat.status = 'available'
-        flight_seat.save()
+        ticket = get_object_or_404(Ticket.objects, id=ticket_id, client__user=request.user, is_canceled=False)
 
-        # Mark the ticket as canceled
-        ticket.is_canceled = True
-        ticket.save()
+        # Cancel the ticket and release its seat in one transaction
+        release_ticket(ticket)
 
         return redirect('staffhub:profile')  # Redirect back to the user's profile page
 
@@ -32,14 +30,15 @@ def cancel_ticket(request, ticket_id):
 def find_flights(request):
     places = Place.objects.all()
     place_names = [place.name for place in places]
-    flights = Flight.objects.filter(departure_time__gt=timezone.now(), is_deleted=False)
+    flights = Flight.objects.filter(departure_time__gt=timezone.now())
+    connections = []
 
     if request.method == 'GET' and 'departure' in request.GET and 'arrival' in request.GET:
         departure = request.GET.get('departure')
         arrival = request.GET.get('arrival')
 
-        departure_airports = Airport.objects.filter(place__name__icontains=departure, is_deleted=False)
-        arrival_airports = Airport.objects.filter(place__name__icontains=arrival, is_deleted=False)
+        departure_airports = Airport.objects.filter(place__name__icontains=departure)
+        arrival_airports = Airport.objects.filter(place__name__icontains=arrival)
 
         
 
@@ -48,48 +47,60 @@ def find_flights(request):
                 departure_airport__in=departure_airports,
                 arrival_airport__in=arrival_airports
             )
+            if not flights.exists():
+                # Прямых рейсов нет — предлагаем маршруты с пересадками
+                connections = connection_flights(
+                    find_connections(
+                        departure_airports.values_list('id', flat=True),
+                        arrival_airports.values_list('id', flat=True),
+                    ),
+                    Flight.objects.select_related('departure_airport__place', 'arrival_airport__place'),
+                )
         else:
             flights = None
 
-    return render(request, 'find_flights.html', {'flights': flights, 'place_names': place_names})
-
-
-from collections import defaultdict
+    return render(request, 'find_flights.html', {'flights': flights, 'connections': connections, 'place_names': place_names})
 
 
 def select_seat(request, flight_id):
-    flight = get_object_or_404(Flight, id=flight_id, is_deleted=False)
-    all_seats = FlightSeat.objects.filter(flight=flight, is_deleted=False)
-
-    row_based_seats = defaultdict(list)
-    for seat in all_seats:
-        row_based_seats[seat.row_number].append({
-            'seat': seat.seat,
-            'status': seat.status,
-            'id': seat.id  # Ensure the ID is included
-        })
-
-    max_columns = max(len(row) for row in row_based_seats.values())
-    column_based_seats = defaultdict(list)
-    for row_number, row in row_based_seats.items():
-        for col_index in range(max_columns):
-            seat_data = row[col_index] if col_index < len(row) else {'seat': '', 'status': 'disabled'}
-            column_based_seats[col_index].append(seat_data)
-
-    return render(request, 'select_seat.html', {'flight': flight, 'seats': dict(column_based_seats)})
+    flight = get_object_or_404(
+        Flight.objects.select_related('departure_airport', 'arrival_airport'),
+        id=flight_id,
+    )
+    return render(request, 'select_seat.html', {
+        'flight': flight,
+        'seat_map': get_seat_map(flight.id, flight),
+        'seat_events': seat_events_enabled(request),
+    })
+
+
+def seat_map(request, flight_id):
+    get_object_or_404(Flight.objects, id=flight_id)
+    return JsonResponse(get_seat_map(flight_id))
+
+
+async def seat_events(request, flight_id):
+    # Поток изменений мест рейса (server-sent events). Под WSGI — 204:
+    # EventSource по нему не переподключается
+    if not seat_events_enabled(request):
+        return HttpResponse(status=204)
+    await sync_to_async(get_object_or_404)(Flight.objects, id=flight_id)
+    snapshot = sync_to_async(get_seat_map)
+    response = StreamingHttpResponse(
+        seat_event_stream(flight_id, lambda: snapshot(flight_id)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 
 @login_required
 def create_ticket(request, flight_id, seat_id):
     try:
-        flight_seat = FlightSeat.objects.get(id=seat_id, flight_id=flight_id, status='available')
         client = Client.objects.get(user=request.user)
-
-        ticket = Ticket.objects.create(client=client, flight_seat=flight_seat)
-
-        flight_seat.status = 'sold'
-        flight_seat.save()
+        book_seat(client, seat_id, flight_id=flight_id)
 
         return redirect('staffhub:profile')
 
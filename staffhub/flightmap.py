@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import FloatField, Func
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from api.models import Airport, Flight
+
+
+# Рейсы, вылетающие в ближайшие FEED_WINDOW, показываются на карте заранее
+FEED_WINDOW = timedelta(hours=2)
+# Верхняя граница длительности рейса: ограничивает диапазон по времени вылета
+MAX_FLIGHT_DURATION = timedelta(hours=24)
+
+
+class Epoch(Func):
+    """
+    Время в секундах от 1970-01-01 UTC, вычисленное в БД: лента не
+    разбирает datetime каждой строки в Python.
+    """
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='EXTRACT(EPOCH FROM %(expressions)s)::double precision',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+def active_flights(now, window=FEED_WINDOW):
+    """
+    Рейсы в воздухе или вылетающие в пределах window, без join. Диапазон
+    времени вылета ограничен с двух сторон, поэтому запрос читает только
+    узкий отрезок индекса flight_departure_time_idx, а не всю историю.
+    Время приходит из БД числом.
+    """
+    return Flight.objects.filter(
+        departure_time__gte=now - MAX_FLIGHT_DURATION,
+        departure_time__lte=now + window,
+        arrival_time__gte=now,
+        departure_airport__isnull=False,
+        arrival_airport__isnull=False,
+    ).order_by().annotate(
+        departure_ts=Epoch('departure_time'),
+        arrival_ts=Epoch('arrival_time'),
+    ).values_list('id', 'departure_airport_id', 'arrival_airport_id', 'departure_ts', 'arrival_ts')
+
+
+def airport_places(airport_ids):
+    """
+    Координаты и названия мест аэропортов одним values()-запросом.
+    """
+    return Airport.all_objects.filter(id__in=airport_ids).order_by('id').annotate(
+        latitude=Cast('place__latitude', FloatField()),
+        longitude=Cast('place__longitude', FloatField()),
+    ).values_list('id', 'place__name', 'latitude', 'longitude')
+
+
+def fetch_rows(queryset):
+    """
+    Выполняет SQL запроса напрямую: все колонки уже числа или строки,
+    поэтому построчные конвертеры ORM не нужны. Порядок колонок — как в
+    SQL (сначала поля модели, затем аннотации), поэтому values_list выше
+    перечисляет их в том же порядке.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def great_circle_positions(lat1, lon1, lat2, lon2, fraction):
+    """
+    Векторная интерполяция по дуге большого круга (все аргументы — массивы,
+    углы в градусах). Возвращает (широта, долгота, курс) в градусах.
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+
+    # Угловое расстояние по формуле гаверсинусов
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    delta = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    sin_delta = np.sin(delta)
+    same_point = sin_delta < 1e-12
+    safe_sin = np.where(same_point, 1.0, sin_delta)
+    k1 = np.where(same_point, 1.0 - fraction, np.sin((1 - fraction) * delta) / safe_sin)
+    k2 = np.where(same_point, fraction, np.sin(fraction * delta) / safe_sin)
+
+    x = k1 * np.cos(phi1) * np.cos(lam1) + k2 * np.cos(phi2) * np.cos(lam2)
+    y = k1 * np.cos(phi1) * np.sin(lam1) + k2 * np.cos(phi2) * np.sin(lam2)
+    z = k1 * np.sin(phi1) + k2 * np.sin(phi2)
+    phi = np.arctan2(z, np.hypot(x, y))
+    lam = np.arctan2(y, x)
+
+    # Курс из текущей точки на пункт назначения
+    bearing = np.arctan2(
+        np.sin(lam2 - lam) * np.cos(phi2),
+        np.cos(phi) * np.sin(phi2) - np.sin(phi) * np.cos(phi2) * np.cos(lam2 - lam),
+    )
+    return np.degrees(phi), np.degrees(lam), (np.degrees(bearing) + 360) % 360
+
+
+def build_feed(now=None, since=None, window=FEED_WINDOW):
+    """
+    Состояние карты полетов на момент now в колоночном виде.
+
+    positions — текущие координаты всех активных рейсов. routes — статичные
+    данные маршрута только для рейсов, которых не было в ленте на момент
+    since: клиенту, уже получившему их, они не нужны. Рейсы, отсутствующие
+    в positions, клиент убирает с карты.
+    """
+    now = now or timezone.now()
+    rows = fetch_rows(active_flights(now, window))
+
+    feed = {
+        'now': now.timestamp(),
+        'positions': {'id': [], 'lat': [], 'lng': [], 'bearing': [], 'progress': []},
+        'routes': {
+            'id': [], 'departure_name': [], 'departure_lat': [], 'departure_lng': [],
+            'arrival_name': [], 'arrival_lat': [], 'arrival_lng': [],
+        },
+    }
+    if not rows:
+        return feed
+
+    numeric = np.array(rows, dtype=np.float64)
+    ids = numeric[:, 0].astype(np.int64)
+    airport_columns = numeric[:, 1:3].astype(np.int64)
+    departure, arrival = numeric[:, 3], numeric[:, 4]
+
+    # Координаты аэропортов по позициям в отсортированном списке их id
+    airports = fetch_rows(airport_places(np.unique(airport_columns).tolist()))
+    airport_ids = np.array([airport[0] for airport in airports], dtype=np.int64)
+    airport_names = [airport[1] for airport in airports]
+    coordinates = np.array([airport[2:4] for airport in airports], dtype=np.float64)
+    departure_index = np.searchsorted(airport_ids, airport_columns[:, 0])
+    arrival_index = np.searchsorted(airport_ids, airport_columns[:, 1])
+    departure_lat, departure_lng = coordinates[departure_index, 0], coordinates[departure_index, 1]
+    arrival_lat, arrival_lng = coordinates[arrival_index, 0], coordinates[arrival_index, 1]
+
+    duration = np.maximum(arrival - departure, 1.0)
+    progress = np.clip((now.timestamp() - departure) / duration, 0.0, 1.0)
+    lat, lng, bearing = great_circle_positions(departure_lat, departure_lng, arrival_lat, arrival_lng, progress)
+
+    feed['positions'] = {
+        'id': ids.tolist(),
+        'lat': np.round(lat, 5).tolist(),
+        'lng': np.round(lng, 5).tolist(),
+        'bearing': np.round(bearing, 1).tolist(),
+        'progress': np.round(progress, 4).tolist(),
+    }
+
+    if since is None:
+        new = np.ones(len(rows), dtype=bool)
+    else:
+        since_ts = since.timestamp()
+        new = ~((arrival >= since_ts) & (departure <= since_ts + window.total_seconds()))
+
+    indexes = np.flatnonzero(new)
+    feed['routes'] = {
+        'id': ids[indexes].tolist(),
+        'departure_name': [airport_names[index] for index in departure_index[indexes].tolist()],
+        'departure_lat': departure_lat[indexes].tolist(),
+        'departure_lng': departure_lng[indexes].tolist(),
+        'arrival_name': [airport_names[index] for index in arrival_index[indexes].tolist()],
+        'arrival_lat': arrival_lat[indexes].tolist(),
+        'arrival_lng': arrival_lng[indexes].tolist(),
+    }
+    return feed
@@ -1,3 +1,125 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.booking import book_seat, cancel_ticket
+from api.models import FlightSeat, User
+from api.revenue import get_revenue_days, revenue_day_key
+from api.tests import QueryPlanMixin, create_board, create_client, create_flight
+
+
+class BaseTemplateMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # В репозитории нет base.html: подкладываем пустой каркас
+        cls.templates_dir = tempfile.mkdtemp()
+        Path(cls.templates_dir, 'base.html').write_text('{% block content %}{% endblock %}')
+        templates = [{**settings.TEMPLATES[0], 'DIRS': [*settings.TEMPLATES[0]['DIRS'], cls.templates_dir]}]
+        cls.templates = override_settings(TEMPLATES=templates)
+        cls.templates.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.templates.disable()
+        shutil.rmtree(cls.templates_dir)
+        super().tearDownClass()
+
+
+class ViewFlightWithSeatTests(BaseTemplateMixin, QueryPlanMixin, TestCase):
+    """
+    Страница рейса: рейс с аэропортами, параметры раскладки и страница
+    билетов — по одному запросу, сколько бы билетов ни было.
+    """
+
+    def test_query_count(self):
+        flight = create_flight(create_board(rows=6, seats=4, business=2))
+        for number, seat in enumerate(FlightSeat.objects.filter(flight=flight)[:12]):
+            book_seat(create_client(f'buyer{number}'), seat.id)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/flight/{flight.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['rows_count'], 6)
+        self.assertEqual(response.context['columns_count'], 4)
+        self.assertEqual(response.context['business_class_row_count'], 2)
+        self.assertEqual(len(response.context['tickets']), 10)
+        self.assertIsNotNone(response.context['next_id'])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/flight/{flight.id}/', {'after': response.context['next_id']})
+        self.assertEqual(len(response.context['tickets']), 2)
+
+    def test_query_plans(self):
+        flight = create_flight()
+        book_seat(create_client('buyer'), FlightSeat.objects.filter(flight=flight).first().id)
+        with self.assertIndexedQueries():
+            self.client.get(f'/flight/{flight.id}/')
+
+    def test_ticket_price(self):
+        flight = create_flight(economy_class_price=123.45)
+        seat_id = FlightSeat.objects.filter(flight=flight, seat_type='Economy').values_list('id', flat=True).first()
+        # Отмена освобождает место и сбрасывает его цену, у билета цена остается
+        cancel_ticket(book_seat(create_client('buyer'), seat_id))
+        self.assertContains(self.client.get(f'/flight/{flight.id}/'), '<td>123.45</td>')
+
+    def test_missing_flight(self):
+        self.assertEqual(self.client.get('/flight/0/').status_code, 404)
+
+
+class RevenueDataTests(TestCase):
+    """
+    Панель выручки: период из параметров запроса и сброс дневных срезов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('revenue', None, role='revenue'))
+
+    def test_invalid_dates_fall_back_to_default_period(self):
+        today = timezone.localdate()
+        response = self.client.get('/revenue/data/', {'start': '2024-02-30', 'end': '2024-13-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['last_day'], today.isoformat())
+        self.assertEqual(response.json()['first_day'], (today - timedelta(days=29)).isoformat())
+
+    def test_period_ending_in_future(self):
+        today = timezone.localdate()
+        response = self.client.get('/revenue/data/', {'start': today.isoformat(), 'end': (today + timedelta(days=7)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['sales']), 8)
+
+    def test_moved_flight_resets_both_days(self):
+        flight = create_flight()
+        old_day = timezone.localdate(flight.departure_time)
+        new_day = old_day + timedelta(days=3)
+        get_revenue_days(old_day, new_day)
+
+        flight.departure_time += timedelta(days=3)
+        flight.arrival_time += timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            flight.save()
+
+        self.assertIsNone(cache.get(revenue_day_key(old_day)))
+        self.assertIsNone(cache.get(revenue_day_key(new_day)))
+        self.assertIsNotNone(cache.get(revenue_day_key(old_day + timedelta(days=1))))
+        self.assertEqual(dict(get_revenue_days(new_day, new_day))[new_day]['flight'], [flight.id])
+
+
+class UserProfileTests(BaseTemplateMixin, QueryPlanMixin, TestCase):
+
+    def test_query_plans(self):
+        client = create_client('buyer')
+        flight = create_flight()
+        book_seat(client, FlightSeat.objects.filter(flight=flight).first().id)
+        self.client.force_login(client.user)
+        with self.assertIndexedQueries():
+            response = self.client.get('/profile/')
+        self.assertEqual(list(response.context['upcoming_flights']), [flight])
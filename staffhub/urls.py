@@ -7,6 +7,9 @@ app_name = 'staffhub'
 
 urlpatterns = [
     path('flightsmap/', flights_view, name='showflights'),
+    path('flightsmap/feed/', flights_feed, name='showflights_feed'),
+    path('revenue/', revenue_view, name='revenue'),
+    path('revenue/data/', revenue_data, name='revenue_data'),
     path('flights/', flight_management, name='flight_management'),
     path('boards/', board_management, name='board_management'),
     path('flight/<int:flight_id>/', view_flight_with_seat, name='view_flight_with_seat'),
@@ -3,16 +3,22 @@ from .forms import ModelForm, ManufacturerForm, BoardForm, FlightForm
 import json
 from django.utils import timezone
 from django.core.paginator import Paginator
-from api.models import Ticket, Flight, FlightSeat, Airport, Board, BoardSeat, Model, Manufacturer, Client, Employee
+from api.models import Ticket, Flight, FlightSeat, Airport, Board, Model, Manufacturer, Client, Employee
 from django.db.models import Q
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from django.http import JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.db import models
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from django.db.models import Max
 from .forms import UserRegistrationForm
+from api.models import SeatLayoutTemplate
+from .flightmap import build_feed
+from api.revenue import revenue_dashboard
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from api.seating import apply_layout_template, generate_layout, get_seat_layout, layout_summary, save_board_layout
 
 
 def login_view(request):
@@ -48,41 +54,59 @@ def register_view(request):
     return render(request, 'register.html', {'form': form})
 
 
+TICKETS_PAGE_SIZE = 10
+
+
+def keyset_page(queryset, request, page_size):
+    """
+    Страница по id: ?after=<id> — следующая, ?before=<id> — предыдущая.
+    Возвращает (объекты, id для ссылки назад или None, id для ссылки вперед или None).
+    """
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before and before.isdigit():
+        items = list(queryset.filter(id__lt=before).order_by('-id')[:page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size][::-1]
+        previous_id = items[0].id if has_more and items else None
+        next_id = items[-1].id if items else None
+    else:
+        if after and after.isdigit():
+            queryset = queryset.filter(id__gt=after)
+        items = list(queryset.order_by('id')[:page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        previous_id = items[0].id if after and items else None
+        next_id = items[-1].id if has_more else None
+    return items, previous_id, next_id
+
+
 def view_flight_with_seat(request, flight_id):
-    flight = get_object_or_404(Flight, id=flight_id)
-    flight_seats = FlightSeat.objects.filter(flight=flight)
-    tickets = Ticket.objects.filter(
-        flight_seat__flight=flight, is_deleted=False
-    ).select_related(
-        'client__user',
-        'flight_seat__flight',
-        'flight_seat__flight__departure_airport',
-        'flight_seat__flight__arrival_airport',
-    )
-    paginator = Paginator(tickets, 10)
-    page_number = request.GET.get('page', 1)
-    tickets_page = paginator.get_page(page_number)
+    flight = get_object_or_404(Flight.all_objects.select_related('departure_airport', 'arrival_airport'), id=flight_id)
 
-    def row_number_to_letter(row_number):
-        return chr(64 + row_number)
-    rows = flight_seats.values_list('row_number', flat=True).distinct()
-    columns = flight_seats.filter(row_number=rows[0]).count() if rows else 0
+    # Параметры раскладки одним агрегирующим запросом по типу мест
+    layout = FlightSeat.objects.filter(flight=flight).aggregate(
+        rows_count=models.Count('row_number', distinct=True),
+        columns_count=models.Max('seat'),
+        business_seats=models.Max('seat', filter=Q(seat_type='Business')),
+    )
 
-    threshold_price = flight_seats.aggregate(models.Max('price'))['price__max'] * 0.8  # 80% of the highest price as threshold for business class
-    business_class_seats = flight_seats.filter(price__gte=threshold_price)
-    business_class_rows = business_class_seats.values_list('row_number', flat=True).distinct()
+    tickets = Ticket.objects.filter(
+        flight_seat__flight=flight
+    ).select_related('client__user', 'flight_seat')
+    tickets_page, previous_id, next_id = keyset_page(tickets, request, TICKETS_PAGE_SIZE)
 
     context = {
         'flight': flight,
-        'flight_seats': flight_seats,
         'tickets': tickets_page,
-        'paginator': paginator,
-        'rows_count': len(rows),
-        'columns_count': columns,
-        'business_class_row_count': len(business_class_rows),
+        'previous_id': previous_id,
+        'next_id': next_id,
+        'rows_count': layout['rows_count'],
+        'columns_count': layout['columns_count'] or 0,
+        'business_class_row_count': layout['business_seats'] or 0,
     }
 
-    return render(request, 'ViewFlightWithseat.html', context)
+    return render(request, 'ViewFlightWithSeat.html', context)
 
 
 def flight_management(request):
@@ -92,7 +116,7 @@ def flight_management(request):
     sort_by = request.GET.get('sort', 'id')  # Default sort by ID
     order = request.GET.get('order', 'asc')  # Default order is ascending
 
-    flights = Flight.objects.all()
+    flights = Flight.all_objects.all()
 
     if filter_query:
         flights = flights.filter(
@@ -134,7 +158,7 @@ def flight_management(request):
 
         elif 'multi_delete' in request.POST:
             ids = request.POST.getlist('ids')
-            Flight.objects.filter(id__in=ids).delete()
+            Flight.all_objects.filter(id__in=ids).delete()
             return redirect('flight_management')
 
     # Get all airports and boards for the form options
@@ -181,13 +205,13 @@ def user_profile_view(request):
 
     # Fetch upcoming and past flights
     current_time = timezone.now()
-    upcoming_flights = Flight.objects.filter(departure_time__gte=current_time).exclude(is_deleted=True)
+    upcoming_flights = Flight.objects.filter(departure_time__gte=current_time)
 
     # Filter only flights the user has tickets for
-    user_tickets = Ticket.objects.filter(client=client, is_canceled=False, is_deleted=False)
+    user_tickets = Ticket.objects.filter(client=client, is_canceled=False)
     user_upcoming_flights = upcoming_flights.filter(id__in=user_tickets.values_list('flight_seat__flight', flat=True))
 
-    past_flights = Flight.objects.filter(departure_time__lt=current_time).exclude(is_deleted=True)
+    past_flights = Flight.objects.filter(departure_time__lt=current_time)
     user_past_flights = past_flights.filter(id__in=user_tickets.values_list('flight_seat__flight', flat=True))
 
     if request.method == 'POST':
@@ -224,41 +248,68 @@ def user_profile_view(request):
 
 
 def flights_view(request):
-    flights = Flight.objects.all()
-    flight_data = []
+    return render(request, 'flights.html', {'flight_data': json.dumps(build_feed())})
 
-    for flight in flights:
-        duration = (flight.arrival_time - flight.departure_time).total_seconds() / 60
 
-        if flight.departure_time <= timezone.now() <= flight.arrival_time:
-            elapsed_time = (timezone.now() - flight.departure_time).total_seconds() / 60
-        else:
-            elapsed_time = 0
-
-        flight_info = {
-            'id': flight.id,
-            'departure_place': {
-                'name': flight.departure_airport.place.name,
-                'latitude': float(flight.departure_airport.place.latitude),
-                'longitude': float(flight.departure_airport.place.longitude),
-            },
-            'arrival_place': {
-                'name': flight.arrival_airport.place.name,
-                'latitude': float(flight.arrival_airport.place.latitude),
-                'longitude': float(flight.arrival_airport.place.longitude),
-            },
-            'elapsed_time': elapsed_time,
-            'duration': duration,
-        }
-        flight_data.append(flight_info)
+def flights_feed(request):
+    # Обновление карты: статичные данные маршрутов только для новых с момента ?since= рейсов
+    since = request.GET.get('since')
+    try:
+        since = datetime.fromtimestamp(float(since), tz=dt_timezone.utc) if since else None
+    except (ValueError, OverflowError):
+        since = None
+    return JsonResponse(build_feed(since=since))
+
+
+REVENUE_ROLES = ('revenue', 'admin')
+REVENUE_DEFAULT_DAYS = 30
+REVENUE_MAX_DAYS = 366
+
 
-    return render(request, 'flights.html', {'flight_data': json.dumps(flight_data)})
+def _query_date(request, name):
+    # parse_date возвращает None на неверный формат, но падает на несуществующую дату (2024-13-01)
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+def revenue_period(request):
+    # ?start=YYYY-MM-DD&end=YYYY-MM-DD, по умолчанию — последние 30 дней
+    end = _query_date(request, 'end') or timezone.localdate()
+    start = _query_date(request, 'start') or end - timedelta(days=REVENUE_DEFAULT_DAYS - 1)
+    if start > end:
+        start, end = end, start
+    return max(start, end - timedelta(days=REVENUE_MAX_DAYS - 1)), end
+
+
+@login_required
+def revenue_view(request):
+    if request.user.role not in REVENUE_ROLES:
+        return render(request, 'error.html', {'message': 'Access denied.', 'error_code': 403}, status=403)
+    start, end = revenue_period(request)
+    return render(request, 'revenue.html', {'dashboard': revenue_dashboard(start, end)})
+
+
+@login_required
+def revenue_data(request):
+    if request.user.role not in REVENUE_ROLES:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    start, end = revenue_period(request)
+    return JsonResponse(revenue_dashboard(start, end))
 
 
 def edit_seats_view(request, board_id):
     board = get_object_or_404(Board, pk=board_id)
+    layout_templates = SeatLayoutTemplate.objects.filter(model_id=board.model_id) if board.model_id else SeatLayoutTemplate.objects.none()
 
     if request.method == 'POST':
+        template_id = request.POST.get('template')
+        if template_id:
+            template = get_object_or_404(layout_templates, pk=template_id)
+            apply_layout_template(board, template)
+            return redirect('staffhub:home')
+
         try:
             rows = int(request.POST.get('rows', 0))
         except ValueError:
@@ -271,51 +322,40 @@ def edit_seats_view(request, board_id):
             business_seats = int(request.POST.get('business', 0))  
         except ValueError:
             business_seats = 0  
-        current_version = BoardSeat.objects.filter(board=board).aggregate(Max('seats_version'))['seats_version__max'] or 0
-        new_version = current_version + 1
-
-        BoardSeat.objects.filter(board=board, seats_version=new_version).delete()
-
-        for row_number in range(1, seats + 1):
-            for seat_number in range(1, rows + 1):
-                seat_type = 'Business' if row_number <= business_seats else 'Economy'
-                BoardSeat.objects.create(
-                    board=board,
-                    seat_type=seat_type,
-                    row_number=seat_number,
-                    seat_number=row_number,
-                    seats_version=new_version,
-                    is_deleted=False
-                )
+
+        save_board_layout(board, generate_layout(rows, seats, business_seats))
+
+        template_name = request.POST.get('template_name', '').strip()
+        if template_name and board.model_id:
+            SeatLayoutTemplate.objects.create(
+                model_id=board.model_id,
+                name=template_name,
+                rows=rows,
+                seats=seats,
+                business=business_seats,
+            )
 
         return redirect('staffhub:home')
 
-    latest_version = BoardSeat.objects.filter(board=board).aggregate(Max('seats_version'))['seats_version__max']
-    board_seats = BoardSeat.objects.filter(board=board, seats_version=latest_version, is_deleted=False)
+    layout = get_seat_layout(board.id)
     seat_layout = {}
-    for seat in board_seats:
-        if seat.row_number not in seat_layout:
-            seat_layout[seat.row_number] = []
-        seat_layout[seat.row_number].append({
-            'seat_number': seat.seat_number,
-            'seat_type': seat.seat_type,
+    for row_number, seat_number, seat_type in layout:
+        seat_layout.setdefault(row_number, []).append({
+            'seat_number': seat_number,
+            'seat_type': seat_type,
             'status': 'available',
         })
 
-    rows = board_seats.values('row_number').distinct().count()
-    seats_per_row = max(board_seats.filter(row_number=1).values_list('seat_number', flat=True), default=0)
-
-    try:
-        result = board_seats.filter(seat_type='Business').count() // rows,
-    except ZeroDivisionError:
-        result = 0
+    rows, seats_per_row, business_seats = layout_summary(layout)
 
     context = {
         'seat_layout': seat_layout,
         'board': board,
         'rows': rows,
         'seats_per_row': seats_per_row,
-        'result': result,
+        'seats': seats_per_row,
+        'business_seats': business_seats,
+        'layout_templates': layout_templates,
     }
 
     return render(request, 'edit_seats.html', context)
@@ -326,15 +366,15 @@ def board_management(request):
     status_filter = request.GET.get('status', '')
     model_filter = request.GET.get('model', '')
 
-    boards = Board.objects.all()
+    boards = Board.all_objects.all()
 
     if filter_query:
         boards = boards.filter(board_number__icontains=filter_query)
 
     if status_filter == 'active':
-        boards = boards.filter(is_deleted=False)
+        boards = boards.alive()
     elif status_filter == 'inactive':
-        boards = boards.filter(is_deleted=True)
+        boards = boards.deleted()
 
     if model_filter:
         boards = boards.filter(model_id=model_filter)
@@ -388,15 +428,15 @@ def model_management(request):
     status_filter = request.GET.get('status', '')
     manufacturer_filter = request.GET.get('manufacturer', '')
 
-    models = Model.objects.all()
+    models = Model.all_objects.all()
 
     if filter_query:
         models = models.filter(name__icontains=filter_query)
 
     if status_filter == 'active':
-        models = models.filter(is_deleted=False)
+        models = models.alive()
     elif status_filter == 'inactive':
-        models = models.filter(is_deleted=True)
+        models = models.deleted()
 
     if manufacturer_filter:
         models = models.filter(manufacturer_id=manufacturer_filter)
@@ -449,15 +489,15 @@ def manufacturer_management(request):
     filter_query = request.GET.get('filter', '')
     status_filter = request.GET.get('status', '')
 
-    manufacturers = Manufacturer.objects.all()
+    manufacturers = Manufacturer.all_objects.all()
 
     if filter_query:
         manufacturers = manufacturers.filter(name__icontains=filter_query)
 
     if status_filter == 'active':
-        manufacturers = manufacturers.filter(is_active=True)
+        manufacturers = manufacturers.alive()
     elif status_filter == 'inactive':
-        manufacturers = manufacturers.filter(is_active=False)
+        manufacturers = manufacturers.deleted()
 
     if request.method == 'POST':
         if 'create_manufacturer' in request.POST:
@@ -480,7 +520,7 @@ def manufacturer_management(request):
 
         elif 'multi_delete' in request.POST:
             ids = request.POST.getlist('ids')
-            Manufacturer.objects.filter(id__in=ids).delete()
+            Manufacturer.all_objects.filter(id__in=ids).delete()
             return redirect('manufacturer_management')
 
     paginator = Paginator(manufacturers, 10)